@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+密码库安全审计脚本
+在进程池中为密码评分，生成每个用户的审计报告（默认增量审计）
+
+用法:
+    python audit_vault.py --all [--full] [--workers 4]
+    python audit_vault.py --user 1
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(current_dir, 'backend')
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app import create_app  # noqa: E402
+from audit import audit_all, audit_user  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def print_run(run):
+    report = run.to_dict()['report']
+    summary = report['summary']
+    print(f"用户 {run.user_id}: 共 {report['total']} 条，重新评分 {run.scored_count} 条 | "
+          f"弱 {summary['weak']}  过旧 {summary['old']}  重复 {summary['reused']}  "
+          f"泄露 {summary['breached']}  弱模式 {summary['pattern']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='密码库安全审计')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--user', type=int, help='审计指定用户 ID')
+    target.add_argument('--all', action='store_true', help='审计所有用户')
+    parser.add_argument('--full', action='store_true', help='全部重新评分（默认只评分修改过的记录）')
+    parser.add_argument('--workers', type=int, default=Config.AUDIT_WORKERS, help='进程池大小')
+    parser.add_argument('--chunk', type=int, default=Config.AUDIT_CHUNK_SIZE, help='每块记录数')
+    args = parser.parse_args()
+
+    app = create_app()
+    start = time.perf_counter()
+    with app.app_context(), ProcessPoolExecutor(max_workers=args.workers) as executor:
+        if args.all:
+            for run in audit_all(executor, args.full, args.chunk):
+                print_run(run)
+        else:
+            print_run(audit_user(args.user, executor, args.full, args.chunk))
+    print(f"耗时 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,10 @@
 import os
-import random
-import string
 import sys
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
 from PIL import Image
 import io
 
@@ -14,13 +14,34 @@ if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
 from config import Config
-from models import db, PasswordEntry, User, FavoriteItem, FavoriteUsage
-from auth import token_required, generate_token, verify_token, get_current_user_id
+from models import db, PasswordEntry, User, FavoriteItem, FavoriteUsage, AuditRun
+from auth import token_required, generate_token, verify_token, get_current_user_id, get_current_token
+from tokens import cache as token_cache, revocations
+from hashing import HashingBusy
+from ratelimit import rate_limited
+from backup_writer import writer as backup_writer
+from envelope import create_data_key, create_missing_data_keys, encrypt_many as encrypt_contents
+from generator import build_charset, generate_passwords, stream_passwords
+from passphrase import load_wordlist, generate_passphrase
+from pronounceable import PronounceableError, generate_pronounceable
+from policy import PolicyError, compile_policy, get_policies, resolve_policy
+from strength import calculate_password_strength, estimate_many
+from breach import breach_count, generate_unbreached, replace_breached
+from audit import audit_user
+from database import configure_engines
+from migrations import ensure_schema, start_background_conversion
+from similarity import index as similarity_index
 
 # 获取项目根目录（backup_files所在目录）
 BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backup_files')
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
+# 流式生成支持的输出格式
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
 def create_app():
     """创建并配置Flask应用"""
     # 获取正确的前端目录路径
@@ -42,9 +63,16 @@ def create_app():
     # 确保上传目录存在
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-    # 创建数据库表
+    # 创建数据库表，为旧数据库补充新增的列，并为升级前注册的用户创建数据密钥
     with app.app_context():
+        configure_engines(app, db.engine)
         db.create_all()
+        ensure_schema()
+        create_missing_data_keys()
+
+    # 后台将旧格式的收藏内容转换为当前格式，并加密旧数据中的明文密码
+    if app.config['FAVORITES_BACKGROUND_CONVERT'] or app.config['PASSWORDS_BACKGROUND_ENCRYPT']:
+        start_background_conversion(app)
 
     # 注册路由
     register_routes(app, frontend_dir)
@@ -67,6 +95,7 @@ def register_routes(app, frontend_dir):
     # ==================== 认证 API ====================
 
     @app.route('/api/auth/register', methods=['POST'])
+    @rate_limited
     def register():
         """用户注册"""
         try:
@@ -76,18 +105,19 @@ def register_routes(app, frontend_dir):
             if not data.get('username') or not data.get('email') or not data.get('password'):
                 return jsonify({'success': False, 'error': '用户名、邮箱和密码为必填字段'}), 400
 
-            # 检查用户名是否已存在
-            if User.query.filter_by(username=data['username']).first():
-                return jsonify({'success': False, 'error': '用户名已存在'}), 400
-
-            # 检查邮箱是否已存在
-            if User.query.filter_by(email=data['email']).first():
-                return jsonify({'success': False, 'error': '邮箱已被注册'}), 400
-
             # 验证密码长度
             if len(data['password']) < 6:
                 return jsonify({'success': False, 'error': '密码长度至少为6位'}), 400
 
+            # 一次查询检查用户名和邮箱是否已存在
+            existing = db.session.query(User.username, User.email).filter(
+                or_(User.username == data['username'], User.email == data['email'])
+            ).all()
+            if any(row.username == data['username'] for row in existing):
+                return jsonify({'success': False, 'error': '用户名已存在'}), 400
+            if existing:
+                return jsonify({'success': False, 'error': '邮箱已被注册'}), 400
+
             # 创建用户
             user = User(
                 username=data['username'],
@@ -96,9 +126,19 @@ def register_routes(app, frontend_dir):
             user.set_password(data['password'])
 
             db.session.add(user)
-            db.session.commit()
+            try:
+                db.session.flush()
+                # 数据密钥与用户在同一事务中创建
+                create_data_key(user.id)
+                db.session.commit()
+            except IntegrityError as e:
+                # 检查之后被并发注册（由唯一约束保证）
+                db.session.rollback()
+                if 'username' in str(e.orig):
+                    return jsonify({'success': False, 'error': '用户名已存在'}), 400
+                return jsonify({'success': False, 'error': '邮箱已被注册'}), 400
 
-            # 生成密码备份文件
+            # 生成密码备份文件（后台写入，不阻塞响应）
             try:
                 backup_filename = f"password_backup_{user.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
                 backup_path = os.path.join(BACKUP_DIR, backup_filename)
@@ -126,8 +166,7 @@ def register_routes(app, frontend_dir):
     ========================================
     """
 
-                with open(backup_path, 'w', encoding='utf-8') as f:
-                    f.write(backup_content)
+                backup_writer.submit(backup_path, backup_content)
 
             except Exception as backup_error:
                 # 备份文件生成失败不影响注册
@@ -138,11 +177,15 @@ def register_routes(app, frontend_dir):
                 'message': '注册成功',
                 'data': user.to_dict()
             }), 201
+        except HashingBusy as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
     @app.route('/api/auth/login', methods=['POST'])
+    @rate_limited
     def login():
         """用户登录"""
         try:
@@ -159,6 +202,11 @@ def register_routes(app, frontend_dir):
             if not user or not user.check_password(data['password']):
                 return jsonify({'success': False, 'error': '用户名或密码错误'}), 401
 
+            # 哈希参数已更新时按当前参数重新计算
+            if user.password_needs_rehash():
+                user.set_password(data['password'])
+                db.session.commit()
+
             # 生成 token
             token = generate_token(user.id)
 
@@ -170,9 +218,72 @@ def register_routes(app, frontend_dir):
                     'user': user.to_dict()
                 }
             })
+        except HashingBusy as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
+            db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/auth/logout', methods=['POST'])
+    @token_required
+    def logout():
+        """退出登录（吊销当前令牌）"""
+        try:
+            revocations.revoke(get_current_token())
+            similarity_index.invalidate(get_current_user_id())
+            return jsonify({'success': True, 'message': '已退出登录'})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/auth/change-password', methods=['POST'])
+    @token_required
+    def change_password():
+        """修改登录密码（吊销此前签发的全部令牌，返回新令牌）"""
+        try:
+            user_id = get_current_user_id()
+            data = request.get_json()
+
+            if not data.get('old_password') or not data.get('new_password'):
+                return jsonify({'success': False, 'error': '原密码和新密码为必填字段'}), 400
+
+            if len(data['new_password']) < 6:
+                return jsonify({'success': False, 'error': '密码长度至少为6位'}), 400
+
+            user = User.query.get(user_id)
+            if not user:
+                return jsonify({'success': False, 'error': '用户不存在'}), 404
+
+            if not user.check_password(data['old_password']):
+                return jsonify({'success': False, 'error': '原密码错误'}), 400
+
+            user.set_password(data['new_password'])
+            db.session.commit()
+            revocations.revoke_user(user_id)
+            similarity_index.invalidate(user_id)
+
+            return jsonify({
+                'success': True,
+                'message': '密码修改成功',
+                'data': {'token': generate_token(user_id)}
+            })
+        except HashingBusy as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '1'}
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/auth/token-stats', methods=['GET'])
+    @token_required
+    def token_stats():
+        """令牌验证缓存命中率与吊销列表大小"""
+        return jsonify({
+            'success': True,
+            'data': {'cache': token_cache.stats(), 'revocations': revocations.stats()}
+        })
+
     @app.route('/api/auth/forgot-password', methods=['POST'])
     def forgot_password():
         """找回密码 - 查找备份文件"""
@@ -341,23 +452,34 @@ def register_routes(app, frontend_dir):
             if not data.get('site_name') or not data.get('username') or not data.get('password'):
                 return jsonify({'success': False, 'error': '网站名称、用户名和密码为必填字段'}), 400
 
+            # 泄露库检查
+            breached = breach_count(data['password'])
+            if breached and app.config['BREACH_CHECK_MODE'] == 'reject':
+                return jsonify({
+                    'success': False,
+                    'error': f'该密码已在泄露数据中出现 {breached} 次，请更换密码',
+                    'breached': breached
+                }), 400
+
             # 创建记录
             entry = PasswordEntry(
                 site_name=data['site_name'],
                 site_url=data.get('site_url', ''),
                 username=data['username'],
-                password=data['password'],
                 notes=data.get('notes', ''),
                 strength=data.get('strength', ''),
                 category=data.get('category', ''),
                 image_filename=data.get('image_filename', ''),
                 user_id=user_id  # 关联当前用户
             )
+            entry.set_password(data['password'])
 
             db.session.add(entry)
             db.session.commit()
 
-            return jsonify({'success': True, 'data': entry.to_dict_masked()}), 201
+            similarity_index.add(user_id, entry.id, data['password'])
+
+            return jsonify({'success': True, 'data': entry.to_dict_masked(), 'breached': breached}), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -371,6 +493,15 @@ def register_routes(app, frontend_dir):
             entry = PasswordEntry.query.filter_by(id=entry_id, user_id=user_id).first_or_404()
             data = request.get_json()
 
+            # 泄露库检查
+            breached = breach_count(data['password']) if 'password' in data else 0
+            if breached and app.config['BREACH_CHECK_MODE'] == 'reject':
+                return jsonify({
+                    'success': False,
+                    'error': f'该密码已在泄露数据中出现 {breached} 次，请更换密码',
+                    'breached': breached
+                }), 400
+
             # 更新字段
             if 'site_name' in data:
                 entry.site_name = data['site_name']
@@ -379,7 +510,7 @@ def register_routes(app, frontend_dir):
             if 'username' in data:
                 entry.username = data['username']
             if 'password' in data:
-                entry.password = data['password']
+                entry.set_password(data['password'])
             if 'notes' in data:
                 entry.notes = data['notes']
             if 'strength' in data:
@@ -395,7 +526,12 @@ def register_routes(app, frontend_dir):
             entry.updated_at = datetime.utcnow()
             db.session.commit()
 
-            return jsonify({'success': True, 'data': entry.to_dict_masked()})
+            if 'password' in data:
+                similarity_index.add(user_id, entry.id, data['password'])
+            else:
+                similarity_index.touch(user_id)
+
+            return jsonify({'success': True, 'data': entry.to_dict_masked(), 'breached': breached})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -415,11 +551,61 @@ def register_routes(app, frontend_dir):
             db.session.delete(entry)
             db.session.commit()
 
+            similarity_index.remove(user_id, [entry_id])
+
             return jsonify({'success': True, 'message': '删除成功'})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/passwords/similar', methods=['GET', 'POST'])
+    @token_required
+    def get_similar_passwords():
+        """查找相似密码（编辑距离不超过 max_distance），可指定 entry_id 或提交待检查的 password"""
+        try:
+            user_id = get_current_user_id()
+
+            # GET 只接受 entry_id，避免明文密码出现在 URL 中
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                entry_id = data.get('entry_id')
+                password = data.get('password')
+                max_distance = data.get('max_distance', 2)
+            else:
+                entry_id = request.args.get('entry_id', type=int)
+                password = None
+                max_distance = request.args.get('max_distance', 2, type=int)
+
+            limit = app.config['SIMILARITY_MAX_DISTANCE']
+            if not isinstance(max_distance, int) or max_distance < 1 or max_distance > limit:
+                return jsonify({'success': False, 'error': f'max_distance必须在1-{limit}之间'}), 400
+
+            if entry_id:
+                entry = PasswordEntry.query.filter_by(id=entry_id, user_id=user_id).first_or_404()
+                password = entry.get_password()
+            elif not password:
+                return jsonify({'success': False, 'error': '请提供entry_id或password'}), 400
+
+            matches = [
+                (match_id, distance)
+                for match_id, distance in similarity_index.search(user_id, password, max_distance)
+                if match_id != entry_id
+            ]
+            entries = {
+                item.id: item for item in
+                PasswordEntry.query.filter(PasswordEntry.id.in_([match_id for match_id, _ in matches])).all()
+            } if matches else {}
+
+            return jsonify({
+                'success': True,
+                'data': [
+                    dict(entries[match_id].to_dict_masked(), distance=distance)
+                    for match_id, distance in matches if match_id in entries
+                ]
+            })
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/passwords/export', methods=['GET'])
     @token_required
     def export_passwords():
@@ -428,7 +614,9 @@ def register_routes(app, frontend_dir):
             user_id = get_current_user_id()
             entries = PasswordEntry.query.filter_by(user_id=user_id).all()
 
-            export_data = [entry.to_dict() for entry in entries]
+            # 密码在线程池中批量解密
+            passwords = PasswordEntry.get_passwords(entries)
+            export_data = [entry.to_dict(password=password) for entry, password in zip(entries, passwords)]
 
             return jsonify({
                 'success': True,
@@ -479,13 +667,13 @@ def register_routes(app, frontend_dir):
                         site_name=entry_data.get('site_name'),
                         site_url=entry_data.get('site_url', ''),
                         username=entry_data.get('username'),
-                        password=entry_data.get('password'),
                         notes=entry_data.get('notes', ''),
                         strength=entry_data.get('strength', 'weak'),
                         category=entry_data.get('category', ''),
                         image_filename=entry_data.get('image_filename', ''),
                         user_id=user_id
                     )
+                    entry.set_password(entry_data.get('password'))
                     db.session.add(entry)
                     imported_count += 1
                 except Exception as e:
@@ -506,6 +694,41 @@ def register_routes(app, frontend_dir):
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/passwords/reused', methods=['GET'])
+    @token_required
+    def get_reused_passwords():
+        """获取重复使用同一密码的记录（按密码指纹分组）"""
+        try:
+            user_id = get_current_user_id()
+
+            groups = db.session.query(PasswordEntry.fingerprint, func.count(PasswordEntry.id)).filter(
+                PasswordEntry.user_id == user_id,
+                PasswordEntry.fingerprint.isnot(None)
+            ).group_by(PasswordEntry.fingerprint).having(func.count(PasswordEntry.id) > 1).all()
+
+            fingerprints = [fingerprint for fingerprint, _ in groups]
+            entries = PasswordEntry.query.filter(
+                PasswordEntry.user_id == user_id,
+                PasswordEntry.fingerprint.in_(fingerprints)
+            ).order_by(PasswordEntry.updated_at.desc()).all() if fingerprints else []
+
+            grouped = {fingerprint: [] for fingerprint in fingerprints}
+            for entry in entries:
+                grouped[entry.fingerprint].append(entry.to_dict_masked())
+
+            return jsonify({
+                'success': True,
+                'data': [
+                    {'count': len(items), 'entries': items}
+                    for items in sorted(grouped.values(), key=len, reverse=True)
+                ],
+                'total_groups': len(grouped),
+                'total_entries': len(entries)
+            })
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/passwords/batch-delete', methods=['POST'])
     @token_required
     def batch_delete_passwords():
@@ -537,6 +760,8 @@ def register_routes(app, frontend_dir):
 
             db.session.commit()
 
+            similarity_index.remove(user_id, [entry.id for entry in entries])
+
             return jsonify({
                 'success': True,
                 'message': f'成功删除 {deleted_count} 条记录'
@@ -553,12 +778,13 @@ def register_routes(app, frontend_dir):
             user_id = get_current_user_id()
             user = User.query.get(user_id)
             entries = PasswordEntry.query.filter_by(user_id=user_id).all()
+            passwords = PasswordEntry.get_passwords(entries)
 
             backup_data = {
                 'version': '1.0',
                 'backup_date': datetime.utcnow().isoformat(),
                 'user': user.to_dict() if user else None,
-                'passwords': [entry.to_dict() for entry in entries],
+                'passwords': [entry.to_dict(password=password) for entry, password in zip(entries, passwords)],
                 'count': len(entries)
             }
 
@@ -569,6 +795,36 @@ def register_routes(app, frontend_dir):
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/audit', methods=['GET'])
+    @token_required
+    def get_audit_report():
+        """获取最近一次安全审计报告"""
+        try:
+            user_id = get_current_user_id()
+            run = db.session.get(AuditRun, user_id)
+
+            if not run:
+                return jsonify({'success': False, 'error': '尚未进行安全审计'}), 404
+
+            return jsonify({'success': True, 'data': run.to_dict()})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/audit/run', methods=['POST'])
+    @token_required
+    def run_audit():
+        """对当前用户执行安全审计（增量，只重新评分修改过的记录）"""
+        try:
+            user_id = get_current_user_id()
+            data = request.get_json(silent=True) or {}
+
+            run = audit_user(user_id, full=bool(data.get('full', False)))
+
+            return jsonify({'success': True, 'data': run.to_dict()})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     # ==================== 收藏网站管理 API ====================
 
     @app.route('/api/favorites', methods=['GET'])
@@ -748,6 +1004,10 @@ def register_routes(app, frontend_dir):
         try:
             user_id = get_current_user_id()
             item = FavoriteItem.query.filter_by(id=item_id, user_id=user_id).first_or_404()
+            try:
+                content = item.get_content()
+            except ValueError:
+                return jsonify({'success': False, 'error': '内容无法解密'}), 500
 
             # 增加使用计数
             item.use_count = (item.use_count or 0) + 1
@@ -761,7 +1021,7 @@ def register_routes(app, frontend_dir):
             return jsonify({
                 'success': True,
                 'data': {
-                    'content': item.get_content(),
+                    'content': content,
                     'use_count': item.use_count
                 }
             })
@@ -781,22 +1041,25 @@ def register_routes(app, frontend_dir):
             if not items_data:
                 return jsonify({'success': False, 'error': 'items数组不能为空'}), 400
 
-            created_items = []
-            for item_data in items_data:
-                if not item_data.get('content'):
-                    continue
+            items_data = [item_data for item_data in items_data if item_data.get('content')]
 
+            # 内容在线程池中用用户数据密钥批量加密
+            blobs = encrypt_contents(user_id, [item_data['content'] for item_data in items_data])
+
+            created_items = []
+            for item_data, blob in zip(items_data, blobs):
                 item = FavoriteItem(
                     title=item_data.get('title', '未命名收藏'),
+                    content='',
+                    content_blob=blob,
                     category=item_data.get('category', ''),
                     tags=item_data.get('tags', ''),
                     is_password=item_data.get('is_password', False),
                     user_id=user_id
                 )
-                item.set_content(item_data['content'])
-                db.session.add(item)
                 created_items.append(item)
 
+            db.session.add_all(created_items)
             db.session.commit()
 
             return jsonify({
@@ -885,7 +1148,9 @@ def register_routes(app, frontend_dir):
             user_id = get_current_user_id()
             items = FavoriteItem.query.filter_by(user_id=user_id).all()
 
-            export_data = [item.to_dict(decrypt=True) for item in items]
+            # 内容在线程池中批量解密
+            contents = FavoriteItem.get_contents(items)
+            export_data = [item.to_dict(content=content) for item, content in zip(items, contents)]
 
             return jsonify({
                 'success': True,
@@ -907,36 +1172,40 @@ def register_routes(app, frontend_dir):
             if not items_data:
                 return jsonify({'success': False, 'error': 'items数组不能为空'}), 400
 
-            imported_count = 0
+            # 已存在的标题一次查出（跳过同名收藏，包括本次导入中重复的标题）
+            existing_titles = {
+                title for (title,) in db.session.query(FavoriteItem.title).filter_by(user_id=user_id)
+            }
+
+            pending = []
             for item_data in items_data:
                 if not item_data.get('content'):
                     continue
-
-                # 检查是否已存在（根据标题和内容）
-                existing = FavoriteItem.query.filter_by(
-                    user_id=user_id,
-                    title=item_data.get('title', '')
-                ).first()
-
-                if existing:
+                if item_data.get('title', '') in existing_titles:
                     continue  # 跳过已存在的
+                existing_titles.add(item_data.get('title', '未命名收藏'))
+                pending.append(item_data)
 
-                item = FavoriteItem(
+            # 内容在线程池中用用户数据密钥批量加密
+            blobs = encrypt_contents(user_id, [item_data['content'] for item_data in pending])
+
+            db.session.add_all([
+                FavoriteItem(
                     title=item_data.get('title', '未命名收藏'),
+                    content='',
+                    content_blob=blob,
                     category=item_data.get('category', ''),
                     tags=item_data.get('tags', ''),
                     is_password=item_data.get('is_password', False),
                     user_id=user_id
                 )
-                item.set_content(item_data['content'])
-                db.session.add(item)
-                imported_count += 1
-
+                for item_data, blob in zip(pending, blobs)
+            ])
             db.session.commit()
 
             return jsonify({
                 'success': True,
-                'message': f'成功导入 {imported_count} 条记录'
+                'message': f'成功导入 {len(pending)} 条记录'
             })
         except Exception as e:
             db.session.rollback()
@@ -1018,29 +1287,35 @@ def register_routes(app, frontend_dir):
         """生成随机密码"""
         try:
             data = request.get_json()
+
+            # 按生成策略生成
+            if 'policy' in data:
+                plan = resolve_policy(data['policy'])
+                password, breached = generate_unbreached(plan.sample)
+                return jsonify({
+                    'success': True,
+                    'data': {
+                        'password': password,
+                        'strength': calculate_password_strength(password),
+                        'breached': breached
+                    }
+                })
+
             length = data.get('length', 12)
 
             if length < 6 or length > 32:
                 return jsonify({'success': False, 'error': '密码长度必须在6-32位之间'}), 400
 
-            use_letters = data.get('letters', True)
-            use_numbers = data.get('numbers', True)
-            use_symbols = data.get('symbols', True)
-
-            if not any([use_letters, use_numbers, use_symbols]):
+            chars = build_charset(
+                data.get('letters', True),
+                data.get('numbers', True),
+                data.get('symbols', True)
+            )
+            if not chars:
                 return jsonify({'success': False, 'error': '至少选择一种字符类型'}), 400
 
-            # 构建字符集
-            chars = ''
-            if use_letters:
-                chars += string.ascii_letters
-            if use_numbers:
-                chars += string.digits
-            if use_symbols:
-                chars += '!@#$%^&*()_+-=[]{}|;:,.<>?'
-
-            # 生成密码
-            password = ''.join(random.choice(chars) for _ in range(length))
+            # 生成密码（熵池 + 拒绝采样），出现在泄露库中时重新生成
+            password, breached = generate_unbreached(lambda: generate_passwords(chars, length, 1)[0])
 
             # 计算强度
             strength = calculate_password_strength(password)
@@ -1049,12 +1324,216 @@ def register_routes(app, frontend_dir):
                 'success': True,
                 'data': {
                     'password': password,
-                    'strength': strength
+                    'strength': strength,
+                    'breached': breached
+                }
+            })
+        except PolicyError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/generate-password/batch', methods=['POST'])
+    @token_required
+    def generate_password_batch():
+        """批量生成随机密码"""
+        try:
+            data = request.get_json()
+            length = data.get('length', 12)
+            count = data.get('count', 10)
+
+            max_count = app.config['PASSWORD_BATCH_MAX_COUNT']
+            if count < 1 or count > max_count:
+                return jsonify({'success': False, 'error': f'生成数量必须在1-{max_count}之间'}), 400
+
+            if 'policy' in data:
+                generate_many = resolve_policy(data['policy']).sample_many
+            else:
+                if length < 6 or length > 32:
+                    return jsonify({'success': False, 'error': '密码长度必须在6-32位之间'}), 400
+
+                chars = build_charset(
+                    data.get('letters', True),
+                    data.get('numbers', True),
+                    data.get('symbols', True)
+                )
+                if not chars:
+                    return jsonify({'success': False, 'error': '至少选择一种字符类型'}), 400
+
+                def generate_many(n):
+                    return generate_passwords(chars, length, n)
+
+            # 与单个生成接口一致，出现在泄露库中的密码重新生成
+            results = replace_breached(generate_many(count), generate_many)
+
+            return jsonify({
+                'success': True,
+                'data': [
+                    {'password': password, 'strength': calculate_password_strength(password), 'breached': breached}
+                    for password, breached in results
+                ],
+                'count': len(results)
+            })
+        except PolicyError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/password-policies', methods=['GET'])
+    @token_required
+    def get_password_policies():
+        """获取所有命名生成策略"""
+        try:
+            return jsonify({
+                'success': True,
+                'data': {name: compile_policy(params).to_dict() for name, params in get_policies().items()}
+            })
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/generate-password/stream', methods=['POST'])
+    @token_required
+    def generate_password_stream():
+        """流式生成大批量密码（NDJSON / CSV）"""
+        try:
+            data = request.get_json()
+            length = data.get('length', 12)
+            count = data.get('count', 1000)
+            fmt = data.get('format', 'ndjson')
+
+            if length < 6 or length > 32:
+                return jsonify({'success': False, 'error': '密码长度必须在6-32位之间'}), 400
+
+            max_count = app.config['PASSWORD_STREAM_MAX_COUNT']
+            if count < 1 or count > max_count:
+                return jsonify({'success': False, 'error': f'生成数量必须在1-{max_count}之间'}), 400
+
+            if fmt not in STREAM_MIMETYPES:
+                return jsonify({'success': False, 'error': '输出格式必须为ndjson或csv'}), 400
+
+            chars = build_charset(
+                data.get('letters', True),
+                data.get('numbers', True),
+                data.get('symbols', True)
+            )
+            if not chars:
+                return jsonify({'success': False, 'error': '至少选择一种字符类型'}), 400
+
+            score = calculate_password_strength if data.get('strength', True) else None
+
+            def check(passwords):
+                return replace_breached(passwords, lambda n: generate_passwords(chars, length, n))
+
+            # 生成器逐块输出，每块经泄露检查后再输出，客户端断开后 WSGI 服务器关闭生成器，剩余部分不再生成
+            return Response(
+                stream_passwords(chars, length, count, fmt, score, check=check),
+                mimetype=STREAM_MIMETYPES[fmt],
+                headers={'Content-Disposition': f'attachment; filename=passwords.{fmt}'}
+            )
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/generate-passphrase', methods=['POST'])
+    @token_required
+    def generate_passphrase_route():
+        """生成 Diceware 口令短语"""
+        try:
+            data = request.get_json() or {}
+            word_count = data.get('words', 6)
+            separator = data.get('separator', '-')
+            capitalize = data.get('capitalize', False)
+
+            min_words = app.config['PASSPHRASE_MIN_WORDS']
+            max_words = app.config['PASSPHRASE_MAX_WORDS']
+            if word_count < min_words or word_count > max_words:
+                return jsonify({'success': False, 'error': f'单词数量必须在{min_words}-{max_words}之间'}), 400
+
+            wordlist_path = app.config['PASSPHRASE_WORDLIST']
+            if not os.path.exists(wordlist_path):
+                return jsonify({'success': False, 'error': '未找到词表文件'}), 404
+
+            wordlist = load_wordlist(wordlist_path)
+            passphrase, entropy_bits = generate_passphrase(wordlist, word_count, separator, capitalize)
+
+            return jsonify({
+                'success': True,
+                'data': {
+                    'passphrase': passphrase,
+                    'entropy_bits': round(entropy_bits, 2),
+                    'words': word_count,
+                    'wordlist_size': len(wordlist),
+                    'strength': calculate_password_strength(passphrase)
                 }
             })
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/generate-pronounceable', methods=['POST'])
+    @token_required
+    def generate_pronounceable_route():
+        """生成可读密码（马尔可夫模型）"""
+        try:
+            data = request.get_json() or {}
+            length = data.get('length')  # 未指定时取满足最低熵的最短长度
+            capitalize = data.get('capitalize', True)
+            digits = data.get('digits', 2)
+
+            min_length = app.config['PRONOUNCEABLE_MIN_LENGTH']
+            max_length = app.config['PRONOUNCEABLE_MAX_LENGTH']
+            if length is not None and (length < min_length or length > max_length):
+                return jsonify({'success': False, 'error': f'密码长度必须在{min_length}-{max_length}之间'}), 400
+            max_digits = app.config['PRONOUNCEABLE_MAX_DIGITS']
+            if digits < 0 or digits > max_digits:
+                return jsonify({'success': False, 'error': f'数字个数必须在0-{max_digits}之间'}), 400
+
+            try:
+                result = generate_pronounceable(length, capitalize, digits)
+            except FileNotFoundError:
+                return jsonify({'success': False, 'error': '未找到语料文件'}), 404
+            except PronounceableError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            result['strength'] = calculate_password_strength(result['password'])
+
+            return jsonify({'success': True, 'data': result})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/strength/batch', methods=['POST'])
+    @token_required
+    def strength_batch():
+        """批量评估密码强度"""
+        try:
+            data = request.get_json()
+            passwords = data.get('passwords', [])
+
+            if not passwords:
+                return jsonify({'success': False, 'error': 'passwords数组不能为空'}), 400
+
+            max_count = app.config['STRENGTH_BATCH_MAX_COUNT']
+            if len(passwords) > max_count:
+                return jsonify({'success': False, 'error': f'单次最多评估{max_count}个密码'}), 400
+
+            if not all(isinstance(p, str) for p in passwords):
+                return jsonify({'success': False, 'error': 'passwords数组只能包含字符串'}), 400
+
+            max_length = app.config['STRENGTH_MAX_LENGTH']
+            if any(len(p) > max_length for p in passwords):
+                return jsonify({'success': False, 'error': f'单个密码长度不能超过{max_length}'}), 400
+
+            max_chars = app.config['STRENGTH_BATCH_MAX_CHARS']
+            if sum(len(p) for p in passwords) > max_chars:
+                return jsonify({'success': False, 'error': f'单次评估的密码总长度不能超过{max_chars}'}), 400
+
+            results = estimate_many(passwords)
+
+            return jsonify({
+                'success': True,
+                'data': results,
+                'count': len(results)
+            })
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/categories', methods=['GET'])
     @token_required
     def get_categories():
@@ -1132,44 +1611,6 @@ def register_routes(app, frontend_dir):
 
     # ==================== 工具函数 ====================
 
-def calculate_password_strength(password):
-    """计算密码强度"""
-    score = 0
-    length = len(password)
-
-    # 长度评分
-    if length >= 8:
-        score += 1
-    if length >= 12:
-        score += 1
-    if length >= 16:
-        score += 1
-
-    # 字符类型评分
-    has_upper = any(c.isupper() for c in password)
-    has_lower = any(c.islower() for c in password)
-    has_digit = any(c.isdigit() for c in password)
-    has_symbol = any(c in '!@#$%^&*()_+-=[]{}|;:,.<>?' for c in password)
-
-    if has_upper and has_lower:
-        score += 1
-    if has_digit:
-        score += 1
-    if has_symbol:
-        score += 1
-
-    # 转换为强度等级
-    if score <= 2:
-        return 'extreme-weak'
-    elif score == 3:
-        return 'weak'
-    elif score == 4:
-        return 'medium'
-    elif score == 5:
-        return 'strong'
-    else:
-        return 'extreme-strong'
-
 def allowed_file(filename, allowed_extensions):
     """检查文件扩展名是否允许"""
     return '.' in filename and \
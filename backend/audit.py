@@ -0,0 +1,223 @@
+"""
+密码库安全审计模块
+按主键分块读取 PasswordEntry，将强度评分分发到进程池，只对上次审计后修改过的记录重新评分，
+汇总强度、密码年龄、重复使用和弱模式，生成每个用户的审计报告。
+每块评分完成后立即写入，进程池中等待的块数有上限，内存占用与记录总数无关（指纹和修改时间除外）
+"""
+import json
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+
+from config import Config
+from models import db, AuditResult, AuditRun, PasswordEntry, User, password_fingerprint
+
+# 视为弱密码的强度等级
+WEAK_LEVELS = ('extreme-weak', 'weak')
+
+
+def score_chunk(items):
+    """
+    为一批密码评分（在进程池 worker 中执行，必须是模块级函数）
+
+    Args:
+        items: [(entry_id, password), ...]
+
+    Returns:
+        [dict, ...]，可直接用于批量插入 AuditResult
+    """
+    from breach import breach_count
+    from strength import estimate_strength
+
+    now = datetime.utcnow()
+    rows = []
+    for entry_id, password in items:
+        result = estimate_strength(password)
+        rows.append({
+            'entry_id': entry_id,
+            'entropy_bits': result['entropy_bits'],
+            'strength': result['label'],
+            'patterns': ','.join(result['patterns']),
+            'breached': breach_count(password),
+            'audited_at': now
+        })
+    return rows
+
+
+def _save_results(user_id, rows):
+    """
+    写入一块评分结果（先删除旧结果再批量插入）并提交
+
+    Returns:
+        写入的条数
+    """
+    for row in rows:
+        row['user_id'] = user_id
+    AuditResult.query.filter(
+        AuditResult.entry_id.in_([row['entry_id'] for row in rows])
+    ).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(AuditResult, rows)
+    db.session.commit()
+    return len(rows)
+
+
+def audit_user(user_id, executor=None, full=False, chunk_size=None):
+    """
+    审计单个用户的密码库
+
+    Args:
+        user_id: 用户 ID
+        executor: 可选的 concurrent.futures 执行器（如 ProcessPoolExecutor），
+                  为 None 时在当前进程内评分
+        full: 是否忽略上次结果，全部重新评分
+        chunk_size: 每块读取和评分的记录数
+
+    Returns:
+        AuditRun 实例
+    """
+    chunk_size = chunk_size or Config.AUDIT_CHUNK_SIZE
+    started_at = datetime.utcnow()
+    last_run = db.session.get(AuditRun, user_id)
+    since = None if full or last_run is None else last_run.started_at
+
+    audited = {entry_id for (entry_id,) in db.session.query(AuditResult.entry_id).filter_by(user_id=user_id)}
+
+    # 单次遍历：收集重复使用和年龄信息，修改过的记录分块提交评分
+    fingerprints = {}
+    updated = {}
+    pending = []
+    futures = set()
+    scored_count = 0
+
+    def save_completed(block=False):
+        """写入已完成的评分块；block 为 True 时至少等待一块完成"""
+        nonlocal futures, scored_count
+        done, futures = wait(futures, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            scored_count += _save_results(user_id, future.result())
+
+    def submit(chunk):
+        nonlocal scored_count
+        # 密码在主进程中批量解密，只把明文交给评分进程
+        chunk = [(row.id, password) for row, password in zip(chunk, PasswordEntry.get_passwords(chunk))]
+        if executor is None:
+            scored_count += _save_results(user_id, score_chunk(chunk))
+            return
+        futures.add(executor.submit(score_chunk, chunk))
+        save_completed()
+        while len(futures) >= Config.AUDIT_MAX_PENDING_CHUNKS:
+            save_completed(block=True)
+
+    # 按主键分块查询（而非保持游标打开），每块评分结果可以随时提交
+    query = db.session.query(
+        PasswordEntry.id, PasswordEntry.user_id, PasswordEntry.password, PasswordEntry.password_blob,
+        PasswordEntry.fingerprint, PasswordEntry.updated_at
+    ).filter(PasswordEntry.user_id == user_id)
+
+    last_id = 0
+    while True:
+        rows = query.filter(PasswordEntry.id > last_id).order_by(PasswordEntry.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            entry_id, updated_at = row.id, row.updated_at
+            fingerprint = row.fingerprint or password_fingerprint(PasswordEntry.get_passwords([row])[0])
+            fingerprints.setdefault(fingerprint, []).append(entry_id)
+            updated[entry_id] = updated_at
+            if since is None or entry_id not in audited or (updated_at and updated_at > since):
+                pending.append(row)
+                if len(pending) >= chunk_size:
+                    submit(pending)
+                    pending = []
+    if pending:
+        submit(pending)
+    while futures:
+        save_completed(block=True)
+
+    # 清理已删除记录的结果
+    stale = audited - set(updated)
+    if stale:
+        stale = list(stale)
+        for start in range(0, len(stale), chunk_size):
+            AuditResult.query.filter(
+                AuditResult.entry_id.in_(stale[start:start + chunk_size])
+            ).delete(synchronize_session=False)
+
+    report = _build_report(user_id, fingerprints, updated, started_at)
+
+    if last_run is None:
+        last_run = AuditRun(user_id=user_id)
+        db.session.add(last_run)
+    last_run.started_at = started_at
+    last_run.finished_at = datetime.utcnow()
+    last_run.scored_count = scored_count
+    last_run.report = json.dumps(report, ensure_ascii=False)
+    db.session.commit()
+    return last_run
+
+
+def _build_report(user_id, fingerprints, updated, now):
+    """汇总审计结果"""
+    reused = set()
+    for entry_ids in fingerprints.values():
+        if len(entry_ids) > 1:
+            reused.update(entry_ids)
+
+    max_age = Config.AUDIT_MAX_AGE_DAYS
+    entries = []
+    summary = {'weak': 0, 'old': 0, 'reused': len(reused), 'breached': 0, 'pattern': 0}
+
+    results = db.session.query(
+        AuditResult.entry_id, AuditResult.strength, AuditResult.patterns, AuditResult.breached
+    ).filter(AuditResult.user_id == user_id).execution_options(yield_per=Config.AUDIT_CHUNK_SIZE)
+
+    for entry_id, strength, patterns, breached in results:
+        if entry_id not in updated:
+            continue
+        updated_at = updated[entry_id]
+        age_days = (now - updated_at).days if updated_at else None
+
+        flags = []
+        if strength in WEAK_LEVELS:
+            flags.append('weak')
+        if age_days is not None and age_days > max_age:
+            flags.append('old')
+        if entry_id in reused:
+            flags.append('reused')
+        if breached:
+            flags.append('breached')
+        if patterns:
+            flags.append('pattern')
+        for flag in flags:
+            if flag != 'reused':
+                summary[flag] += 1
+
+        if flags:
+            entries.append({
+                'id': entry_id,
+                'strength': strength,
+                'age_days': age_days,
+                'patterns': patterns.split(',') if patterns else [],
+                'breached': breached or 0,
+                'flags': flags
+            })
+
+    return {
+        'generated_at': now.isoformat(),
+        'total': len(updated),
+        'summary': summary,
+        'reuse_groups': sum(1 for ids in fingerprints.values() if len(ids) > 1),
+        'entries': entries
+    }
+
+
+def audit_all(executor=None, full=False, chunk_size=None):
+    """
+    审计所有用户
+
+    Yields:
+        每个用户的 AuditRun 实例
+    """
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+    for user_id in user_ids:
+        yield audit_user(user_id, executor, full, chunk_size)
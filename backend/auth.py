@@ -1,9 +1,12 @@
 import jwt
+import time
+import uuid
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 from models import User
 from config import Config
+from tokens import cache as token_cache, revocations
 
 # JWT 配置 - 使用统一的配置
 SECRET_KEY = Config.SECRET_KEY
@@ -12,20 +15,35 @@ def generate_token(user_id):
     """生成 JWT token"""
     payload = {
         'user_id': user_id,
-        'exp': datetime.utcnow() + timedelta(days=7),  # token 有效期 7 天
-        'iat': datetime.utcnow()
+        'exp': datetime.utcnow() + timedelta(days=Config.TOKEN_EXPIRES_DAYS),  # token 有效期
+        'iat': time.time(),  # 保留小数，修改密码后立即签发的新令牌不会被同一秒的吊销截止时间误判
+        'jti': uuid.uuid4().hex  # 令牌唯一标识，用于吊销
     }
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
+def decode_token(token):
+    """
+    验证 JWT token 并返回 payload
+
+    验证通过的令牌缓存到过期为止，重复请求跳过签名验证；吊销检查每次都会执行（内存查找）。
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
+        token_cache.put(token, payload)
+    if revocations.is_revoked(payload):
+        return None
+    return payload
+
 def verify_token(token):
     """验证 JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return payload['user_id']
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
-        return None
+    payload = decode_token(token)
+    return payload['user_id'] if payload else None
 
 def token_required(f):
     """认证装饰器：保护需要登录的接口"""
@@ -44,13 +62,13 @@ def token_required(f):
         if not token:
             return jsonify({'success': False, 'error': '未提供认证令牌'}), 401
 
-        user_id = verify_token(token)
-        if not user_id:
+        payload = decode_token(token)
+        if not payload:
             return jsonify({'success': False, 'error': '认证令牌无效或已过期'}), 401
 
-        # 将 user_id 存入 flask.g 供后续使用
-        from flask import g
-        g.user_id = user_id
+        # 将 user_id 和令牌内容存入 flask.g 供后续使用
+        g.user_id = payload['user_id']
+        g.token_payload = payload
 
         return f(*args, **kwargs)
 
@@ -58,5 +76,8 @@ def token_required(f):
 
 def get_current_user_id():
     """获取当前登录用户的 ID"""
-    from flask import g
     return getattr(g, 'user_id', None)
+
+def get_current_token():
+    """获取当前请求令牌的 payload"""
+    return getattr(g, 'token_payload', None)
@@ -0,0 +1,114 @@
+"""
+密码备份文件的后台写入
+注册接口把备份文件放入队列后立即返回，由后台线程按批写入：
+每个文件先写入临时文件并 fsync，再原子替换为目标文件名（找回密码时不会读到写了一半的文件），
+同一批次涉及的目录只 fsync 一次。进程正常退出时会写完队列中剩余的文件。
+"""
+import atexit
+import os
+import queue
+import threading
+
+from config import Config
+
+
+class BackupWriter:
+    """后台批量写文件"""
+
+    def __init__(self, batch_size=64, interval=0.05):
+        """
+        Args:
+            batch_size: 每批最多写入的文件数
+            interval: 收到第一个文件后等待更多文件加入同一批次的秒数
+        """
+        self.batch_size = batch_size
+        self.interval = interval
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='backup-writer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, path, content):
+        """加入写入队列（立即返回）"""
+        self._queue.put((path, content))
+        self._ensure_thread()
+
+    def flush(self, timeout=None):
+        """等待队列中的文件全部写入"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get(timeout=self.interval))
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            files = [item for item in batch if not isinstance(item, threading.Event)]
+            self._write(files)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, files):
+        directories = set()
+        for path, content in files:
+            tmp_path = f'{path}.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+                directories.add(os.path.dirname(os.path.abspath(path)))
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"备份文件生成失败: {str(e)}")
+        for directory in directories:
+            _fsync_directory(directory)
+
+
+def _fsync_directory(path):
+    """fsync 目录，使新文件名持久化（Windows 不支持时忽略）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# 全局实例
+writer = BackupWriter(Config.BACKUP_WRITER_BATCH_SIZE, Config.BACKUP_WRITER_INTERVAL)
+
+# 进程退出前写完剩余文件
+atexit.register(writer.flush, 10)
+
+if hasattr(os, 'register_at_fork'):
+    # fork 后子进程中没有写入线程，重新创建队列
+    os.register_at_fork(after_in_child=writer._reset)
@@ -0,0 +1,284 @@
+"""
+离线泄露密码检查模块
+将 HIBP 格式（"SHA1:次数"）的泄露库转换为按哈希排序的定长二进制文件，
+查询时先经内存中的 Bloom 过滤器预筛，可能命中时再通过 mmap 二分查找，无需联网
+"""
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from config import Config
+
+# 索引记录: SHA-1 摘要(20) + 出现次数(uint32，大端)
+RECORD = struct.Struct('>20sI')
+RECORD_SIZE = RECORD.size
+
+_BLOOM_MAGIC = b'PWBLOOM1'
+_BLOOM_HEADER = struct.Struct('>8sQI')  # magic, 位数, 哈希函数个数
+
+
+class BloomFilter:
+    """
+    Bloom 过滤器
+
+    元素本身就是 SHA-1 摘要（均匀分布），直接取摘要的两段 64 位整数做双重哈希，
+    不再额外计算哈希函数。
+    """
+
+    def __init__(self, bit_count, hash_count, bits=None):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray((bit_count + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, bits_per_entry):
+        """按预期元素个数与每个元素占用的位数创建过滤器"""
+        bit_count = max(64, capacity * bits_per_entry)
+        hash_count = max(1, round(bits_per_entry * math.log(2)))
+        return cls(bit_count, hash_count)
+
+    def _positions(self, digest):
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        m = self.bit_count
+        return [(h1 + i * h2) % m for i in range(self.hash_count)]
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def save(self, path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, self.bit_count, self.hash_count))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            magic, bit_count, hash_count = _BLOOM_HEADER.unpack(f.read(_BLOOM_HEADER.size))
+            if magic != _BLOOM_MAGIC:
+                raise ValueError(f'无效的 Bloom 过滤器文件: {path}')
+            return cls(bit_count, hash_count, bytearray(f.read()))
+
+
+def _parse_line(line):
+    """解析 "SHA1HEX:COUNT" 行，格式错误返回 None"""
+    line = line.strip()
+    if not line:
+        return None
+    hex_digest, _, count = line.partition(b':')
+    if len(hex_digest) != 40:
+        return None
+    try:
+        return bytes.fromhex(hex_digest.decode('ascii')), min(int(count or 1), 0xFFFFFFFF)
+    except ValueError:
+        return None
+
+
+def _write_run(records, directory):
+    """排序一批记录并写入临时文件"""
+    records.sort()
+    f = tempfile.NamedTemporaryFile(dir=directory, prefix='breach_run_', delete=False)
+    with f:
+        for digest, count in records:
+            f.write(RECORD.pack(digest, count))
+    return f.name
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(RECORD_SIZE * 4096)
+            if not chunk:
+                break
+            yield from RECORD.iter_unpack(chunk)
+
+
+def build_index(source_path, index_path, chunk_records=5_000_000, bits_per_entry=None):
+    """
+    将 HIBP 格式的泄露库转换为排序的定长二进制索引和 Bloom 过滤器
+
+    源文件可能有数 GB，按 chunk_records 条分块排序后写入临时文件，再多路归并，
+    内存占用与源文件大小无关（Bloom 过滤器除外）。
+
+    Args:
+        source_path: 源文件路径，每行 "SHA1HEX:COUNT"
+        index_path: 输出索引路径，Bloom 过滤器写入 index_path + '.bloom'
+        chunk_records: 每块排序的记录数
+        bits_per_entry: Bloom 过滤器每条记录占用的位数
+
+    Returns:
+        写入的记录数
+    """
+    bits_per_entry = bits_per_entry or Config.BREACH_BLOOM_BITS_PER_ENTRY
+    directory = os.path.dirname(os.path.abspath(index_path))
+    os.makedirs(directory, exist_ok=True)
+
+    runs = []
+    total = 0
+    try:
+        records = []
+        with open(source_path, 'rb') as f:
+            for line in f:
+                record = _parse_line(line)
+                if record is None:
+                    continue
+                records.append(record)
+                if len(records) >= chunk_records:
+                    runs.append(_write_run(records, directory))
+                    total += len(records)
+                    records = []
+        if records:
+            runs.append(_write_run(records, directory))
+            total += len(records)
+
+        bloom = BloomFilter.for_capacity(total, bits_per_entry)
+        written = 0
+        tmp_path = f'{index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as out:
+            previous = None
+            for digest, count in heapq.merge(*[_read_run(path) for path in runs]):
+                if digest == previous:
+                    continue
+                previous = digest
+                out.write(RECORD.pack(digest, count))
+                bloom.add(digest)
+                written += 1
+        os.replace(tmp_path, index_path)
+        bloom.save(index_path + '.bloom')
+        return written
+    finally:
+        for path in runs:
+            os.remove(path)
+
+
+class BreachIndex:
+    """mmap 映射的泄露库索引"""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        with open(index_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % RECORD_SIZE:
+                raise ValueError(f'无效的泄露库索引文件: {index_path}')
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.record_count = size // RECORD_SIZE
+        bloom_path = index_path + '.bloom'
+        self.bloom = BloomFilter.load(bloom_path) if os.path.exists(bloom_path) else None
+        self.bloom_rejections = 0
+        self.disk_lookups = 0
+
+    def lookup_digest(self, digest):
+        """
+        查询 SHA-1 摘要的出现次数
+
+        Returns:
+            出现次数，未出现返回 0
+        """
+        if self.bloom is not None and digest not in self.bloom:
+            self.bloom_rejections += 1
+            return 0
+        self.disk_lookups += 1
+
+        mm = self._mm
+        lo, hi = 0, self.record_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = mid * RECORD_SIZE
+            current = mm[offset:offset + 20]
+            if current < digest:
+                lo = mid + 1
+            elif current > digest:
+                hi = mid
+            else:
+                return RECORD.unpack_from(mm, offset)[1]
+        return 0
+
+    def lookup(self, password):
+        """查询密码在泄露库中的出现次数"""
+        return self.lookup_digest(hashlib.sha1(password.encode('utf-8')).digest())
+
+
+_index = None
+_index_path = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """加载配置中的泄露库索引，文件不存在时返回 None"""
+    global _index, _index_path
+    path = Config.BREACH_INDEX_PATH
+    if _index is not None and _index_path == path:
+        return _index
+    if not path or not os.path.exists(path):
+        return None
+    with _index_lock:
+        if _index is None or _index_path != path:
+            _index = BreachIndex(path)
+            _index_path = path
+    return _index
+
+
+def breach_count(password):
+    """
+    查询密码在泄露库中的出现次数
+
+    Returns:
+        出现次数；未配置泄露库或检查已关闭时返回 0
+    """
+    if Config.BREACH_CHECK_MODE == 'off' or not password:
+        return 0
+    index = get_index()
+    return index.lookup(password) if index is not None else 0
+
+
+def generate_unbreached(generate, attempts=10):
+    """
+    生成密码，结果出现在泄露库中时重新生成
+
+    Args:
+        generate: 无参数的密码生成函数
+        attempts: 最多尝试次数（如 6 位 PIN 几乎全部出现在泄露库中，不能无限重试）
+
+    Returns:
+        (密码, 出现次数)
+    """
+    for _ in range(attempts):
+        password = generate()
+        breached = breach_count(password)
+        if not breached:
+            break
+    return password, breached
+
+
+def replace_breached(passwords, generate_many, attempts=10):
+    """
+    批量检查密码，出现在泄露库中的逐轮重新生成
+
+    Args:
+        passwords: 已生成的密码列表
+        generate_many: 生成函数，generate_many(n) 返回 n 个新密码
+        attempts: 每个位置最多尝试次数（含首次生成）
+
+    Returns:
+        [(密码, 出现次数), ...]，顺序与输入一致；重试用尽仍泄露的保留最后一次结果
+    """
+    results = [(password, breach_count(password)) for password in passwords]
+    for _ in range(attempts - 1):
+        retry = [i for i, (_, breached) in enumerate(results) if breached]
+        if not retry:
+            break
+        for i, password in zip(retry, generate_many(len(retry))):
+            results[i] = (password, breach_count(password))
+    return results
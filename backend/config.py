@@ -12,6 +12,8 @@ class Config:
 
     # 基础配置
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-this-in-production'
+    # 密码指纹密钥（修改后需重新执行 migrate_fingerprints.py --rebuild）
+    FINGERPRINT_KEY = os.environ.get('FINGERPRINT_KEY') or SECRET_KEY
 
     # 数据库配置 - 使用当前工作目录确保持久化
     # 打包后工作目录是 EXE 所在目录，开发环境是项目根目录
@@ -19,6 +21,22 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(BASE_DIR, "database.db")}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite 连接配置 - 每个连接建立时执行所选配置的 PRAGMA（见 database.py）
+    SQLITE_PROFILES = {
+        'default': {},  # SQLite 默认行为（回滚日志，读写互相阻塞）
+        'production': {
+            'journal_mode': 'WAL',  # 读写互不阻塞
+            'synchronous': 'NORMAL',  # WAL 下断电最多丢失最近提交的事务，不会损坏数据库
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # 负数单位为 KB，即 64MB 页缓存
+            'busy_timeout': 5000,  # 等待写锁的毫秒数
+            'temp_store': 'MEMORY',
+        },
+    }
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+    SQLITE_READ_ENGINE = os.environ.get('SQLITE_READ_ENGINE', '0') == '1'  # GET 请求使用独立的只读连接池
+    SQLITE_READ_POOL_SIZE = 8
+
     # 文件上传配置 - 使用当前工作目录
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
@@ -27,3 +45,80 @@ class Config:
     # 图片优化配置
     MAX_IMAGE_SIZE = 800  # 最大尺寸800×800
     IMAGE_QUALITY = 85  # 压缩质量85%
+
+    # 密码生成配置
+    PASSWORD_BATCH_MAX_COUNT = 10000  # 批量生成单次最大数量
+    PASSWORD_STREAM_MAX_COUNT = 10_000_000  # 流式生成单次最大数量
+    ENTROPY_POOL_SIZE = int(os.environ.get('ENTROPY_POOL_SIZE', 64 * 1024))  # 熵池每次补充的字节数
+
+    # 生成策略配置
+    POLICY_MIN_LENGTH = 4
+    POLICY_MAX_LENGTH = 128
+    PASSWORD_POLICIES = {}  # 自定义命名策略，如 {'wifi': {'length': 20, 'exclude_ambiguous': True}}
+
+    # 口令短语配置 - 默认使用 EFF 长词表（需自行下载放置到 wordlists 目录）
+    PASSPHRASE_WORDLIST = os.environ.get('PASSPHRASE_WORDLIST') or os.path.join(BASE_DIR, 'wordlists', 'eff_large_wordlist.txt')
+    PASSPHRASE_MIN_WORDS = 4
+    PASSPHRASE_MAX_WORDS = 12
+
+    # 可读密码（马尔可夫模型）配置
+    PRONOUNCEABLE_CORPUS = os.environ.get('PRONOUNCEABLE_CORPUS')  # 训练语料，默认使用 backend/data/english.txt
+    PRONOUNCEABLE_ORDER = 2  # n-gram 上下文长度
+    PRONOUNCEABLE_MIN_LENGTH = 8
+    PRONOUNCEABLE_MAX_LENGTH = 64
+    PRONOUNCEABLE_MAX_DIGITS = 8
+    PRONOUNCEABLE_MIN_ENTROPY = 50  # 最低熵（比特），未指定长度时据此选择长度
+
+    # 强度评估配置
+    STRENGTH_CACHE_SIZE = 10000  # 评估结果 LRU 缓存条数
+    STRENGTH_BATCH_MAX_COUNT = 10000  # 批量评估单次最大数量
+    STRENGTH_MAX_LENGTH = 1024  # 单个密码的最大长度
+    STRENGTH_BATCH_MAX_CHARS = 1_000_000  # 批量评估单次的总字符数
+
+    # 泄露密码检查配置 - 索引由 build_breach_index.py 从 HIBP 格式文件生成
+    BREACH_INDEX_PATH = os.environ.get('BREACH_INDEX_PATH') or os.path.join(BASE_DIR, 'breach', 'pwned-passwords.idx')
+    BREACH_CHECK_MODE = os.environ.get('BREACH_CHECK_MODE', 'flag')  # off: 不检查, flag: 标记, reject: 拒绝保存
+    BREACH_BLOOM_BITS_PER_ENTRY = 10  # Bloom 过滤器每条记录的位数（约 1% 误判率）
+
+    # 安全审计配置
+    AUDIT_CHUNK_SIZE = 1000  # 每块读取和评分的记录数
+    AUDIT_MAX_PENDING_CHUNKS = 8  # 进程池中同时等待评分的块数上限，评分完成的块立即写入
+    AUDIT_MAX_AGE_DAYS = 180  # 超过该天数未修改的密码标记为过旧
+    AUDIT_WORKERS = int(os.environ.get('AUDIT_WORKERS', 0)) or None  # 进程池大小，默认为 CPU 核数
+
+    # 相似密码检测配置
+    SIMILARITY_CACHE_USERS = 64  # 进程内缓存 BK 树的用户数
+    SIMILARITY_CACHE_TTL = 300  # BK 树（含解密后的密码）的缓存时间（秒），从构建时开始计算
+    SIMILARITY_MAX_DISTANCE = 3  # 允许查询的最大编辑距离
+
+    # 收藏内容加密格式 - 启动时在后台将旧格式转换为当前格式（v3，用户数据密钥加密）
+    FAVORITES_BACKGROUND_CONVERT = os.environ.get('FAVORITES_BACKGROUND_CONVERT', '1') != '0'
+    # 密码记录加密 - 启动时在后台分块加密旧数据中的明文密码（进度保存在 migration_checkpoints 表），并回填缺失的密码指纹
+    PASSWORDS_BACKGROUND_ENCRYPT = os.environ.get('PASSWORDS_BACKGROUND_ENCRYPT', '1') != '0'
+
+    # 信封加密配置 - 每个用户的数据密钥由主密钥（ENCRYPTION_KEY）包装
+    DATA_KEY_CACHE_SIZE = 1024  # 解包后数据密钥的缓存用户数
+    DATA_KEY_CACHE_TTL = 300  # 缓存有效期（秒）
+    # 更换主密钥期间仍可用于解密和解包数据密钥的旧主密钥（环境变量逗号分隔，构成全局 crypto 的 previous）
+    ENCRYPTION_KEY_PREVIOUS = [k for k in os.environ.get('ENCRYPTION_KEY_PREVIOUS', '').split(',') if k]
+
+    # 登录密码哈希配置 - werkzeug 格式的 KDF 参数，修改后旧哈希在用户下次登录时升级
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or min(4, os.cpu_count() or 1)  # 同时计算的哈希数
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))  # 最多排队的哈希请求数，超过时返回 503
+    PASSWORD_HASH_TIMEOUT = 30  # 等待哈希结果的最长时间（秒）
+
+    # 登录与注册限流 - (次数, 秒)：每个 IP / 每个用户名在该时间内最多尝试的次数
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+    AUTH_RATE_LIMIT_IP = (20, 60)
+    AUTH_RATE_LIMIT_USERNAME = (5, 60)
+    RATE_LIMIT_MAX_KEYS = 100000  # 每个限流器最多跟踪的键数
+
+    # 注册时密码备份文件的后台写入
+    BACKUP_WRITER_BATCH_SIZE = 64  # 每批最多写入的文件数（同一批次的目录只 fsync 一次）
+    BACKUP_WRITER_INTERVAL = 0.05  # 等待更多文件加入同一批次的秒数
+
+    # 认证令牌配置
+    TOKEN_EXPIRES_DAYS = 7  # 令牌有效期（天）
+    TOKEN_CACHE_SIZE = 4096  # 已验证令牌的 LRU 缓存条数
+    TOKEN_REVOCATION_REFRESH = 30  # 从数据库同步吊销列表的间隔（秒），多进程部署时其他进程的吊销在此时间内生效
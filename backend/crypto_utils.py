@@ -1,41 +1,237 @@
 """
 AES加密工具模块
 用于剪贴板内容的加密和解密
+
+密钥在第一次加密/解密时才派生（PBKDF2 10 万轮），导入模块不再产生开销。
+派生结果可以通过以下方式提供，使新进程完全跳过 PBKDF2：
+    ENCRYPTION_DERIVED_KEY  直接提供派生后的 Fernet 密钥（python backend/crypto_utils.py 输出）
+    ENCRYPTION_KEYFILE      密钥缓存文件路径，首次派生后写入（权限 0600），之后直接读取
+
+两种密文格式：
+    v1  encrypt/decrypt：Fernet token 再做一次 Base64 的字符串（Text 列，旧数据）
+    v2  encrypt_blob/decrypt_blob：版本字节 + 12 字节 nonce + AES-256-GCM 密文与标签（BLOB 列），
+        AES 密钥由 Fernet 密钥经 HKDF 派生，体积约为 v1 的一半，读写不再做 Base64 编解码
+
+主密钥还用于包装每个用户的数据密钥（wrap_key/unwrap_key，见 envelope.py）。
+
+更换主密钥期间，旧密钥通过 previous 传入（全局实例取自 Config.ENCRYPTION_KEY_PREVIOUS）：
+解密和解包时依次尝试当前密钥和各个旧密钥（类似 MultiFernet），加密始终使用当前密钥。
+
+批量加解密（encrypt_many/decrypt_many 等）分块提交到线程池；cryptography 在 OpenSSL 调用期间释放 GIL，
+线程数由 ENCRYPTION_WORKERS 配置（默认 CPU 核数）
 """
-import os
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
 import base64
+import hashlib
+import hmac
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+# PBKDF2 参数（修改会导致已有数据无法解密）
+KDF_SALT = b'salt_value_should_be_random'
+KDF_ITERATIONS = 100000
+
+_DEFAULT_PASSWORD = 'default-secret-key-change-this'
+
+# v2 密文格式
+FORMAT_V2 = 2
+_V2_NONCE_SIZE = 12
+_V2_HKDF_INFO = b'password-manager content v2'
+
+# 数据密钥包装
+_WRAP_HKDF_INFO = b'password-manager key wrap'
+_KEY_ID_HKDF_INFO = b'password-manager key id'
+
+# 少于该数量时批量接口直接在当前线程执行
+PARALLEL_THRESHOLD = 256
+# 每个任务至少处理的条数（减少任务调度开销）
+MIN_CHUNK_SIZE = 64
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _worker_count():
+    return int(os.environ.get('ENCRYPTION_WORKERS') or os.cpu_count() or 1)
+
+
+def _get_executor():
+    """获取批量加解密使用的线程池（首次使用时创建）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_worker_count(), thread_name_prefix='crypto')
+    return _executor
+
+
+def _reset_executor():
+    """fork 后子进程不能复用父进程的线程池"""
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+def parallel_map(func, values):
+    """按块在线程池中对 values 逐个执行 func，保持顺序（数量较少或单线程时直接执行）"""
+    values = list(values)
+    workers = _worker_count()
+    if len(values) < PARALLEL_THRESHOLD or workers <= 1:
+        return [func(value) for value in values]
+
+    chunk_size = max(MIN_CHUNK_SIZE, -(-len(values) // workers))
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    results = []
+    for chunk_result in _get_executor().map(lambda chunk: [func(value) for value in chunk], chunks):
+        results.extend(chunk_result)
+    return results
+
+
+def derive_key(password):
+    """使用 PBKDF2 从密码派生 Fernet 密钥（urlsafe base64 字符串）"""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.backends import default_backend
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=KDF_SALT,
+        iterations=KDF_ITERATIONS,
+        backend=default_backend()
+    )
+    return base64.urlsafe_b64encode(kdf.derive(password.encode())).decode()
+
+
+def _key_check(key, password):
+    """密钥缓存文件的校验值，用于发现 ENCRYPTION_KEY 已更换"""
+    return hmac.new(key.encode(), password.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _read_keyfile(path, password):
+    """读取密钥缓存文件，不存在、格式错误或与当前密码不匹配时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        key = data['key']
+        if data.get('iterations') != KDF_ITERATIONS or not hmac.compare_digest(
+            data.get('check', ''), _key_check(key, password)
+        ):
+            return None
+        return key
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_keyfile(path, password, key):
+    """写入密钥缓存文件（仅所有者可读写），失败时忽略"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'iterations': KDF_ITERATIONS, 'key': key, 'check': _key_check(key, password)}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"密钥缓存文件写入失败: {str(e)}")
 
 
 class CryptoManager:
     """加密管理器"""
 
-    def __init__(self, password=None):
+    def __init__(self, password=None, key=None, keyfile=None, previous=None):
         """
-        初始化加密管理器
+        初始化加密管理器（不派生密钥）
 
         Args:
             password: 加密密码，如果为None则使用系统默认密钥
+            key: 已派生的 Fernet 密钥，提供时跳过 PBKDF2
+            keyfile: 密钥缓存文件路径
+            previous: 旧密钥的 CryptoManager 列表，当前密钥解密失败时依次尝试
         """
-        self.password = password or os.environ.get('ENCRYPTION_KEY', 'default-secret-key-change-this')
-        self.fernet = self._get_fernet()
+        self.password = password or os.environ.get('ENCRYPTION_KEY', _DEFAULT_PASSWORD)
+        self.keyfile = keyfile
+        self.previous = list(previous or [])
+        self._key = key
+        self._fernet = None
+        self._subkeys = {}  # HKDF info -> AESGCM
+        self._key_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def fernet(self):
+        """Fernet 实例（首次访问时创建）"""
+        if self._fernet is None:
+            with self._lock:
+                if self._fernet is None:
+                    self._fernet = self._get_fernet()
+        return self._fernet
+
+    @property
+    def aead(self):
+        """v2 格式使用的 AESGCM 实例（首次访问时创建）"""
+        return self._subkey(_V2_HKDF_INFO)
+
+    @property
+    def key_id(self):
+        """主密钥标识（不泄露密钥本身），用于记录数据密钥由哪个主密钥包装"""
+        if self._key_id is None:
+            with self._lock:
+                if self._key_id is None:
+                    self._key_id = self._derive(_KEY_ID_HKDF_INFO)[:8].hex()
+        return self._key_id
+
+    def _subkey(self, info):
+        """由主密钥经 HKDF 派生的 AESGCM 实例（按 info 缓存）"""
+        aead = self._subkeys.get(info)
+        if aead is None:
+            with self._lock:
+                aead = self._subkeys.get(info)
+                if aead is None:
+                    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+                    aead = self._subkeys[info] = AESGCM(self._derive(info))
+        return aead
+
+    def _load_key(self):
+        """依次使用传入的密钥、密钥缓存文件和 PBKDF2 派生得到 Fernet 密钥（需持有 _lock）"""
+        if self._key is None and self.keyfile:
+            self._key = _read_keyfile(self.keyfile, self.password)
+        if self._key is None:
+            self._key = derive_key(self.password)
+            if self.keyfile:
+                _write_keyfile(self.keyfile, self.password, self._key)
+        return self._key
 
     def _get_fernet(self):
         """从密码生成Fernet实例"""
-        # 使用PBKDF2从密码派生密钥
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b'salt_value_should_be_random',
-            iterations=100000,
-            backend=default_backend()
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(self.password.encode()))
-        return Fernet(key)
+        from cryptography.fernet import Fernet
+        return Fernet(self._load_key())
+
+    def _derive(self, info):
+        """由 Fernet 密钥经 HKDF 派生 32 字节子密钥（需持有 _lock）"""
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info)
+        return hkdf.derive(base64.urlsafe_b64decode(self._load_key()))
+
+    def _with_previous(self, method, *args):
+        """先用当前密钥执行 method（方法名），失败（ValueError）时依次用旧密钥重试"""
+        try:
+            return getattr(self, method)(*args)
+        except ValueError:
+            for manager in self.previous:
+                try:
+                    return getattr(manager, method)(*args)
+                except ValueError:
+                    continue
+            raise
 
     def encrypt(self, data):
         """
@@ -62,6 +258,10 @@ class CryptoManager:
         Returns:
             解密后的原始字符串
         """
+        return self._with_previous('_decrypt', encrypted_data)
+
+    def _decrypt(self, encrypted_data):
+        """只用当前密钥解密 v1 格式"""
         if not encrypted_data:
             return ''
         try:
@@ -71,9 +271,122 @@ class CryptoManager:
         except Exception as e:
             raise ValueError(f"解密失败: {str(e)}")
 
+    def encrypt_blob(self, data):
+        """
+        加密为 v2 格式
+
+        Args:
+            data: 待加密的字符串
+
+        Returns:
+            bytes: 版本字节 + nonce + 密文；data 为空时返回 None
+        """
+        if not data:
+            return None
+        nonce = os.urandom(_V2_NONCE_SIZE)
+        return bytes((FORMAT_V2,)) + nonce + self.aead.encrypt(nonce, data.encode(), None)
+
+    def decrypt_blob(self, blob):
+        """
+        解密 v2 格式
+
+        Args:
+            blob: encrypt_blob 的结果
+
+        Returns:
+            解密后的原始字符串
+        """
+        return self._with_previous('_decrypt_blob', blob)
+
+    def _decrypt_blob(self, blob):
+        """只用当前密钥解密 v2 格式"""
+        if not blob:
+            return ''
+        blob = bytes(blob)
+        if blob[0] != FORMAT_V2:
+            raise ValueError(f"解密失败: 不支持的密文版本 {blob[0]}")
+        try:
+            nonce = blob[1:1 + _V2_NONCE_SIZE]
+            return self.aead.decrypt(nonce, blob[1 + _V2_NONCE_SIZE:], None).decode()
+        except Exception as e:
+            raise ValueError(f"解密失败: {str(e)}")
+
+    def _map(self, func, values):
+        """批量执行前先完成密钥派生，避免线程池中各线程排队等待"""
+        self.fernet, self.aead
+        return parallel_map(func, values)
+
+    def wrap_key(self, data_key, aad):
+        """
+        用主密钥包装数据密钥
+
+        Args:
+            data_key: 数据密钥（bytes）
+            aad: 绑定的附加数据（如用户 ID），解包时必须一致
+
+        Returns:
+            bytes: nonce + 密文
+        """
+        nonce = os.urandom(_V2_NONCE_SIZE)
+        return nonce + self._subkey(_WRAP_HKDF_INFO).encrypt(nonce, data_key, aad)
+
+    def unwrap_key(self, wrapped, aad):
+        """解包数据密钥（依次尝试当前密钥和旧密钥），均不匹配或 aad 不匹配时抛出 ValueError"""
+        return self._with_previous('_unwrap_key', wrapped, aad)
+
+    def _unwrap_key(self, wrapped, aad):
+        """只用当前密钥解包数据密钥"""
+        wrapped = bytes(wrapped)
+        try:
+            return self._subkey(_WRAP_HKDF_INFO).decrypt(wrapped[:_V2_NONCE_SIZE], wrapped[_V2_NONCE_SIZE:], aad)
+        except Exception as e:
+            raise ValueError(f"数据密钥解包失败: {str(e)}")
+
+    def encrypt_many(self, values):
+        """
+        批量加密
+
+        Args:
+            values: 待加密的字符串列表
+
+        Returns:
+            加密后的字符串列表（与输入顺序一致）
+        """
+        return self._map(self.encrypt, values)
+
+    def decrypt_many(self, values):
+        """
+        批量解密
+
+        Args:
+            values: 加密的字符串列表
+
+        Returns:
+            解密后的字符串列表（与输入顺序一致），任一元素解密失败时抛出 ValueError
+        """
+        return self._map(self.decrypt, values)
+
+    def encrypt_blob_many(self, values):
+        """批量加密为 v2 格式（与输入顺序一致）"""
+        return self._map(self.encrypt_blob, values)
+
+    def decrypt_blob_many(self, values):
+        """批量解密 v2 格式（与输入顺序一致）"""
+        return self._map(self.decrypt_blob, values)
+
 
 # 从环境变量获取加密密钥
-_ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY', 'default-secret-key-change-this')
+_ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY', _DEFAULT_PASSWORD)
+
+# 全局加密管理器实例（密钥延迟派生），更换主密钥期间可解密旧密钥加密的内容
+crypto = CryptoManager(
+    password=_ENCRYPTION_KEY,
+    key=os.environ.get('ENCRYPTION_DERIVED_KEY') or None,
+    keyfile=os.environ.get('ENCRYPTION_KEYFILE') or None,
+    previous=[CryptoManager(k) for k in Config.ENCRYPTION_KEY_PREVIOUS]
+)
+
 
-# 全局加密管理器实例
-crypto = CryptoManager(password=_ENCRYPTION_KEY)
+if __name__ == '__main__':
+    # 输出当前 ENCRYPTION_KEY 对应的派生密钥，可设置为 ENCRYPTION_DERIVED_KEY
+    print(derive_key(_ENCRYPTION_KEY))
@@ -0,0 +1,74 @@
+"""
+SQLite 连接配置
+每个新连接建立时执行 SQLITE_PROFILES 中所选配置的 PRAGMA（默认 production：WAL、synchronous=NORMAL、
+mmap、页缓存、busy_timeout、临时表放内存），WAL 模式下读写互不阻塞。
+
+SQLITE_READ_ENGINE 开启时另建一个只读连接池（mode=ro），GET 请求中的查询使用该连接池，
+长时间的导出不会占用写连接；写入（flush 与 INSERT/UPDATE/DELETE）始终使用主引擎。
+同一个 GET 请求内，只读连接看不到尚未提交的写入。
+"""
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# 对数据库文件持久生效、只读连接无法设置的 PRAGMA
+_WRITE_ONLY_PRAGMAS = {'journal_mode'}
+
+
+def _on_connect(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def apply_pragmas(engine, pragmas):
+    """为引擎的每个新连接设置 PRAGMA"""
+    if pragmas:
+        event.listen(engine, 'connect', _on_connect(pragmas))
+
+
+def read_only_url(url):
+    """同一数据库文件的只读连接 URL（SQLite URI 文件名，mode=ro）"""
+    url = make_url(url)
+    return url.set(database=f'file:{url.database}', query={'mode': 'ro', 'uri': 'true'})
+
+
+def configure_engines(app, engine):
+    """
+    按配置设置 SQLite 主引擎，并按需创建只读引擎（需在首次连接数据库之前调用）
+
+    只读引擎保存在 app.extensions['read_engine']。
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = app.config['SQLITE_PROFILES'][app.config['SQLITE_PROFILE']]
+    apply_pragmas(engine, pragmas)
+
+    database = engine.url.database
+    if app.config['SQLITE_READ_ENGINE'] and database and database != ':memory:':
+        read_engine = create_engine(read_only_url(engine.url), pool_size=app.config['SQLITE_READ_POOL_SIZE'])
+        apply_pragmas(read_engine, {k: v for k, v in pragmas.items() if k not in _WRITE_ONLY_PRAGMAS})
+        app.extensions['read_engine'] = read_engine
+
+
+class RoutingSession(Session):
+    """GET 请求中的查询使用只读引擎（已配置时），其他情况与 Flask-SQLAlchemy 默认行为一致"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and has_request_context()
+            and request.method == 'GET'
+        ):
+            read_engine = current_app.extensions.get('read_engine')
+            if read_engine is not None:
+                return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,323 @@
+"""
+信封加密模块
+每个用户一个随机数据密钥（AES-256-GCM），由主密钥（ENCRYPTION_KEY 派生）包装后存放在 users 表，
+收藏内容用所属用户的数据密钥加密（v3 格式）。更换主密钥只需重新包装数据密钥，无需重新加密收藏。
+
+数据密钥在注册时与用户一起创建，升级前注册的用户由启动时的 create_missing_data_keys 补齐；
+解包后的数据密钥缓存在有界的 TTL LRU 中，活跃用户只需解包一次。
+
+v3 格式: 版本字节(3) + 12 字节 nonce + AES-256-GCM 密文与标签，附加数据为用户 ID
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, event, select, update
+
+from config import Config
+from crypto_utils import crypto, parallel_map
+from database import RoutingSession
+
+FORMAT_V3 = 3
+_NONCE_SIZE = 12
+_DATA_KEY_SIZE = 32
+
+
+def _aad(user_id):
+    return f'user:{user_id}'.encode()
+
+
+class DataKeyCache:
+    """解包后数据密钥的有界 TTL LRU 缓存"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # user_id -> (过期时间, AESGCM)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, aead):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, aead)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """移除指定用户（None 表示全部）的缓存"""
+        with self._lock:
+            if user_id is None:
+                self._data.clear()
+            else:
+                self._data.pop(user_id, None)
+
+
+# 全局缓存实例
+cache = DataKeyCache(Config.DATA_KEY_CACHE_SIZE, Config.DATA_KEY_CACHE_TTL)
+
+
+def _master_for(key_id):
+    """
+    按 key_id 查找包装数据密钥的主密钥
+
+    除当前主密钥外，还会查找 crypto.previous 中的旧主密钥（ENCRYPTION_KEY_PREVIOUS，更换主密钥期间使用）。
+    """
+    if key_id is None or key_id == crypto.key_id:
+        return crypto
+    for master in crypto.previous:
+        if master.key_id == key_id:
+            return master
+    raise ValueError(f'找不到包装数据密钥的主密钥: {key_id}')
+
+
+def _users_table():
+    from models import User
+    return User.__table__
+
+
+def _wrap_new_key(user_id):
+    """生成新的数据密钥，返回 (数据密钥, 包装后的数据密钥)"""
+    data_key = os.urandom(_DATA_KEY_SIZE)
+    return data_key, crypto.wrap_key(data_key, _aad(user_id))
+
+
+# 会话中新建但尚未提交的数据密钥（session.info 中的键，值为用户 ID 集合）
+_NEW_KEYS = 'envelope_new_data_keys'
+
+
+def create_data_key(user_id):
+    """
+    在调用方会话中为用户创建数据密钥，与调用方的修改一起提交
+
+    只在 data_key 为空时写入（条件 UPDATE），并发创建时以先写入的为准；
+    会话回滚时新密钥随之撤销，并从缓存中移除（见 _discard_new_keys）。
+
+    Returns:
+        新数据密钥的 AESGCM 实例；用户已有数据密钥时返回 None
+    """
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from models import db
+
+    users = _users_table()
+    data_key, wrapped = _wrap_new_key(user_id)
+    result = db.session.execute(
+        update(users).where(users.c.id == user_id, users.c.data_key.is_(None)).values(
+            data_key=wrapped, data_key_id=crypto.key_id
+        )
+    )
+    if result.rowcount != 1:
+        return None
+    aead = AESGCM(data_key)
+    cache.put(user_id, aead)
+    db.session.info.setdefault(_NEW_KEYS, set()).add(user_id)
+    return aead
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _keep_new_keys(session):
+    session.info.pop(_NEW_KEYS, None)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_new_keys(session):
+    """回滚后新建的数据密钥不存在于数据库中，不能继续留在缓存里"""
+    for user_id in session.info.pop(_NEW_KEYS, ()):
+        cache.invalidate(user_id)
+
+
+def _load_data_key(user_id):
+    """
+    读取并解包用户的数据密钥，用户还没有数据密钥时创建
+
+    读写都在调用方会话中进行（注册时已创建数据密钥，这里只处理遗漏的旧用户），
+    不会与调用方已刷新但未提交的修改争用写锁。
+    """
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from models import db
+
+    users = _users_table()
+    query = select(users.c.data_key, users.c.data_key_id).where(users.c.id == user_id)
+    row = db.session.execute(query).first()
+    if row is not None and row.data_key is None:
+        aead = create_data_key(user_id)
+        if aead is not None:
+            return aead
+        row = db.session.execute(query).first()
+    if row is None:
+        raise ValueError(f'用户不存在: {user_id}')
+    return AESGCM(_master_for(row.data_key_id).unwrap_key(row.data_key, _aad(user_id)))
+
+
+def get_data_key(user_id):
+    """获取用户数据密钥对应的 AESGCM 实例（优先使用缓存）"""
+    aead = cache.get(user_id)
+    if aead is None:
+        aead = _load_data_key(user_id)
+        cache.put(user_id, aead)
+    return aead
+
+
+def _encrypt_with(aead, user_id, data):
+    """用已解析的数据密钥加密（v3 格式），data 为空时返回 None"""
+    if not data:
+        return None
+    nonce = os.urandom(_NONCE_SIZE)
+    return bytes((FORMAT_V3,)) + nonce + aead.encrypt(nonce, data.encode(), _aad(user_id))
+
+
+def _decrypt_with(aead, user_id, blob):
+    """用已解析的数据密钥解密（v3 格式），v2 格式使用全局密钥"""
+    if not blob:
+        return ''
+    blob = bytes(blob)
+    if blob[0] != FORMAT_V3:
+        return crypto.decrypt_blob(blob)
+    try:
+        nonce = blob[1:1 + _NONCE_SIZE]
+        return aead.decrypt(nonce, blob[1 + _NONCE_SIZE:], _aad(user_id)).decode()
+    except Exception as e:
+        raise ValueError(f"解密失败: {str(e)}")
+
+
+def encrypt(user_id, data):
+    """
+    用用户数据密钥加密（v3 格式）
+
+    Returns:
+        bytes；data 为空时返回 None
+    """
+    if not data:
+        return None
+    return _encrypt_with(get_data_key(user_id), user_id, data)
+
+
+def decrypt(user_id, blob):
+    """解密 BLOB 格式的内容（v3 使用用户数据密钥，v2 使用全局密钥）"""
+    if not blob:
+        return ''
+    blob = bytes(blob)
+    if blob[0] != FORMAT_V3:
+        return crypto.decrypt_blob(blob)
+    return _decrypt_with(get_data_key(user_id), user_id, blob)
+
+
+# 批量接口在调用线程中解析一次数据密钥，工作线程只使用解析好的密钥：
+# 缓存项在批处理中途过期时，工作线程不会在没有应用上下文的情况下查询数据库
+
+def encrypt_many(user_id, values):
+    """批量加密同一用户的内容（与输入顺序一致）"""
+    values = list(values)
+    if not values:
+        return []
+    aead = get_data_key(user_id)
+    return parallel_map(lambda value: _encrypt_with(aead, user_id, value), values)
+
+
+def decrypt_many(user_id, blobs):
+    """批量解密同一用户的内容（与输入顺序一致）"""
+    blobs = list(blobs)
+    if not blobs:
+        return []
+    aead = get_data_key(user_id)
+    return parallel_map(lambda blob: _decrypt_with(aead, user_id, blob), blobs)
+
+
+def create_missing_data_keys(chunk_size=1000):
+    """
+    为还没有数据密钥的用户分块创建数据密钥（升级前注册的用户）
+
+    每块在线程池中生成并包装密钥，再用一次批量条件 UPDATE 写入并提交，可与应用同时运行。
+
+    Returns:
+        创建的数据密钥个数
+    """
+    from models import db
+
+    users = _users_table()
+    statement = update(users).where(
+        users.c.id == bindparam('user_id'), users.c.data_key.is_(None)
+    ).values(data_key=bindparam('new_key'), data_key_id=crypto.key_id)
+    created = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(users.c.id).where(users.c.id > last_id, users.c.data_key.is_(None))
+            .order_by(users.c.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        keys = parallel_map(lambda user_id: _wrap_new_key(user_id)[1], ids)
+        result = db.session.execute(statement, [
+            {'user_id': user_id, 'new_key': key} for user_id, key in zip(ids, keys)
+        ])
+        db.session.commit()
+        created += result.rowcount if result.rowcount >= 0 else len(ids)
+        last_id = ids[-1]
+    return created
+
+
+def rotate_master_key(old_crypto, new_crypto, chunk_size=1000, progress=None):
+    """
+    用新主密钥重新包装所有数据密钥（v3 内容不变）
+
+    只处理由旧主密钥包装的行（data_key_id 即进度），中断后可重复执行；
+    每块在线程池中解包并重新包装，再用一次批量条件 UPDATE 写回。
+
+    Args:
+        old_crypto: 旧主密钥的 CryptoManager
+        new_crypto: 新主密钥的 CryptoManager
+        chunk_size: 每块用户数
+        progress: 每块完成后调用 progress(本块数量)
+
+    Returns:
+        重新包装的数据密钥个数
+    """
+    from models import db
+
+    users = _users_table()
+    old_id = old_crypto.key_id
+    statement = update(users).where(
+        users.c.id == bindparam('user_id'), users.c.data_key == bindparam('old_key')
+    ).values(data_key=bindparam('new_key'), data_key_id=new_crypto.key_id)
+    rewrapped = 0
+    last_id = 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(
+                select(users.c.id, users.c.data_key).where(
+                    users.c.id > last_id,
+                    users.c.data_key.is_not(None),
+                    users.c.data_key_id == old_id
+                ).order_by(users.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            keys = parallel_map(
+                lambda row: new_crypto.wrap_key(old_crypto.unwrap_key(row.data_key, _aad(row.id)), _aad(row.id)),
+                rows
+            )
+            conn.execute(statement, [
+                {'user_id': row.id, 'old_key': row.data_key, 'new_key': key} for row, key in zip(rows, keys)
+            ])
+            rewrapped += len(rows)
+            last_id = rows[-1][0]
+        if progress:
+            progress(len(rows))
+    cache.invalidate()
+    return rewrapped
@@ -0,0 +1,233 @@
+"""
+密码生成模块
+从进程内熵池整块读取随机字节，通过字节映射表一次性转换为密码字符
+"""
+import csv
+import io
+import json
+import os
+import string
+import threading
+from functools import lru_cache
+
+from config import Config
+
+# 默认特殊字符集
+SYMBOLS = '!@#$%^&*()_+-=[]{}|;:,.<>?'
+
+
+class EntropyPool:
+    """
+    进程内随机字节池
+
+    按块从 os.urandom 补充字节，生成单个密码时无需每次发起系统调用。
+    fork 后子进程会丢弃继承的缓冲，避免多个 worker 输出相同的随机序列。
+    """
+
+    def __init__(self, size=64 * 1024):
+        """
+        初始化熵池
+
+        Args:
+            size: 每次补充的字节数
+        """
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        """清空缓冲并记录当前进程"""
+        self._lock = threading.Lock()
+        self._buf = b''
+        self._pos = 0
+        self._pid = os.getpid()
+
+    def read(self, n):
+        """
+        读取 n 个随机字节，每个字节只会被读取一次
+
+        Args:
+            n: 字节数
+
+        Returns:
+            bytes
+        """
+        if n > self.size:
+            # 超出池容量的大块请求直接读取系统熵源
+            return os.urandom(n)
+
+        # 平台不支持 register_at_fork 时由 pid 检查兜底
+        if self._pid != os.getpid():
+            self._reset()
+
+        with self._lock:
+            if len(self._buf) - self._pos < n:
+                self._buf = self._buf[self._pos:] + os.urandom(self.size)
+                self._pos = 0
+            chunk = self._buf[self._pos:self._pos + n]
+            self._pos += n
+            return chunk
+
+
+# 全局熵池实例
+pool = EntropyPool(Config.ENTROPY_POOL_SIZE)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=pool._reset)
+
+
+def randbelow(n):
+    """
+    从熵池中无偏地取 [0, n) 范围内的整数
+
+    Args:
+        n: 上界（不含），不超过 2**32
+
+    Returns:
+        int
+    """
+    if not 0 < n <= 1 << 32:
+        raise ValueError('n 必须在1-2**32之间')
+    limit = (1 << 32) - (1 << 32) % n
+    while True:
+        value = int.from_bytes(pool.read(4), 'little')
+        if value < limit:
+            return value % n
+
+
+def build_charset(use_letters=True, use_numbers=True, use_symbols=True):
+    """
+    根据选项构建字符集
+
+    Args:
+        use_letters: 是否包含大小写字母
+        use_numbers: 是否包含数字
+        use_symbols: 是否包含特殊字符
+
+    Returns:
+        字符集字符串
+    """
+    chars = ''
+    if use_letters:
+        chars += string.ascii_letters
+    if use_numbers:
+        chars += string.digits
+    if use_symbols:
+        chars += SYMBOLS
+    return chars
+
+
+@lru_cache(maxsize=64)
+def _translation_table(chars):
+    """
+    构建字节到字符的映射表
+
+    字节值 b 映射为 chars[b % n]；大于等于 256 - 256 % n 的字节会导致取模偏差，
+    放入删除集合，由 bytes.translate 一并丢弃（拒绝采样）。
+
+    Returns:
+        (映射表, 删除字节集合, 每个字节的接受概率)
+    """
+    n = len(chars)
+    if n == 0 or n > 256:
+        raise ValueError('字符集长度必须在1-256之间')
+    if not chars.isascii():
+        raise ValueError('字符集只能包含ASCII字符')
+    limit = 256 - 256 % n
+    table = bytes(ord(chars[b % n]) for b in range(256))
+    rejected = bytes(range(limit, 256))
+    return table, rejected, limit / 256
+
+
+def map_random_bytes(chars, need, read_bytes=None):
+    """
+    读取随机字节并映射为 need 个字符集中的字符
+
+    Args:
+        chars: 字符集
+        need: 需要的字符数量
+        read_bytes: 随机字节来源，签名同 os.urandom，默认使用全局熵池
+
+    Returns:
+        长度为 need 的字符串
+    """
+    read_bytes = read_bytes or pool.read
+    table, rejected, accept = _translation_table(chars)
+    buf = bytearray()
+    while len(buf) < need:
+        missing = need - len(buf)
+        # 按接受概率多读一些，通常一次即可凑够
+        buf += read_bytes(int(missing / accept) + 16).translate(table, rejected)
+    return buf[:need].decode('ascii')
+
+
+def generate_passwords(chars, length, count):
+    """
+    批量生成密码
+
+    一次读取 count × length 个位置所需的随机字节，整体映射后再切分，
+    不在 Python 层逐字符循环。
+
+    Args:
+        chars: 字符集
+        length: 单个密码长度
+        count: 密码数量
+
+    Returns:
+        密码字符串列表
+    """
+    data = map_random_bytes(chars, length * count)
+    return [data[i:i + length] for i in range(0, length * count, length)]
+
+
+def stream_passwords(chars, length, count, fmt='ndjson', score=None, chunk_size=1000, check=None):
+    """
+    按块流式生成密码记录
+
+    每次只生成 chunk_size 个密码并立即输出，内存占用与总数量无关；
+    调用方停止迭代（如客户端断开连接）后不会再继续生成。
+
+    Args:
+        chars: 字符集
+        length: 单个密码长度
+        count: 密码总数量
+        fmt: 输出格式，ndjson 或 csv
+        score: 可选的强度计算函数，结果写入 strength 字段
+        chunk_size: 每块生成的密码数量
+        check: 可选的泄露检查函数，接收一块密码并返回 [(密码, 出现次数), ...]（可替换泄露的密码），
+               出现次数写入 breached 字段
+
+    Yields:
+        文本块（每条记录一行）
+    """
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError(f'不支持的输出格式: {fmt}')
+
+    if fmt == 'csv':
+        yield ','.join(['password'] + (['strength'] if score else []) + (['breached'] if check else [])) + '\r\n'
+
+    remaining = count
+    while remaining > 0:
+        passwords = generate_passwords(chars, length, min(chunk_size, remaining))
+        remaining -= len(passwords)
+        records = check(passwords) if check else [(password, None) for password in passwords]
+
+        out = io.StringIO()
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            for password, breached in records:
+                row = [password]
+                if score:
+                    row.append(score(password))
+                if check:
+                    row.append(breached)
+                writer.writerow(row)
+        else:
+            for password, breached in records:
+                record = {'password': password}
+                if score:
+                    record['strength'] = score(password)
+                if check:
+                    record['breached'] = breached
+                out.write(json.dumps(record))
+                out.write('\n')
+        yield out.getvalue()
@@ -0,0 +1,99 @@
+"""
+登录密码哈希
+werkzeug 的 KDF（scrypt/pbkdf2）放到专用的有界线程池中执行，不占用请求线程以外的资源：
+同时执行的哈希数为 PASSWORD_HASH_WORKERS，排队数超过 PASSWORD_HASH_QUEUE 时立即拒绝（HashingBusy），
+登录高峰不会拖慢其他接口。hashlib 在 KDF 计算期间释放 GIL。
+
+哈希参数由 PASSWORD_HASH_METHOD 配置（werkzeug 格式，如 scrypt:32768:8:1、pbkdf2:sha256:600000），
+登录成功时旧参数的哈希会按当前参数重新计算（needs_rehash）。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import Config
+
+
+class HashingBusy(RuntimeError):
+    """哈希线程池已满"""
+
+
+class HashExecutor:
+    """有界哈希线程池：执行中与排队中的任务总数超过上限时拒绝新任务"""
+
+    def __init__(self, workers=2, queue=16, timeout=30):
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hash')
+        return self._executor
+
+    def run(self, func, *args):
+        """在线程池中执行 func 并等待结果，线程池已满时抛出 HashingBusy"""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy('登录请求过多，请稍后重试')
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+
+# 全局实例
+executor = HashExecutor(Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_QUEUE, Config.PASSWORD_HASH_TIMEOUT)
+
+if hasattr(os, 'register_at_fork'):
+    # fork 后子进程不能复用父进程的线程池
+    os.register_at_fork(after_in_child=executor._reset)
+
+
+def hash_password(password):
+    """按当前参数计算密码哈希"""
+    return executor.run(generate_password_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    """验证密码"""
+    return executor.run(check_password_hash, password_hash, password)
+
+
+def _method(password_hash):
+    """哈希字符串中的参数部分（method$salt$hash）"""
+    return password_hash.split('$', 1)[0]
+
+
+_current_method = None
+
+
+def current_method():
+    """
+    当前配置对应的完整参数（werkzeug 会补全省略的参数，如 scrypt -> scrypt:32768:8:1）
+
+    首次调用时计算一次哈希得到，之后缓存。
+    """
+    global _current_method
+    if _current_method is None:
+        _current_method = _method(executor.run(generate_password_hash, '', Config.PASSWORD_HASH_METHOD, 1))
+    return _current_method
+
+
+def needs_rehash(password_hash):
+    """哈希参数与当前配置不一致时返回 True"""
+    return _method(password_hash) != current_method()
@@ -0,0 +1,422 @@
+"""
+数据库结构升级与数据回填
+db.create_all 只会创建缺失的表，不会为已有表添加新列，这里补齐新增的列和索引
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, inspect, or_, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import envelope
+from crypto_utils import crypto, parallel_map
+from models import db, FavoriteItem, MigrationCheckpoint, PasswordEntry, password_fingerprint
+
+# 已有表需要补充的列: (表名, 列名, 列定义)
+ADDED_COLUMNS = [
+    ('password_entries', 'fingerprint', 'VARCHAR(64)'),
+    ('favorite_items', 'content_blob', 'BLOB'),
+    ('password_entries', 'password_blob', 'BLOB'),
+    ('users', 'data_key', 'BLOB'),
+    ('users', 'data_key_id', 'VARCHAR(16)'),
+    ('migration_checkpoints', 'lease_owner', 'VARCHAR(32)'),
+    ('migration_checkpoints', 'lease_expires_at', 'DATETIME'),
+]
+
+# 需要补充的索引（CREATE INDEX IF NOT EXISTS）
+ADDED_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_password_entries_user_fingerprint ON password_entries (user_id, fingerprint)',
+]
+
+
+def ensure_schema():
+    """为旧数据库补充新增的列和索引（需在应用上下文中调用）"""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            columns = {c['name'] for c in inspector.get_columns(table)}
+            if column not in columns:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+        for ddl in ADDED_INDEXES:
+            conn.execute(text(ddl))
+
+
+# 回填时保持 updated_at 不变（否则会触发 onupdate，影响审计的密码年龄）
+_entries = PasswordEntry.__table__
+_FINGERPRINT_UPDATE = update(_entries).where(_entries.c.id == bindparam('entry_id')).values(
+    fingerprint=bindparam('value'), updated_at=_entries.c.updated_at
+)
+
+
+def backfill_fingerprints(user_id=None, chunk_size=1000, rebuild=False, pause=0, progress=None):
+    """
+    分块回填密码指纹
+
+    按主键范围逐块读取和更新，每块单独提交，避免长时间持有写锁。
+    由 migrate_fingerprints.py 或启动时的后台线程执行，接口中不再回填。
+
+    Args:
+        user_id: 只回填指定用户，None 表示所有用户
+        chunk_size: 每块记录数
+        rebuild: 是否重新计算已有指纹（更换 FINGERPRINT_KEY 后使用）
+        pause: 每块之间暂停的秒数（后台运行时让出写锁）
+        progress: 每块完成后调用 progress(本块读取数, 本块更新数)
+
+    Returns:
+        更新的记录数
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        query = db.session.query(
+            PasswordEntry.id, PasswordEntry.user_id, PasswordEntry.password, PasswordEntry.password_blob
+        ).filter(PasswordEntry.id > last_id)
+        if user_id is not None:
+            query = query.filter(PasswordEntry.user_id == user_id)
+        if not rebuild:
+            query = query.filter(PasswordEntry.fingerprint.is_(None))
+        rows = query.order_by(PasswordEntry.id).limit(chunk_size).all()
+        if not rows:
+            break
+
+        db.session.execute(_FINGERPRINT_UPDATE, [
+            {'entry_id': row.id, 'value': password_fingerprint(password) if password else None}
+            for row, password in zip(rows, PasswordEntry.get_passwords(rows))
+        ])
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(len(rows), len(rows))
+        if pause:
+            time.sleep(pause)
+    return updated
+
+
+def _checkpoint(name):
+    """获取（不存在时创建）在线迁移的检查点"""
+    checkpoint = db.session.get(MigrationCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = MigrationCheckpoint(name=name, last_id=0, processed=0)
+        db.session.add(checkpoint)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 其他进程同时创建了同名检查点
+            db.session.rollback()
+            checkpoint = db.session.get(MigrationCheckpoint, name)
+    return checkpoint
+
+
+class LeaseLost(RuntimeError):
+    """迁移的租约已过期并被其他进程接管"""
+
+
+_checkpoints = MigrationCheckpoint.__table__
+
+
+def acquire_lease(name, owner, ttl=60):
+    """
+    获取或续期检查点 name 上的租约
+
+    租约没有持有者、已过期或持有者就是 owner 时写入（条件 UPDATE），多个进程同时获取时只有一个成功。
+
+    Returns:
+        是否持有租约
+    """
+    _checkpoint(name)
+    now = datetime.utcnow()
+    result = db.session.execute(update(_checkpoints).where(
+        _checkpoints.c.name == name,
+        or_(
+            _checkpoints.c.lease_owner.is_(None),
+            _checkpoints.c.lease_owner == owner,
+            _checkpoints.c.lease_expires_at < now
+        )
+    ).values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=ttl)))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def release_lease(name, owner):
+    """释放 owner 持有的租约"""
+    db.session.execute(update(_checkpoints).where(
+        _checkpoints.c.name == name, _checkpoints.c.lease_owner == owner
+    ).values(lease_owner=None, lease_expires_at=None))
+    db.session.commit()
+
+
+# 转换为 v3：只在内容未被并发修改时写入（content/content_blob 仍为读取时的值），同样保持 updated_at 不变
+_favorites = FavoriteItem.__table__
+_CONTENT_V3_UPDATE = update(_favorites).where(
+    _favorites.c.id == bindparam('item_id'),
+    _favorites.c.content == bindparam('old_content'),
+    _favorites.c.content_blob.is_(bindparam('old_blob'))
+).values(content_blob=bindparam('blob'), content='', updated_at=_favorites.c.updated_at)
+
+
+def _decrypt_legacy(content, blob):
+    """解密 v1/v2 内容，无法解密时返回 None（保持原样，避免把密文当作明文重新加密）"""
+    try:
+        return crypto.decrypt_blob(blob) if blob else crypto.decrypt(content)
+    except ValueError:
+        return None
+
+
+def convert_favorites(chunk_size=1000, max_chunks=None, pause=0, checkpoint=None, progress=None):
+    """
+    分块将收藏内容从 v1（Base64 Fernet token）、v2（全局密钥 BLOB）转换为 v3（用户数据密钥 BLOB）
+
+    按主键范围逐块读取、批量解密再按用户加密并更新，每块单独提交；
+    条件更新保证转换期间被用户修改过的记录不会被旧内容覆盖，可与应用同时运行，也可重复执行。
+    解密依次尝试当前密钥和旧密钥（crypto.previous），都无法解密的记录保持原样。
+
+    Args:
+        chunk_size: 每块记录数
+        max_chunks: 最多处理的块数，None 表示全部
+        pause: 每块之间暂停的秒数（后台运行时让出写锁）
+        checkpoint: 检查点名称，提供时从上次的主键继续，并与每块的更新一起提交进度
+        progress: 每块完成后调用 progress(本块读取数, 本块转换数)
+
+    Returns:
+        转换的记录数
+    """
+    state = _checkpoint(checkpoint) if checkpoint else None
+    converted = 0
+    last_id = state.last_id if state else 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        rows = db.session.query(
+            FavoriteItem.id, FavoriteItem.user_id, FavoriteItem.content, FavoriteItem.content_blob
+        ).filter(
+            FavoriteItem.id > last_id,
+            or_(
+                (FavoriteItem.content_blob.is_(None)) & (FavoriteItem.content != ''),
+                func.substr(FavoriteItem.content_blob, 1, 1) != bytes((envelope.FORMAT_V3,))
+            )
+        ).order_by(FavoriteItem.id).limit(chunk_size).all()
+        if not rows:
+            if state:
+                state.finished_at = datetime.utcnow()
+                db.session.commit()
+            break
+
+        contents = parallel_map(lambda row: _decrypt_legacy(row.content, row.content_blob), rows)
+        params = []
+        by_user = {}
+        for row, content in zip(rows, contents):
+            if content is not None:
+                by_user.setdefault(row.user_id, []).append((row, content))
+        for user_id, pairs in by_user.items():
+            blobs = envelope.encrypt_many(user_id, [content for _, content in pairs])
+            params.extend(
+                {'item_id': row.id, 'old_content': row.content, 'old_blob': row.content_blob, 'blob': blob}
+                for (row, _), blob in zip(pairs, blobs)
+            )
+        count = 0
+        if params:
+            result = db.session.execute(_CONTENT_V3_UPDATE, params)
+            count = result.rowcount if result.rowcount >= 0 else len(params)
+        last_id = rows[-1][0]
+        if state:
+            state.last_id = last_id
+            state.processed += count
+            state.updated_at = datetime.utcnow()
+            state.finished_at = None
+        db.session.commit()
+        converted += count
+        chunks += 1
+        if progress:
+            progress(len(rows), count)
+        if pause:
+            time.sleep(pause)
+    return converted
+
+
+# 加密明文密码：只在密码未被并发修改时写入，同样保持 updated_at 不变
+_PASSWORD_ENCRYPT_UPDATE = update(_entries).where(
+    _entries.c.id == bindparam('entry_id'),
+    _entries.c.password == bindparam('old_password'),
+    _entries.c.password_blob.is_(None)
+).values(password_blob=bindparam('blob'), password='', updated_at=_entries.c.updated_at)
+
+ENCRYPT_PASSWORDS = 'encrypt_passwords'
+
+
+def encrypt_passwords(chunk_size=1000, max_chunks=None, pause=0, restart=False, progress=None):
+    """
+    分块加密旧数据中的明文密码（写入 password_blob，清空 password 列）
+
+    进度保存在 migration_checkpoints 表中，与每块的更新在同一个短事务内提交，
+    中断后从上次的主键继续；条件更新保证期间被用户修改过的记录不会被旧密码覆盖，可与应用同时运行。
+
+    Args:
+        chunk_size: 每块记录数
+        max_chunks: 最多处理的块数，None 表示全部
+        pause: 每块之间暂停的秒数（后台运行时让出写锁）
+        restart: 忽略检查点，从头扫描
+        progress: 每块完成后调用 progress(本块读取数, 本块加密数)
+
+    Returns:
+        本次加密的记录数
+    """
+    checkpoint = _checkpoint(ENCRYPT_PASSWORDS)
+    if restart:
+        checkpoint.last_id = 0
+        checkpoint.finished_at = None
+        db.session.commit()
+
+    encrypted = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        rows = db.session.query(
+            PasswordEntry.id, PasswordEntry.user_id, PasswordEntry.password
+        ).filter(
+            PasswordEntry.id > checkpoint.last_id,
+            PasswordEntry.password_blob.is_(None),
+            PasswordEntry.password != ''
+        ).order_by(PasswordEntry.id).limit(chunk_size).all()
+        if not rows:
+            checkpoint.finished_at = datetime.utcnow()
+            db.session.commit()
+            break
+
+        params = []
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row.user_id, []).append(row)
+        for user_id, user_rows in by_user.items():
+            blobs = envelope.encrypt_many(user_id, [row.password for row in user_rows])
+            params.extend(
+                {'entry_id': row.id, 'old_password': row.password, 'blob': blob}
+                for row, blob in zip(user_rows, blobs)
+            )
+        result = db.session.execute(_PASSWORD_ENCRYPT_UPDATE, params)
+        count = result.rowcount if result.rowcount >= 0 else len(params)
+        checkpoint.last_id = rows[-1][0]
+        checkpoint.processed += count
+        checkpoint.updated_at = datetime.utcnow()
+        checkpoint.finished_at = None
+        db.session.commit()
+
+        encrypted += count
+        chunks += 1
+        if progress:
+            progress(len(rows), count)
+        if pause:
+            time.sleep(pause)
+    return encrypted
+
+
+def rotate_keys(old_crypto, chunk_size=1000, pause=0, progress=None):
+    """
+    更换主密钥后的数据迁移：用当前主密钥（crypto）重新包装由 old_crypto 包装的数据密钥，
+    并把仍由全局密钥加密的 v1/v2 收藏解密后重新加密为 v3
+
+    old_crypto 需在 crypto.previous 中（ENCRYPTION_KEY_PREVIOUS），迁移期间读取依次尝试新旧密钥。
+    数据密钥以 data_key_id 作为进度，收藏以检查点 rotate_favorites:<旧密钥标识> 记录进度，中断后重新执行会继续。
+
+    Args:
+        old_crypto: 旧主密钥的 CryptoManager
+        chunk_size: 每块记录数
+        pause: 每块之间暂停的秒数
+        progress: 每块完成后调用 progress(阶段, 本块数量)，阶段为 'data_keys' 或 'favorites'
+
+    Returns:
+        dict: 重新包装的数据密钥数、转换的收藏数、耗时（秒）与每秒处理行数
+    """
+    start = time.perf_counter()
+    scanned = 0
+
+    def report(stage):
+        def callback(count, *_):
+            nonlocal scanned
+            scanned += count
+            if progress:
+                progress(stage, count)
+        return callback
+
+    data_keys = envelope.rotate_master_key(old_crypto, crypto, chunk_size=chunk_size, progress=report('data_keys'))
+    favorites = convert_favorites(
+        chunk_size=chunk_size, pause=pause,
+        checkpoint=f'rotate_favorites:{old_crypto.key_id}', progress=report('favorites')
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        'data_keys': data_keys,
+        'favorites': favorites,
+        'elapsed': round(elapsed, 3),
+        'rows_per_sec': round(scanned / elapsed, 1) if elapsed else 0.0
+    }
+
+
+BACKGROUND_CONVERSION = 'background_conversion'
+
+
+def start_background_conversion(app, chunk_size=500, pause=0.05, retries=8, lease_ttl=60):
+    """
+    在后台线程中将收藏内容转换为当前格式，加密旧数据中的明文密码并回填缺失的密码指纹
+
+    没有需要处理的记录时线程立即结束；PASSWORDS_BACKGROUND_ENCRYPT 关闭时只转换收藏。
+    多个进程（worker、命令行脚本）同时启动时，只有取得 migration_checkpoints 中
+    background_conversion 租约的进程执行，每处理一块续期一次；
+    数据库被锁等 OperationalError 按指数退避重试（各步骤可重复执行，重试从头开始也只处理剩余记录）。
+
+    Args:
+        retries: OperationalError 的最多重试次数
+        lease_ttl: 租约有效期（秒），持有者退出后最迟这么久其他进程可以接管
+    """
+    owner = uuid.uuid4().hex
+
+    def renew(*_):
+        if not acquire_lease(BACKGROUND_CONVERSION, owner, lease_ttl):
+            raise LeaseLost('后台数据转换已由其他进程接管')
+
+    def convert():
+        if app.config['FAVORITES_BACKGROUND_CONVERT']:
+            count = convert_favorites(chunk_size=chunk_size, pause=pause, progress=renew)
+            if count:
+                app.logger.info(f'已将 {count} 条收藏内容转换为 v3 格式')
+        if app.config['PASSWORDS_BACKGROUND_ENCRYPT']:
+            count = encrypt_passwords(chunk_size=chunk_size, pause=pause, progress=renew)
+            if count:
+                app.logger.info(f'已加密 {count} 条明文密码')
+            count = backfill_fingerprints(chunk_size=chunk_size, pause=pause, progress=renew)
+            if count:
+                app.logger.info(f'已回填 {count} 条密码指纹')
+
+    def run():
+        with app.app_context():
+            try:
+                for attempt in range(retries + 1):
+                    try:
+                        if acquire_lease(BACKGROUND_CONVERSION, owner, lease_ttl):
+                            convert()
+                        else:
+                            app.logger.info('其他进程正在执行后台数据转换')
+                        return
+                    except OperationalError as e:
+                        db.session.rollback()
+                        if attempt == retries:
+                            raise
+                        delay = min(2 ** attempt, 60)
+                        app.logger.info(f'后台数据转换遇到数据库错误，{delay} 秒后重试: {str(e.orig)}')
+                        time.sleep(delay)
+            except Exception as e:
+                app.logger.warning(f'后台数据转换失败: {str(e)}')
+            finally:
+                try:
+                    db.session.rollback()
+                    release_lease(BACKGROUND_CONVERSION, owner)
+                except Exception:
+                    pass  # 释放失败时租约到期后自动失效
+                db.session.remove()
+
+    thread = threading.Thread(target=run, name='data-converter', daemon=True)
+    thread.start()
+    return thread
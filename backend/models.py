@@ -1,11 +1,24 @@
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+import hashlib
+import hmac
+import json
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+from crypto_utils import crypto
+import envelope
+import hashing
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-# 导入加密管理器（延后导入避免循环依赖）
-crypto = None
+# FavoriteItem.to_dict 未传入已解密内容的标记
+_UNSET = object()
+
+def password_fingerprint(password):
+    """计算密码指纹（服务端密钥下的 HMAC-SHA256），用于检测重复使用而不比较明文"""
+    key = Config.FINGERPRINT_KEY.encode('utf-8')
+    return hmac.new(key, password.encode('utf-8'), hashlib.sha256).hexdigest()
 
 class User(db.Model):
     """用户模型"""
@@ -15,15 +28,21 @@ class User(db.Model):
     username = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
+    data_key = db.Column(db.LargeBinary)  # 由主密钥包装的数据密钥（见 envelope.py）
+    data_key_id = db.Column(db.String(16))  # 包装数据密钥的主密钥标识
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        """设置密码（加密）"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（加密，在哈希线程池中执行）"""
+        self.password_hash = hashing.hash_password(password)
 
     def check_password(self, password):
-        """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        """验证密码（在哈希线程池中执行）"""
+        return hashing.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """密码哈希是否使用了旧参数"""
+        return hashing.needs_rehash(self.password_hash)
 
     def to_dict(self):
         """将模型转换为字典"""
@@ -45,7 +64,9 @@ class PasswordEntry(db.Model):
     site_name = db.Column(db.String(100), nullable=False)
     site_url = db.Column(db.String(255))
     username = db.Column(db.String(100), nullable=False)
-    password = db.Column(db.String(255), nullable=False)
+    password = db.Column(db.String(255), nullable=False, default='')  # 旧数据的明文密码，加密后为空
+    password_blob = db.Column(db.LargeBinary)  # 用户数据密钥加密的密码（v3 格式，见 envelope.py）
+    fingerprint = db.Column(db.String(64))  # 密码指纹，用于检测重复使用
     notes = db.Column(db.Text)
     strength = db.Column(db.String(20))
     category = db.Column(db.String(50))
@@ -57,14 +78,51 @@ class PasswordEntry(db.Model):
     # 关系
     user = db.relationship('User', backref=db.backref('passwords', lazy=True))
 
-    def to_dict(self):
-        """将模型转换为字典"""
+    __table_args__ = (
+        db.Index('ix_password_entries_user_fingerprint', 'user_id', 'fingerprint'),
+    )
+
+    def set_password(self, password):
+        """设置密码（用所属用户的数据密钥加密）并更新指纹"""
+        self.password_blob = envelope.encrypt(self.user_id, password) if password else None
+        self.password = ''
+        self.fingerprint = password_fingerprint(password) if password else None
+
+    def get_password(self):
+        """获取密码（解密，兼容未迁移的明文记录）"""
+        if self.password_blob:
+            return envelope.decrypt(self.user_id, self.password_blob)
+        return self.password or ''
+
+    @staticmethod
+    def get_passwords(entries):
+        """批量解密多条记录的密码（线程池），结果与 entries 顺序一致"""
+        passwords = [entry.password or '' for entry in entries]
+        by_user = {}
+        for i, entry in enumerate(entries):
+            if entry.password_blob:
+                by_user.setdefault(entry.user_id, []).append(i)
+        for user_id, indexes in by_user.items():
+            for i, password in zip(indexes, envelope.decrypt_many(user_id, [entries[i].password_blob for i in indexes])):
+                passwords[i] = password
+        return passwords
+
+    def to_dict(self, decrypt=True, password=None):
+        """
+        将模型转换为字典
+
+        Args:
+            decrypt: 是否解密密码
+            password: 已解密的密码（批量解密时传入，避免逐条解密）
+        """
+        if password is None:
+            password = self.get_password() if decrypt else ''
         return {
             'id': self.id,
             'site_name': self.site_name,
             'site_url': self.site_url,
             'username': self.username,
-            'password': self.password,
+            'password': password,
             'notes': self.notes,
             'strength': self.strength,
             'category': self.category,
@@ -75,7 +133,7 @@ class PasswordEntry(db.Model):
 
     def to_dict_masked(self):
         """将模型转换为字典（密码脱敏）"""
-        data = self.to_dict()
+        data = self.to_dict(decrypt=False)
         data['password'] = '••••••••'
         return data
 
@@ -88,7 +146,8 @@ class FavoriteItem(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(100), nullable=False, default='未命名收藏')
-    content = db.Column(db.Text, nullable=False)  # 加密存储
+    content = db.Column(db.Text, nullable=False, default='')  # v1 加密内容（Base64 字符串），v2 记录为空
+    content_blob = db.Column(db.LargeBinary)  # v2/v3 加密内容（版本字节 + nonce + AES-GCM 密文）
     category = db.Column(db.String(50))
     tags = db.Column(db.String(200))
     is_password = db.Column(db.Boolean, default=False)
@@ -105,29 +164,83 @@ class FavoriteItem(db.Model):
     user = db.relationship('User', backref=db.backref('favorite_items', lazy=True))
 
     def set_content(self, content):
-        """设置内容（加密）"""
-        from crypto_utils import crypto
-        if crypto:
-            self.content = crypto.encrypt(content) if content else ''
+        """设置内容（用所属用户的数据密钥加密，v3 格式）"""
+        if not content:
+            self.content_blob = None
+        elif self.user_id is not None:
+            self.content_blob = envelope.encrypt(self.user_id, content)
         else:
-            self.content = content
+            self.content_blob = crypto.encrypt_blob(content)
+        self.content = ''
 
     def get_content(self):
-        """获取内容（解密）"""
-        from crypto_utils import crypto
-        if crypto and self.content:
-            try:
+        """
+        获取内容（解密，兼容 v1、v2 格式）
+
+        Raises:
+            ValueError: 解密失败（不再返回密文或空字符串，避免被当作正常内容显示或覆盖）
+        """
+        try:
+            if self.content_blob:
+                return envelope.decrypt(self.user_id, self.content_blob)
+            if self.content:
                 return crypto.decrypt(self.content)
-            except:
-                return self.content
-        return self.content if self.content else ''
+        except ValueError as e:
+            current_app.logger.error(f'收藏内容解密失败 (id={self.id}): {str(e)}')
+            raise
+        return ''
 
-    def to_dict(self, decrypt=True):
-        """将模型转换为字典"""
+    @staticmethod
+    def get_contents(items):
+        """
+        批量解密多条收藏的内容（线程池），结果与 items 顺序一致
+
+        某个用户的内容批量解密失败时逐条重试，仍无法解密的条目为 None（已记录日志）。
+        """
+        contents = [''] * len(items)
+        by_user = {}
+        v1 = []
+        for i, item in enumerate(items):
+            if item.content_blob:
+                by_user.setdefault(item.user_id, []).append(i)
+            elif item.content:
+                v1.append(i)
+        for user_id, indexes in by_user.items():
+            try:
+                decrypted = envelope.decrypt_many(user_id, [items[i].content_blob for i in indexes])
+            except ValueError:
+                decrypted = [items[i]._try_get_content() for i in indexes]
+            for i, content in zip(indexes, decrypted):
+                contents[i] = content
+        try:
+            decrypted = crypto.decrypt_many([items[i].content for i in v1])
+        except ValueError:
+            decrypted = [items[i]._try_get_content() for i in v1]
+        for i, content in zip(v1, decrypted):
+            contents[i] = content
+        return contents
+
+    def _try_get_content(self):
+        """解密内容，失败时返回 None"""
+        try:
+            return self.get_content()
+        except ValueError:
+            return None
+
+    def to_dict(self, decrypt=True, content=_UNSET):
+        """
+        将模型转换为字典
+
+        Args:
+            decrypt: 是否解密内容；解密失败时 content 为 None，并带 decrypt_error 标记
+            content: 已解密的内容（get_contents 的结果，批量解密时传入，避免逐条解密）
+        """
+        if content is _UNSET:
+            content = self._try_get_content() if decrypt else None
         data = {
             'id': self.id,
             'title': self.title,
-            'content': self.get_content() if decrypt else '***',
+            'content': content if decrypt else '***',
             'category': self.category,
             'tags': self.tags,
             'is_password': self.is_password,
@@ -139,6 +252,8 @@ class FavoriteItem(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if decrypt and content is None:
+            data['decrypt_error'] = True
         return data
 
     def __repr__(self):
@@ -172,3 +287,69 @@ class FavoriteUsage(db.Model):
         return f'<FavoriteUsage {self.action} at {self.timestamp}>'
 
 
+
+class AuditResult(db.Model):
+    """密码审计结果模型（每条密码记录一行，用于增量审计）"""
+    __tablename__ = 'audit_results'
+
+    entry_id = db.Column(db.Integer, db.ForeignKey('password_entries.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    entropy_bits = db.Column(db.Float)
+    strength = db.Column(db.String(20))
+    patterns = db.Column(db.String(100))  # 逗号分隔的模式类型
+    breached = db.Column(db.Integer, default=0)
+    audited_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AuditResult {self.entry_id} {self.strength}>'
+
+class AuditRun(db.Model):
+    """用户审计报告模型"""
+    __tablename__ = 'audit_runs'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    scored_count = db.Column(db.Integer, default=0)  # 本次重新评分的记录数
+    report = db.Column(db.Text)  # JSON 格式的报告
+
+    def to_dict(self):
+        """将模型转换为字典"""
+        return {
+            'user_id': self.user_id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'scored_count': self.scored_count,
+            'report': json.loads(self.report) if self.report else None
+        }
+
+    def __repr__(self):
+        return f'<AuditRun {self.user_id} at {self.finished_at}>'
+
+class MigrationCheckpoint(db.Model):
+    """在线数据迁移的进度检查点（中断后从 last_id 继续）"""
+    __tablename__ = 'migration_checkpoints'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # 已处理到的最大主键
+    processed = db.Column(db.Integer, nullable=False, default=0)  # 已写入的记录数
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    lease_owner = db.Column(db.String(32))  # 当前执行迁移的进程（后台转换只允许一个进程执行）
+    lease_expires_at = db.Column(db.DateTime)  # 租约到期时间，过期后其他进程可以接管
+
+    def __repr__(self):
+        return f'<MigrationCheckpoint {self.name} at {self.last_id}>'
+
+class RevokedToken(db.Model):
+    """已吊销的认证令牌（jti 为 user:<ID> 的记录表示吊销该用户 revoked_at 之前签发的全部令牌）"""
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # 过期后记录可删除
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
@@ -0,0 +1,151 @@
+"""
+Diceware 口令短语模块
+词表首次使用时编译为定长偏移索引文件，之后通过 mmap 只读映射，
+多个 worker 进程共享同一份页缓存，按序号 O(1) 取词
+"""
+import math
+import mmap
+import os
+import struct
+import threading
+
+from generator import randbelow
+
+# 索引文件格式: 文件头 | (count + 1) 个 uint32 偏移 | UTF-8 单词数据
+_MAGIC = b'PWWL0001'
+_HEADER = struct.Struct('<8sI')
+_OFFSET = struct.Struct('<I')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _parse_words(path):
+    """
+    解析文本词表
+
+    支持 EFF 格式（"11111<TAB>abacus"）和每行一个单词的普通格式，
+    忽略空行和 # 开头的注释，重复单词只保留第一次出现。
+    """
+    words = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            word = line.split()[-1]
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+    return words
+
+
+def compile_wordlist(source_path, index_path=None):
+    """
+    将文本词表编译为索引文件
+
+    Args:
+        source_path: 文本词表路径
+        index_path: 输出路径，默认为 source_path + '.idx'
+
+    Returns:
+        索引文件路径
+    """
+    index_path = index_path or source_path + '.idx'
+    words = [w.encode('utf-8') for w in _parse_words(source_path)]
+    if len(words) < 2:
+        raise ValueError('词表至少需要包含2个单词')
+
+    offsets = []
+    position = 0
+    for word in words:
+        offsets.append(position)
+        position += len(word)
+    offsets.append(position)
+
+    # 先写临时文件再原子替换，避免并发编译的 worker 读到半成品
+    tmp_path = f'{index_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(words)))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.write(b''.join(words))
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+class Wordlist:
+    """mmap 映射的只读词表"""
+
+    def __init__(self, index_path):
+        with open(index_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self._mm.close()
+            raise ValueError(f'无效的词表索引文件: {index_path}')
+        self._offsets_start = _HEADER.size
+        self._data_start = _HEADER.size + (self.count + 1) * _OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """按序号取词"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        pos = self._offsets_start + index * _OFFSET.size
+        start, end = struct.unpack_from('<II', self._mm, pos)
+        return self._mm[self._data_start + start:self._data_start + end].decode('utf-8')
+
+    @property
+    def bits_per_word(self):
+        """每个单词提供的熵（比特）"""
+        return math.log2(self.count)
+
+
+def load_wordlist(source_path):
+    """
+    加载词表（进程内缓存）
+
+    索引文件不存在或比文本词表旧时重新编译。
+
+    Args:
+        source_path: 文本词表路径
+
+    Returns:
+        Wordlist 实例
+    """
+    wordlist = _cache.get(source_path)
+    if wordlist is not None:
+        return wordlist
+
+    with _cache_lock:
+        wordlist = _cache.get(source_path)
+        if wordlist is None:
+            index_path = source_path + '.idx'
+            if (not os.path.exists(index_path) or
+                    os.path.getmtime(index_path) < os.path.getmtime(source_path)):
+                compile_wordlist(source_path, index_path)
+            wordlist = Wordlist(index_path)
+            _cache[source_path] = wordlist
+    return wordlist
+
+
+def generate_passphrase(wordlist, word_count=6, separator='-', capitalize=False):
+    """
+    生成口令短语
+
+    Args:
+        wordlist: Wordlist 实例
+        word_count: 单词数量
+        separator: 分隔符
+        capitalize: 是否首字母大写
+
+    Returns:
+        (口令短语, 熵比特数)
+    """
+    words = [wordlist[randbelow(len(wordlist))] for _ in range(word_count)]
+    if capitalize:
+        words = [w.capitalize() for w in words]
+    return separator.join(words), word_count * wordlist.bits_per_word
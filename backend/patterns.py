@@ -0,0 +1,470 @@
+"""
+密码模式匹配模块（离线，参考 zxcvbn）
+识别字典单词（含 l33t 替换与反转）、键盘连走、日期、重复和字符序列，
+再用动态规划求出猜测次数最少的分解
+
+字典在打包时（build.spec）由 data/*.txt 编译为扁平 trie 文件，
+运行时通过 mmap 只读映射，多个 worker 共享同一份页缓存
+"""
+import math
+import mmap
+import os
+import re
+import threading
+from array import array
+
+# ==================== 字典 trie ====================
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DICTIONARY_SOURCES = ('passwords.txt', 'english.txt')
+TRIE_PATH = os.path.join(DATA_DIR, 'dictionary.trie')
+
+# 文件格式（本机字节序）:
+#   magic(8) | node_count(uint32) | edge_count(uint32)
+#   edge_start[node_count + 1] (uint32) | rank[node_count] (uint32, 0 表示非单词结尾)
+#   edge_child[edge_count] (uint32) | edge_label[edge_count] (byte)
+_TRIE_MAGIC = b'PWTRIE01'
+_HEADER_SIZE = 16
+
+
+def _read_ranked_words(paths):
+    """读取词表，同一单词在多个词表中出现时取最小排名"""
+    ranks = {}
+    for path in paths:
+        rank = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                word = line.strip().lower()
+                if not word or word.startswith('#') or not word.isascii():
+                    continue
+                rank += 1
+                if word not in ranks or rank < ranks[word]:
+                    ranks[word] = rank
+    return ranks
+
+
+def compile_dictionary(sources=None, output=TRIE_PATH):
+    """
+    将文本词表编译为扁平 trie 文件
+
+    Args:
+        sources: 词表路径列表，默认为 data 目录下的内置词表
+        output: 输出路径
+
+    Returns:
+        输出路径
+    """
+    sources = sources or [os.path.join(DATA_DIR, name) for name in DICTIONARY_SOURCES]
+    ranks = _read_ranked_words(sources)
+
+    # 先构建嵌套字典形式的 trie
+    root = {}
+    for word, rank in ranks.items():
+        node = root
+        for ch in word.encode('ascii'):
+            node = node.setdefault(ch, {})
+        node[None] = rank
+
+    # 广度优先编号，使每个节点的出边在边数组中连续
+    nodes = [root]
+    edge_start = array('I')
+    node_rank = array('I')
+    edge_child = array('I')
+    edge_label = bytearray()
+    index = 0
+    while index < len(nodes):
+        node = nodes[index]
+        edge_start.append(len(edge_child))
+        node_rank.append(node.get(None, 0))
+        for label in sorted(k for k in node if k is not None):
+            edge_label.append(label)
+            edge_child.append(len(nodes))
+            nodes.append(node[label])
+        index += 1
+    edge_start.append(len(edge_child))
+
+    tmp_path = f'{output}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_TRIE_MAGIC)
+        f.write(array('I', [len(nodes), len(edge_child)]).tobytes())
+        f.write(edge_start.tobytes())
+        f.write(node_rank.tobytes())
+        f.write(edge_child.tobytes())
+        f.write(bytes(edge_label))
+    os.replace(tmp_path, output)
+    return output
+
+
+class Trie:
+    """mmap 映射的只读 trie"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != _TRIE_MAGIC:
+            self._mm.close()
+            raise ValueError(f'无效的字典文件: {path}')
+        view = memoryview(self._mm)
+        node_count, edge_count = view[8:_HEADER_SIZE].cast('I')
+        offset = _HEADER_SIZE
+        self._edge_start = view[offset:offset + 4 * (node_count + 1)].cast('I')
+        offset += 4 * (node_count + 1)
+        self._rank = view[offset:offset + 4 * node_count].cast('I')
+        offset += 4 * node_count
+        self._edge_child = view[offset:offset + 4 * edge_count].cast('I')
+        offset += 4 * edge_count
+        self._label_offset = offset
+        self.node_count = node_count
+
+    def child(self, node, label):
+        """查找子节点，不存在时返回 -1"""
+        start = self._edge_start[node]
+        end = self._edge_start[node + 1]
+        if start == end:
+            return -1
+        pos = self._mm.find(label, self._label_offset + start, self._label_offset + end)
+        return -1 if pos < 0 else self._edge_child[pos - self._label_offset]
+
+    def rank(self, node):
+        """节点对应单词的排名，非单词结尾返回 0"""
+        return self._rank[node]
+
+
+_trie = None
+_trie_lock = threading.Lock()
+
+
+def get_trie():
+    """加载字典 trie（首次使用时加载，文件缺失时现场编译）"""
+    global _trie
+    if _trie is None:
+        with _trie_lock:
+            if _trie is None:
+                if not os.path.exists(TRIE_PATH):
+                    compile_dictionary()
+                _trie = Trie(TRIE_PATH)
+    return _trie
+
+
+# ==================== 匹配 ====================
+
+# l33t 替换表：字符 -> 可能代表的字母
+L33T_TABLE = {
+    '4': 'a', '@': 'a', '8': 'b', '(': 'c', '{': 'c', '[': 'c', '<': 'c',
+    '3': 'e', '6': 'g', '9': 'g', '1': 'il', '!': 'i', '|': 'il',
+    '0': 'o', '$': 's', '5': 's', '7': 'lt', '+': 't', '%': 'x', '2': 'z',
+}
+
+# 键盘布局（每行：未按 Shift、按 Shift）
+_KEYBOARD_ROWS = (
+    ('`1234567890-=', '~!@#$%^&*()_+'),
+    ('qwertyuiop[]\\', 'QWERTYUIOP{}|'),
+    ("asdfghjkl;'", 'ASDFGHJKL:"'),
+    ('zxcvbnm,./', 'ZXCVBNM<>?'),
+)
+_KEY_POSITION = {}
+_SHIFTED = set()
+for _row, (_plain, _shifted) in enumerate(_KEYBOARD_ROWS):
+    for _col, (_a, _b) in enumerate(zip(_plain, _shifted)):
+        _KEY_POSITION[_a] = (_row, _col)
+        _KEY_POSITION[_b] = (_row, _col)
+        _SHIFTED.add(_b)
+_NEIGHBOR_DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (-1, 1), (1, -1), (1, 0))
+_KEY_CELLS = set(_KEY_POSITION.values())
+_KEYBOARD_STARTS = len(_KEY_CELLS)
+_KEYBOARD_AVG_DEGREE = sum(
+    sum(1 for dr, dc in _NEIGHBOR_DIRECTIONS if (r + dr, c + dc) in _KEY_CELLS)
+    for r, c in _KEY_CELLS
+) / _KEYBOARD_STARTS
+
+REFERENCE_YEAR = 2026
+MIN_YEAR_SPACE = 20
+_DATE_WITH_SEPARATOR = re.compile(r'^(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})$')
+
+MIN_MATCH_LENGTH = 3
+
+# 只对前 MAX_ANALYZED_LENGTH 个字符做模式匹配（与生成策略的最大长度 POLICY_MAX_LENGTH 一致），
+# 超出部分按暴力破解计，评估耗时不随密码长度二次增长
+MAX_ANALYZED_LENGTH = 128
+
+
+def _case_variations(token):
+    """大小写变化带来的额外猜测倍数"""
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    if upper == 0:
+        return 1
+    # 全大写、首字母或末字母大写是最常见的变化
+    if lower == 0 or (upper == 1 and (token[0].isupper() or token[-1].isupper())):
+        return 2
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _fold_case(password):
+    """
+    逐字符转小写，结果与原字符串等长（位置一一对应）
+
+    转小写后变长的字符（如 'İ'.lower() 为两个码位）保持原样，它们不是 ASCII，不会出现在字典中。
+    """
+    folded = []
+    for ch in password:
+        lower = ch.lower()
+        folded.append(lower if len(lower) == 1 else ch)
+    return ''.join(folded)
+
+
+def _dictionary_matches(password, reversed_=False):
+    """在 trie 中查找所有字典单词（含 l33t 替换）"""
+    trie = get_trie()
+    lowered = _fold_case(password)
+    n = len(lowered)
+    matches = []
+    for i in range(n):
+        # 栈元素: (节点, 下一个位置, 替换字符数)
+        stack = [(0, i, 0)]
+        while stack:
+            node, pos, subs = stack.pop()
+            if pos - i >= MIN_MATCH_LENGTH:
+                rank = trie.rank(node)
+                if rank:
+                    matches.append((i, pos, rank, subs))
+            if pos == n:
+                continue
+            ch = lowered[pos]
+            if ch.isascii():
+                child = trie.child(node, ch.encode())
+                if child >= 0:
+                    stack.append((child, pos + 1, subs))
+            for sub in L33T_TABLE.get(ch, ''):
+                child = trie.child(node, sub.encode())
+                if child >= 0:
+                    stack.append((child, pos + 1, subs + 1))
+
+    results = []
+    for i, j, rank, subs in matches:
+        token = password[i:j]
+        guesses = rank * _case_variations(token) * (2 ** subs if subs else 1)
+        if reversed_:
+            i, j = n - j, n - i
+            guesses *= 2
+        results.append((i, j, guesses, 'dictionary'))
+    return results
+
+
+def _keyboard_matches(password):
+    """查找键盘相邻按键连走（如 qwerty、1qaz、zxcvb）"""
+    results = []
+    n = len(password)
+    i = 0
+    while i < n - 1:
+        j = i
+        turns = 0
+        last_direction = None
+        while j + 1 < n:
+            a = _KEY_POSITION.get(password[j])
+            b = _KEY_POSITION.get(password[j + 1])
+            if a is None or b is None:
+                break
+            direction = (b[0] - a[0], b[1] - a[1])
+            if direction not in _NEIGHBOR_DIRECTIONS:
+                break
+            if direction != last_direction:
+                turns += 1
+                last_direction = direction
+            j += 1
+        length = j - i + 1
+        if length >= MIN_MATCH_LENGTH:
+            guesses = 0
+            for k in range(2, length + 1):
+                for t in range(1, min(turns, k - 1) + 1):
+                    guesses += math.comb(k - 2, t - 1) * _KEYBOARD_STARTS * _KEYBOARD_AVG_DEGREE ** t
+            token = password[i:j + 1]
+            shifted = sum(1 for c in token if c in _SHIFTED)
+            unshifted = length - shifted
+            if shifted and unshifted:
+                guesses *= sum(math.comb(length, k) for k in range(1, min(shifted, unshifted) + 1))
+            elif shifted:
+                guesses *= 2
+            results.append((i, j + 1, guesses, 'keyboard'))
+            i = j
+        else:
+            i += 1
+    return results
+
+
+def _year_space(year):
+    return max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE)
+
+
+def _normalize_year(year, digits):
+    if digits == 2:
+        return year + (1900 if year > 50 else 2000)
+    return year if 1900 <= year <= 2049 else None
+
+
+def _valid_date(year, month, day):
+    return year is not None and 1 <= month <= 12 and 1 <= day <= 31
+
+
+def _date_guesses(token):
+    """若 token 是日期或年份，返回猜测次数，否则返回 None"""
+    if token.isdigit():
+        n = len(token)
+        if n == 4:
+            year = int(token)
+            if 1900 <= year <= 2049:
+                return _year_space(year)
+        splits = []
+        if n in (6, 8):
+            y = n - 4
+            # 年在前或年在后；月日可以是 MMDD 或 DDMM
+            splits.append((token[:y], token[y:y + 2], token[y + 2:]))
+            splits.append((token[4:], token[:2], token[2:4]))
+            splits.append((token[4:], token[2:4], token[:2]))
+        for year_str, month_str, day_str in splits:
+            year = _normalize_year(int(year_str), len(year_str))
+            if _valid_date(year, int(month_str), int(day_str)):
+                return 365 * _year_space(year)
+        return None
+
+    match = _DATE_WITH_SEPARATOR.match(token)
+    if not match:
+        return None
+    first, _, middle, last = match.groups()
+    for year_str, month_str, day_str in ((first, middle, last), (last, first, middle), (last, middle, first)):
+        if len(year_str) not in (2, 4):
+            continue
+        year = _normalize_year(int(year_str), len(year_str))
+        if _valid_date(year, int(month_str), int(day_str)):
+            # 分隔符有若干种可能
+            return 365 * _year_space(year) * 4
+    return None
+
+
+def _date_matches(password):
+    """查找年份和日期（如 1998、19980423、04/23/98）"""
+    results = []
+    n = len(password)
+    for i in range(n):
+        if not password[i].isdigit():
+            continue
+        for j in range(i + 4, min(i + 10, n) + 1):
+            if not password[j - 1].isdigit():
+                continue
+            guesses = _date_guesses(password[i:j])
+            if guesses:
+                results.append((i, j, guesses, 'date'))
+    return results
+
+
+def _sequence_matches(password):
+    """查找等差字符序列（如 abcd、9876、aceg）"""
+    results = []
+    n = len(password)
+    i = 0
+    while i < n - 2:
+        delta = ord(password[i + 1]) - ord(password[i])
+        if delta == 0 or abs(delta) > 5:
+            i += 1
+            continue
+        j = i + 2
+        while j < n and ord(password[j]) - ord(password[j - 1]) == delta:
+            j += 1
+        if j - i >= MIN_MATCH_LENGTH:
+            first = password[i]
+            if first in 'aAzZ019':
+                base = 4
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26
+            guesses = base * (j - i) * (1 if delta > 0 else 2)
+            results.append((i, j, guesses, 'sequence'))
+            i = j - 1
+        else:
+            i += 1
+    return results
+
+
+def _repeat_matches(password, bruteforce_bits, memo):
+    """
+    查找重复片段（如 aaaa、abcabc），猜测次数为基础片段的猜测次数乘以重复次数
+
+    对每个周期长度 p 线性扫描 password[k] == password[k + p] 的连续区间，区间长度不小于 p 即为重复；
+    只保留最短周期（'aa' 重复两次与 'a' 重复四次等价），基础片段的猜测次数按片段缓存在 memo 中。
+    """
+    results = []
+    n = len(password)
+    for period in range(1, n // 2 + 1):
+        run = 0
+        for k in range(n - period + 1):
+            if k < n - period and password[k] == password[k + period]:
+                run += 1
+                continue
+            if run >= period:
+                i = k - run
+                base = password[i:i + period]
+                if (base + base).find(base, 1) == period:
+                    if base not in memo:
+                        memo[base] = _minimum_guesses_bits(base, bruteforce_bits, memo)[0]
+                    count = (run + period) // period
+                    results.append((i, i + count * period, 2 ** memo[base] * count, 'repeat'))
+            run = 0
+    return results
+
+
+def find_matches(password, bruteforce_bits, memo=None):
+    """
+    查找密码中的所有模式
+
+    Returns:
+        [(起始位置, 结束位置, 猜测次数, 模式名), ...]
+    """
+    matches = _dictionary_matches(password)
+    matches += _dictionary_matches(password[::-1], reversed_=True)
+    matches += _keyboard_matches(password)
+    matches += _date_matches(password)
+    matches += _sequence_matches(password)
+    matches += _repeat_matches(password, bruteforce_bits, {} if memo is None else memo)
+    return matches
+
+
+def minimum_guesses_bits(password, bruteforce_bits):
+    """
+    求猜测次数最少的分解（以 2 为底的对数）
+
+    超过 MAX_ANALYZED_LENGTH 的部分不做模式匹配，每个字符按 bruteforce_bits 计。
+
+    Args:
+        password: 密码字符串
+        bruteforce_bits: 未匹配任何模式的单个字符按暴力破解计的比特数
+
+    Returns:
+        (比特数, 所用模式名集合)
+    """
+    extra = max(len(password) - MAX_ANALYZED_LENGTH, 0)
+    bits, used = _minimum_guesses_bits(password[:MAX_ANALYZED_LENGTH], bruteforce_bits, {})
+    return bits + extra * bruteforce_bits, used
+
+
+def _minimum_guesses_bits(password, bruteforce_bits, memo):
+    n = len(password)
+    if n == 0:
+        return 0.0, set()
+
+    ending = [[] for _ in range(n + 1)]
+    for i, j, guesses, name in find_matches(password, bruteforce_bits, memo):
+        ending[j].append((i, math.log2(max(guesses, 1)), name))
+
+    best = [0.0] * (n + 1)
+    used = [frozenset()] * (n + 1)
+    for j in range(1, n + 1):
+        best[j] = best[j - 1] + bruteforce_bits
+        used[j] = used[j - 1]
+        for i, bits, name in ending[j]:
+            # 每多一个片段，攻击者还需要猜测片段的组合方式
+            candidate = best[i] + bits + (1 if i else 0)
+            if candidate < best[j]:
+                best[j] = candidate
+                used[j] = used[i] | {name}
+    return best[n], set(used[n])
@@ -0,0 +1,204 @@
+"""
+密码生成策略模块
+策略参数首次使用时编译为采样计划并缓存，之后每次请求只做采样
+"""
+import string
+from functools import lru_cache
+
+from config import Config
+from generator import SYMBOLS, map_random_bytes, randbelow
+
+# 容易混淆的字符
+AMBIGUOUS = '0Oo1lI|'
+
+# 策略参数及默认值
+DEFAULT_POLICY = {
+    'length_min': 12,
+    'length_max': 12,
+    'use_lower': True,
+    'use_upper': True,
+    'use_digits': True,
+    'use_symbols': True,
+    'min_lower': 1,
+    'min_upper': 1,
+    'min_digits': 1,
+    'min_symbols': 1,
+    'symbols': SYMBOLS,
+    'exclude_ambiguous': False,
+    'exclude': '',
+    'no_repeat': False,
+}
+
+# 内置命名策略（只需列出与默认值不同的参数）
+BUILTIN_POLICIES = {
+    'default': {},
+    'strong': {'length_min': 20, 'length_max': 24, 'min_digits': 2, 'min_symbols': 2, 'no_repeat': True},
+    'readable': {'length_min': 14, 'length_max': 16, 'exclude_ambiguous': True, 'symbols': '!@#$%&*-_=+?'},
+    'alphanumeric': {'length_min': 16, 'length_max': 16, 'use_symbols': False},
+    'pin': {'length_min': 6, 'length_max': 6, 'use_lower': False, 'use_upper': False, 'use_symbols': False,
+            'min_digits': 6},
+}
+
+# 字符类型名称（对应 use_<name> / min_<name> 参数）
+_CLASS_NAMES = ('lower', 'upper', 'digits', 'symbols')
+
+# 去重重试上限，超过说明策略在给定字符集下几乎无法满足
+_MAX_ATTEMPTS = 1000
+
+
+class PolicyError(ValueError):
+    """策略参数无效"""
+
+
+class SamplingPlan:
+    """编译后的采样计划（只读，可在线程间共享）"""
+
+    def __init__(self, params, classes, charset):
+        self.params = params
+        self.classes = classes  # [(字符集, 最少个数), ...]
+        self.charset = charset
+        self.length_min = params['length_min']
+        self.length_max = params['length_max']
+        self.no_repeat = params['no_repeat']
+
+    def _sample_once(self, length):
+        """生成一个满足最少个数要求的候选密码"""
+        parts = [map_random_bytes(chars, minimum) for chars, minimum in self.classes if minimum]
+        filled = sum(len(p) for p in parts)
+        parts.append(map_random_bytes(self.charset, length - filled))
+        chars = list(''.join(parts))
+
+        # Fisher-Yates 洗牌，打乱必选字符的位置
+        for i in range(len(chars) - 1, 0, -1):
+            j = randbelow(i + 1)
+            chars[i], chars[j] = chars[j], chars[i]
+        return ''.join(chars)
+
+    def sample(self):
+        """
+        按计划生成一个密码
+
+        Returns:
+            密码字符串
+        """
+        length = self.length_min + randbelow(self.length_max - self.length_min + 1)
+        for _ in range(_MAX_ATTEMPTS):
+            password = self._sample_once(length)
+            if not self.no_repeat or all(a != b for a, b in zip(password, password[1:])):
+                return password
+        raise PolicyError('无法生成满足不重复要求的密码，请放宽策略')
+
+    def sample_many(self, count):
+        """批量生成密码"""
+        return [self.sample() for _ in range(count)]
+
+    def to_dict(self):
+        """将策略转换为字典"""
+        data = dict(self.params)
+        data['charset_size'] = len(self.charset)
+        return data
+
+
+def _normalize(params):
+    """合并默认值并校验参数类型，返回可哈希的有序元组"""
+    params = dict(params or {})
+    if 'length' in params:
+        params['length_min'] = params['length_max'] = params.pop('length')
+
+    unknown = set(params) - set(DEFAULT_POLICY)
+    if unknown:
+        raise PolicyError(f"未知的策略参数: {', '.join(sorted(unknown))}")
+
+    merged = dict(DEFAULT_POLICY, **params)
+    for key, default in DEFAULT_POLICY.items():
+        if not isinstance(merged[key], type(default)) or (
+                isinstance(default, int) and not isinstance(default, bool) and isinstance(merged[key], bool)):
+            raise PolicyError(f'策略参数 {key} 类型错误')
+
+    # 未启用的字符类型沿用默认最少个数时视为 0，只有显式设置的最少个数才在编译时报错
+    for name in _CLASS_NAMES:
+        if not merged[f'use_{name}'] and f'min_{name}' not in params:
+            merged[f'min_{name}'] = 0
+    return tuple(sorted(merged.items()))
+
+
+@lru_cache(maxsize=256)
+def _compile(key):
+    """编译采样计划（按参数元组缓存）"""
+    params = dict(key)
+
+    if params['length_min'] < Config.POLICY_MIN_LENGTH or params['length_max'] > Config.POLICY_MAX_LENGTH:
+        raise PolicyError(f'密码长度必须在{Config.POLICY_MIN_LENGTH}-{Config.POLICY_MAX_LENGTH}位之间')
+    if params['length_min'] > params['length_max']:
+        raise PolicyError('最小长度不能大于最大长度')
+
+    excluded = set(params['exclude'])
+    if params['exclude_ambiguous']:
+        excluded.update(AMBIGUOUS)
+
+    classes = []
+    charset = ''
+    for name, chars in zip(_CLASS_NAMES, (string.ascii_lowercase, string.ascii_uppercase,
+                                          string.digits, params['symbols'])):
+        minimum = params[f'min_{name}']
+        if minimum < 0:
+            raise PolicyError(f'min_{name} 不能为负数')
+        if not params[f'use_{name}']:
+            if minimum:
+                raise PolicyError(f'未启用的字符类型不能设置最少个数: {name}')
+            continue
+        # 去重并保持顺序，避免重复字符改变分布
+        chars = ''.join(dict.fromkeys(c for c in chars if c not in excluded))
+        if not chars:
+            raise PolicyError(f'字符类型 {name} 在排除后为空')
+        if not chars.isascii():
+            raise PolicyError('字符集只能包含ASCII字符')
+        classes.append((chars, minimum))
+        charset += ''.join(c for c in chars if c not in charset)
+
+    if not classes:
+        raise PolicyError('至少选择一种字符类型')
+    if sum(minimum for _, minimum in classes) > params['length_min']:
+        raise PolicyError('各字符类型最少个数之和不能超过最小长度')
+
+    return SamplingPlan(params, classes, charset)
+
+
+def get_policies():
+    """获取所有命名策略的参数（内置 + 配置）"""
+    policies = dict(BUILTIN_POLICIES)
+    policies.update(Config.PASSWORD_POLICIES)
+    return policies
+
+
+def compile_policy(params=None):
+    """
+    编译策略参数为采样计划，相同参数只编译一次
+
+    Args:
+        params: 策略参数字典，未提供的参数使用默认值
+
+    Returns:
+        SamplingPlan 实例
+    """
+    return _compile(_normalize(params))
+
+
+def resolve_policy(policy):
+    """
+    解析请求中的策略
+
+    Args:
+        policy: 命名策略名称，或策略参数字典
+
+    Returns:
+        SamplingPlan 实例
+    """
+    if isinstance(policy, str):
+        policies = get_policies()
+        if policy not in policies:
+            raise PolicyError(f'策略不存在: {policy}')
+        return compile_policy(policies[policy])
+    if isinstance(policy, dict):
+        return compile_policy(policy)
+    raise PolicyError('policy 必须为策略名称或参数对象')
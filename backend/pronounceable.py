@@ -0,0 +1,204 @@
+"""
+可读密码模块
+基于字母 n-gram 马尔可夫模型生成易读易记的密码
+转移表预先整理为每个上下文一组累计计数数组，每生成一个字符只需一次二分查找；
+模型在首次使用时才加载，不影响应用启动速度
+
+小语料上训练的低阶模型每个字母只有约 1.4 比特熵，因此按 PRONOUNCEABLE_MIN_ENTROPY 限制最低熵：
+未指定长度时取满足要求的最短长度，指定的长度和数字个数达不到要求时拒绝并返回实际熵
+"""
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_right
+
+from config import Config
+from generator import map_random_bytes, randbelow
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'english.txt')
+
+_START = '^'
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+_DIGIT_BITS = math.log2(10)
+
+
+class PronounceableError(ValueError):
+    """可读密码参数无效（如熵低于下限）"""
+
+
+class MarkovModel:
+    """
+    字母马尔可夫模型
+
+    transitions[上下文] = (候选字符, 累计计数数组, 总数)，上下文为前 order 个字符。
+    上下文没有后继时依次退回到更短的上下文，最终退回到词首分布（相当于开始一个新音节）。
+    """
+
+    def __init__(self, transitions, order):
+        self.transitions = transitions
+        self.order = order
+        # 各长度输出分布的熵（下标为长度）及递推到当前长度时的上下文状态分布
+        self._entropies = [0.0]
+        self._states = {_START * order: 1.0}
+        self._entropy_lock = threading.Lock()
+
+    @classmethod
+    def train(cls, words, order=2):
+        """从单词列表训练模型"""
+        counts = {}
+        for word in words:
+            padded = _START * order + word
+            for i in range(order, len(padded)):
+                for k in range(1, order + 1):
+                    context = padded[i - k:i]
+                    bucket = counts.setdefault(context, {})
+                    bucket[padded[i]] = bucket.get(padded[i], 0) + 1
+
+        transitions = {}
+        for context, bucket in counts.items():
+            chars = ''.join(sorted(bucket))
+            cumulative = array('I')
+            total = 0
+            for ch in chars:
+                total += bucket[ch]
+                cumulative.append(total)
+            transitions[context] = (chars, cumulative, total)
+        return cls(transitions, order)
+
+    def distribution(self, context):
+        """返回上下文对应的 (候选字符, 累计计数, 总数)"""
+        for k in range(self.order, 0, -1):
+            entry = self.transitions.get(context[-k:])
+            if entry is not None:
+                return entry
+        return self.transitions[_START * self.order]
+
+    def sample(self, length):
+        """
+        生成 length 个字母
+
+        Returns:
+            (字符串, 该字符串在模型下的自信息比特数)
+        """
+        context = _START * self.order
+        out = []
+        surprisal = 0.0
+        for _ in range(length):
+            chars, cumulative, total = self.distribution(context)
+            index = bisect_right(cumulative, randbelow(total))
+            count = cumulative[index] - (cumulative[index - 1] if index else 0)
+            surprisal -= math.log2(count / total)
+            out.append(chars[index])
+            context = (context + chars[index])[-self.order:]
+        return ''.join(out), surprisal
+
+    def entropy(self, length):
+        """
+        长度为 length 的输出分布的香农熵（比特）
+
+        按上下文状态的概率分布逐步递推：H = Σ_t Σ_state P(state) · H(下一字符 | state)；
+        各长度的结果保存在实例中，更长的长度从已递推的状态继续计算
+        """
+        with self._entropy_lock:
+            while len(self._entropies) <= length:
+                self._step_entropy()
+            return self._entropies[length]
+
+    def _step_entropy(self):
+        """把熵与状态分布递推一个字符"""
+        next_states = {}
+        step_entropy = 0.0
+        for context, probability in self._states.items():
+            chars, cumulative, total = self.distribution(context)
+            previous = 0
+            for ch, value in zip(chars, cumulative):
+                p = (value - previous) / total
+                previous = value
+                step_entropy -= probability * p * math.log2(p)
+                key = (context + ch)[-self.order:]
+                next_states[key] = next_states.get(key, 0.0) + probability * p
+        self._states = next_states
+        self._entropies.append(self._entropies[-1] + step_entropy)
+
+    def min_length(self, min_bits, max_length):
+        """
+        满足最低熵要求的最短字母长度
+
+        Returns:
+            长度；max_length 以内无法满足时返回 None
+        """
+        for length in range(1, max_length + 1):
+            if self.entropy(length) >= min_bits:
+                return length
+        return None
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _read_corpus(path):
+    words = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word and not word.startswith('#') and all(c in _ALPHABET for c in word):
+                words.append(word)
+    return words
+
+
+def get_model():
+    """加载马尔可夫模型（首次使用时训练，之后进程内复用）"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                path = Config.PRONOUNCEABLE_CORPUS or DEFAULT_CORPUS
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f'未找到语料文件: {path}')
+                _model = MarkovModel.train(_read_corpus(path), Config.PRONOUNCEABLE_ORDER)
+    return _model
+
+
+def generate_pronounceable(length=None, capitalize=True, digits=0, min_entropy=None):
+    """
+    生成可读密码
+
+    Args:
+        length: 字母部分长度，None 表示取满足最低熵的最短长度
+        capitalize: 是否首字母大写（不增加熵）
+        digits: 末尾追加的随机数字个数
+        min_entropy: 最低熵（比特），默认使用 Config.PRONOUNCEABLE_MIN_ENTROPY
+
+    Returns:
+        dict: password、length（字母部分长度）、entropy_bits（该长度下输出分布的香农熵）、
+              surprisal_bits（本次结果在模型下的自信息）
+
+    Raises:
+        PronounceableError: 熵低于最低要求
+    """
+    if min_entropy is None:
+        min_entropy = Config.PRONOUNCEABLE_MIN_ENTROPY
+    model = get_model()
+    digit_bits = digits * _DIGIT_BITS
+    if length is None:
+        length = model.min_length(min_entropy - digit_bits, Config.PRONOUNCEABLE_MAX_LENGTH)
+        if length is None:
+            raise PronounceableError(f'在{Config.PRONOUNCEABLE_MAX_LENGTH}个字母内无法达到{min_entropy}比特熵，请增加数字个数')
+    entropy_bits = model.entropy(length) + digit_bits
+    if entropy_bits < min_entropy:
+        raise PronounceableError(
+            f'{length}个字母加{digits}个数字的熵只有{entropy_bits:.1f}比特，低于要求的{min_entropy}比特，请增加长度'
+        )
+
+    letters, surprisal = model.sample(length)
+    if capitalize:
+        letters = letters.capitalize()
+    suffix = map_random_bytes('0123456789', digits) if digits else ''
+    return {
+        'password': letters + suffix,
+        'length': length,
+        'entropy_bits': round(entropy_bits, 2),
+        'surprisal_bits': round(surprisal + digit_bits, 2)
+    }
@@ -0,0 +1,106 @@
+"""
+登录与注册限流
+按客户端 IP 和用户名分别使用令牌桶：桶容量为突发次数，按固定速率补充；
+桶为空时直接返回 429 和 Retry-After，在查询数据库和计算密码哈希之前拒绝。
+
+每个键只保存 (剩余令牌数, 更新时间) 两个数，定期清理已补满（长时间未访问）的桶，
+键数超过上限时淘汰最久未访问的键。多进程部署时各进程分别计数。
+"""
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from config import Config
+
+
+class TokenBucketLimiter:
+    """令牌桶限流器"""
+
+    def __init__(self, count, period, max_keys=100000, sweep_interval=60):
+        """
+        Args:
+            count: 桶容量（突发次数）
+            period: 补满一个空桶所需的秒数，即每 period 秒最多 count 次
+            max_keys: 最多跟踪的键数
+            sweep_interval: 清理已补满桶的间隔（秒）
+        """
+        self.capacity = float(count)
+        self.rate = count / period  # 每秒补充的令牌数
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self._buckets = {}  # 键 -> (剩余令牌数, 更新时间)，按最近访问顺序排列
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.rejected = 0
+
+    def hit(self, key):
+        """
+        消耗一个令牌
+
+        Returns:
+            0 表示允许；否则为需要等待的秒数
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                if len(self._buckets) > self.max_keys:
+                    self._sweep(now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / self.rate
+
+    def _sweep(self, now):
+        """移除已补满的桶；仍超过上限时淘汰最久未访问的键（需持有 _lock）"""
+        full = self.capacity / self.rate
+        self._buckets = {
+            key: value for key, value in self._buckets.items() if now - value[1] < full
+        }
+        overflow = len(self._buckets) - self.max_keys
+        if overflow > 0:
+            for key in list(self._buckets)[:overflow]:
+                del self._buckets[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self.rejected = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# 全局实例：登录和注册共用
+ip_limiter = TokenBucketLimiter(*Config.AUTH_RATE_LIMIT_IP, max_keys=Config.RATE_LIMIT_MAX_KEYS)
+username_limiter = TokenBucketLimiter(*Config.AUTH_RATE_LIMIT_USERNAME, max_keys=Config.RATE_LIMIT_MAX_KEYS)
+
+
+def rate_limited(f):
+    """限流装饰器：按客户端 IP 和请求体中的用户名限制登录、注册频率"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if current_app.config['RATE_LIMIT_ENABLED']:
+            wait = ip_limiter.hit(request.remote_addr or '')
+            if not wait:
+                data = request.get_json(silent=True)
+                username = data.get('username') if isinstance(data, dict) else None
+                if isinstance(username, str) and username:
+                    wait = username_limiter.hit(username.lower())
+            if wait:
+                return jsonify({
+                    'success': False,
+                    'error': '请求过于频繁，请稍后重试'
+                }), 429, {'Retry-After': str(math.ceil(wait))}
+
+        return f(*args, **kwargs)
+
+    return decorated
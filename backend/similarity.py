@@ -0,0 +1,243 @@
+"""
+相似密码检测模块
+为每个用户维护一棵基于编辑距离的 BK 树，查找与给定密码相差一两个字符的记录
+（如 Summer2023! 与 Summer2024!），避免两两比较
+
+树在进程内按用户缓存，创建、更新、删除记录时增量维护；
+多进程部署时以 (记录数, 最后修改时间) 作为版本号，其他进程写入后自动重建
+
+取舍：编辑距离必须在明文上计算（指纹是 HMAC，相近的密码指纹毫无关联），
+因此缓存的树中保存着解密后的密码。为缩短明文在内存中的停留时间，每棵树从构建起最多保留
+SIMILARITY_CACHE_TTL 秒，用户退出登录或修改登录密码时立即清除（多进程部署时其他进程中的树仍要等到过期）；代价是过期后首次查询需要重新解密建树
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, select
+
+from config import Config
+from models import db, PasswordEntry
+
+
+class Pattern:
+    """
+    预处理后的待比较字符串
+
+    使用 Myers 位并行算法计算编辑距离：每处理对方一个字符只需常数次整数位运算，
+    同一字符串与树中大量节点比较时只需预处理一次。
+    """
+    __slots__ = ('text', 'length', 'peq', 'last')
+
+    def __init__(self, text):
+        self.text = text
+        self.length = len(text)
+        peq = {}
+        for i, ch in enumerate(text):
+            peq[ch] = peq.get(ch, 0) | (1 << i)
+        self.peq = peq
+        self.last = 1 << (self.length - 1) if text else 0
+
+    def distance(self, other):
+        """计算与 other 的编辑距离"""
+        m = self.length
+        if m == 0:
+            return len(other)
+        peq = self.peq
+        last = self.last
+        mask = (1 << m) - 1
+        pv, mv, score = mask, 0, m
+        for ch in other:
+            eq = peq.get(ch, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = (ph << 1) | 1
+            mh <<= 1
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv & mask
+        return score
+
+
+def levenshtein(a, b):
+    """计算两个字符串的编辑距离"""
+    return 0 if a == b else Pattern(a).distance(b)
+
+
+class _Node:
+    __slots__ = ('password', 'entry_ids', 'children')
+
+    def __init__(self, password, entry_id):
+        self.password = password
+        self.entry_ids = {entry_id}
+        self.children = {}
+
+
+class BKTree:
+    """
+    BK 树
+
+    相同密码的记录共享一个节点；删除只从节点中移除记录 ID，空节点保留用于路由，
+    空节点过多时由调用方重建。
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0  # 有效记录数
+        self.nodes = 0  # 节点数（含空节点）
+        self._entries = {}  # entry_id -> 节点
+
+    def add(self, entry_id, password):
+        if entry_id in self._entries:
+            self.remove(entry_id)
+        self.size += 1
+        if self.root is None:
+            self.root = self._entries[entry_id] = _Node(password, entry_id)
+            self.nodes = 1
+            return
+        pattern = Pattern(password)
+        node = self.root
+        while True:
+            distance = pattern.distance(node.password)
+            if distance == 0:
+                node.entry_ids.add(entry_id)
+                self._entries[entry_id] = node
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = self._entries[entry_id] = _Node(password, entry_id)
+                self.nodes += 1
+                return
+            node = child
+
+    def remove(self, entry_id):
+        node = self._entries.pop(entry_id, None)
+        if node is not None:
+            node.entry_ids.discard(entry_id)
+            self.size -= 1
+
+    @property
+    def empty_ratio(self):
+        """空节点占比"""
+        return 1 - self.size / self.nodes if self.nodes else 0
+
+    def search(self, password, max_distance):
+        """
+        查找编辑距离不超过 max_distance 的记录
+
+        Returns:
+            [(entry_id, 距离), ...]，按距离升序
+        """
+        results = []
+        if self.root is None:
+            return results
+        pattern = Pattern(password)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = pattern.distance(node.password)
+            if distance <= max_distance:
+                results.extend((entry_id, distance) for entry_id in node.entry_ids)
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for d, child in node.children.items() if low <= d <= high)
+        results.sort(key=lambda item: item[1])
+        return results
+
+
+class SimilarityIndex:
+    """按用户缓存的 BK 树集合（有界 TTL LRU）"""
+
+    def __init__(self, max_users=64, ttl=300):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._trees = OrderedDict()  # user_id -> (过期时间, 版本号, BKTree)
+        self._lock = threading.RLock()
+
+    def _evict_expired(self):
+        """移除已过期的树（调用方持有锁）"""
+        now = time.monotonic()
+        for user_id in [user_id for user_id, cached in self._trees.items() if cached[0] <= now]:
+            del self._trees[user_id]
+
+    def invalidate(self, user_id=None):
+        """移除指定用户（None 表示全部）的树，退出登录或修改登录密码时调用"""
+        with self._lock:
+            if user_id is None:
+                self._trees.clear()
+            else:
+                self._trees.pop(user_id, None)
+
+    @staticmethod
+    def _version(user_id):
+        count, last_updated = db.session.query(
+            func.count(PasswordEntry.id), func.max(PasswordEntry.updated_at)
+        ).filter(PasswordEntry.user_id == user_id).one()
+        return count, last_updated
+
+    @staticmethod
+    def _build(user_id):
+        tree = BKTree()
+        result = db.session.execute(select(
+            PasswordEntry.id, PasswordEntry.user_id, PasswordEntry.password, PasswordEntry.password_blob
+        ).where(
+            PasswordEntry.user_id == user_id
+        ).execution_options(yield_per=1000))
+        # 按块批量解密
+        for partition in result.partitions():
+            for row, password in zip(partition, PasswordEntry.get_passwords(partition)):
+                tree.add(row.id, password)
+        return tree
+
+    def get_tree(self, user_id):
+        """获取用户的 BK 树，版本号变化或空节点过多时重建"""
+        version = self._version(user_id)
+        with self._lock:
+            self._evict_expired()
+            cached = self._trees.get(user_id)
+            if cached is not None and cached[1] == version and cached[2].empty_ratio < 0.5:
+                self._trees.move_to_end(user_id)
+                return cached[2]
+            tree = self._build(user_id)
+            self._trees[user_id] = (time.monotonic() + self.ttl, version, tree)
+            self._trees.move_to_end(user_id)
+            while len(self._trees) > self.max_users:
+                self._trees.popitem(last=False)
+            return tree
+
+    def _apply(self, user_id, change):
+        """增量修改已缓存的树，并刷新版本号（需在提交后调用）"""
+        with self._lock:
+            self._evict_expired()
+            cached = self._trees.get(user_id)
+            if cached is None:
+                return
+            change(cached[2])
+            # 保留原过期时间，增量修改不延长明文的缓存时间
+            self._trees[user_id] = (cached[0], self._version(user_id), cached[2])
+
+    def add(self, user_id, entry_id, password):
+        """记录创建或密码修改后调用"""
+        self._apply(user_id, lambda tree: tree.add(entry_id, password))
+
+    def remove(self, user_id, entry_ids):
+        """记录删除后调用"""
+        def change(tree):
+            for entry_id in entry_ids:
+                tree.remove(entry_id)
+        self._apply(user_id, change)
+
+    def touch(self, user_id):
+        """记录的其他字段修改后调用，只刷新版本号"""
+        self._apply(user_id, lambda tree: None)
+
+    def search(self, user_id, password, max_distance):
+        return self.get_tree(user_id).search(password, max_distance)
+
+
+# 全局索引实例
+index = SimilarityIndex(Config.SIMILARITY_CACHE_USERS, Config.SIMILARITY_CACHE_TTL)
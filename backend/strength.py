@@ -0,0 +1,159 @@
+"""
+密码强度评估模块
+单次遍历估算字符空间熵，再结合模式匹配（字典、键盘连走、日期等）取猜测次数最少的结果，
+结果按加盐哈希缓存在有界 LRU 中（不保存明文）
+"""
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from config import Config
+from patterns import minimum_guesses_bits
+
+# 字符类型位标记
+_LOWER, _UPPER, _DIGIT, _SYMBOL, _OTHER = 1, 2, 4, 8, 16
+
+# 各字符类型的字符空间大小
+_POOL_SIZES = ((_LOWER, 26), (_UPPER, 26), (_DIGIT, 10), (_SYMBOL, 33), (_OTHER, 100))
+
+# ASCII 字符类型查找表
+_ASCII_CLASS = bytes(
+    _LOWER if 'a' <= chr(i) <= 'z' else
+    _UPPER if 'A' <= chr(i) <= 'Z' else
+    _DIGIT if '0' <= chr(i) <= '9' else
+    _SYMBOL if 32 <= i < 127 else _OTHER
+    for i in range(128)
+)
+
+# 熵（比特）到等级的阈值，等级沿用原有的 5 档标签
+LEVELS = (
+    (28, 'extreme-weak'),
+    (36, 'weak'),
+    (60, 'medium'),
+    (80, 'strong'),
+)
+TOP_LEVEL = 'extreme-strong'
+
+# 可预测字符（与前一个字符相同或连续，如 aaa、123、cba）按 1 比特计
+_PREDICTABLE_BITS = 1.0
+
+
+def _label(entropy_bits):
+    """根据熵返回强度等级标签"""
+    for threshold, label in LEVELS:
+        if entropy_bits < threshold:
+            return label
+    return TOP_LEVEL
+
+
+def _estimate(password):
+    """单次遍历计算强度指标"""
+    classes = 0
+    predictable = 0
+    prev = None
+    for ch in password:
+        code = ord(ch)
+        classes |= _ASCII_CLASS[code] if code < 128 else _OTHER
+        if prev is not None and abs(code - prev) <= 1:
+            predictable += 1
+        prev = code
+
+    length = len(password)
+    pool = sum(size for flag, size in _POOL_SIZES if classes & flag)
+    if not pool:
+        entropy, patterns = 0.0, set()
+    else:
+        bruteforce_bits = math.log2(pool)
+        entropy = (length - predictable) * bruteforce_bits + predictable * _PREDICTABLE_BITS
+        pattern_bits, patterns = minimum_guesses_bits(password, bruteforce_bits)
+        if pattern_bits < entropy:
+            entropy = pattern_bits
+        else:
+            patterns = set()
+
+    return {
+        'entropy_bits': round(entropy, 2),
+        # 平均需要尝试一半的空间
+        'guesses_log10': round(max(entropy - 1, 0) * math.log10(2), 2),
+        'score': min(len(LEVELS), sum(1 for threshold, _ in LEVELS if entropy >= threshold)),
+        'label': _label(entropy),
+        'patterns': sorted(patterns)
+    }
+
+
+class StrengthCache:
+    """
+    有界 LRU 缓存
+
+    键为进程内随机盐的 BLAKE2b 摘要，缓存中不出现明文密码，
+    盐不落盘，进程退出后摘要无法再与密码对应。
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._salt = os.urandom(16)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, password):
+        """计算缓存键"""
+        return hashlib.blake2b(password.encode('utf-8'), key=self._salt, digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+# 全局缓存实例
+cache = StrengthCache(Config.STRENGTH_CACHE_SIZE)
+
+
+def estimate_strength(password):
+    """
+    估算密码强度
+
+    Args:
+        password: 密码字符串
+
+    Returns:
+        dict: entropy_bits（熵，比特）、guesses_log10（猜测次数的常用对数）、
+              score（0-4）、label（强度等级）、patterns（识别出的模式类型）
+    """
+    key = cache.key(password)
+    result = cache.get(key)
+    if result is None:
+        result = _estimate(password)
+        cache.put(key, result)
+    return dict(result, patterns=list(result['patterns']))
+
+
+def estimate_many(passwords):
+    """批量估算密码强度，顺序与输入一致"""
+    return [estimate_strength(password) for password in passwords]
+
+
+def calculate_password_strength(password):
+    """计算密码强度等级（兼容原有接口）"""
+    return estimate_strength(password)['label']
@@ -0,0 +1,199 @@
+"""
+认证令牌缓存与吊销
+已验证的令牌按摘要缓存在有界 LRU 中（过期时间取令牌的 exp），重复请求跳过 HMAC 签名验证；
+吊销列表按 jti 记录被注销的令牌，修改密码时按用户记录截止时间（此前签发的令牌全部失效），
+持久化在 revoked_tokens 表中，并在内存中保留一份，多进程部署时定期增量同步
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+
+
+def _timestamp(value):
+    """UTC datetime 转为 Unix 时间戳"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _datetime(timestamp):
+    """Unix 时间戳转为 UTC datetime（不带时区，与其他列一致）"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class VerifiedTokenCache:
+    """
+    已验证令牌的有界 LRU 缓存
+
+    键为令牌的 BLAKE2b 摘要，缓存中不保存令牌原文；条目在令牌 exp 到期后失效。
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # 摘要 -> (exp, payload)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token):
+        """计算缓存键"""
+        return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, token):
+        """返回已验证且未过期的 payload，否则返回 None"""
+        key = self.key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, payload):
+        """缓存验证通过的 payload（没有 exp 的令牌不缓存）"""
+        exp = payload.get('exp')
+        if exp is None:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._data[key] = (exp, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """缓存统计（命中率等）"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+class RevocationList:
+    """
+    令牌吊销列表
+
+    内存中保存未过期的吊销记录（jti -> exp，用户 ID -> 截止时间），检查不访问数据库；
+    每隔 refresh 秒从数据库增量读取其他进程写入的记录。
+    """
+
+    def __init__(self, refresh=30):
+        self.refresh = refresh
+        self._jtis = {}  # jti -> 令牌过期时间戳
+        self._users = {}  # user_id -> (截止时间戳, 记录过期时间戳)
+        self._lock = threading.Lock()
+        self._synced_at = None  # 已同步记录的最大 revoked_at
+        self._next_sync = 0.0
+
+    @staticmethod
+    def _user_jti(user_id):
+        return f'user:{user_id}'
+
+    def _apply(self, row):
+        if row.jti.startswith('user:'):
+            cutoff = _timestamp(row.revoked_at)
+            current = self._users.get(row.user_id)
+            if current is None or current[0] < cutoff:
+                self._users[row.user_id] = (cutoff, _timestamp(row.expires_at))
+        else:
+            self._jtis[row.jti] = _timestamp(row.expires_at)
+
+    def sync(self, force=False):
+        """从数据库读取新增的吊销记录，并清理内存中已过期的记录（需在应用上下文中调用）"""
+        from models import RevokedToken
+
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            query = RevokedToken.query.filter(RevokedToken.expires_at > datetime.utcnow())
+            if self._synced_at is not None:
+                # 回退一个同步间隔，覆盖其他进程稍晚提交、revoked_at 较早的记录
+                query = query.filter(RevokedToken.revoked_at >= self._synced_at - timedelta(seconds=self.refresh))
+            for row in query:
+                self._apply(row)
+                if self._synced_at is None or row.revoked_at > self._synced_at:
+                    self._synced_at = row.revoked_at
+            wall = time.time()
+            self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > wall}
+            self._users = {uid: value for uid, value in self._users.items() if value[1] > wall}
+            self._next_sync = now + self.refresh
+
+    def is_revoked(self, payload):
+        """检查令牌是否已被吊销"""
+        self.sync()
+        jti = payload.get('jti')
+        if jti is not None and jti in self._jtis:
+            return True
+        revoked = self._users.get(payload.get('user_id'))
+        return revoked is not None and payload.get('iat', 0) <= revoked[0]
+
+    def _save(self, jti, user_id, revoked_at, expires_at):
+        from models import db, RevokedToken
+
+        row = db.session.get(RevokedToken, jti)
+        if row is None:
+            row = RevokedToken(jti=jti, user_id=user_id)
+            db.session.add(row)
+        row.revoked_at = _datetime(revoked_at)
+        row.expires_at = _datetime(expires_at)
+        # 顺便清理已过期的记录
+        RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        with self._lock:
+            self._apply(row)
+
+    def revoke(self, payload):
+        """
+        吊销单个令牌（退出登录）
+
+        没有 jti 的旧令牌无法单独吊销，改为吊销该用户此前签发的全部令牌。
+        """
+        jti = payload.get('jti')
+        if jti is None:
+            self.revoke_user(payload['user_id'])
+            return
+        self._save(jti, payload['user_id'], time.time(), payload['exp'])
+
+    def revoke_user(self, user_id):
+        """吊销用户当前时间之前签发的全部令牌（修改密码）"""
+        now = time.time()
+        self._save(self._user_jti(user_id), user_id, now, now + Config.TOKEN_EXPIRES_DAYS * 86400)
+
+    def stats(self):
+        """吊销列表统计"""
+        with self._lock:
+            return {'tokens': len(self._jtis), 'users': len(self._users)}
+
+    def clear(self):
+        """清空内存中的记录（下次检查时重新从数据库加载）"""
+        with self._lock:
+            self._jtis.clear()
+            self._users.clear()
+            self._synced_at = None
+            self._next_sync = 0.0
+
+
+# 全局实例
+cache = VerifiedTokenCache(Config.TOKEN_CACHE_SIZE)
+revocations = RevocationList(Config.TOKEN_REVOCATION_REFRESH)
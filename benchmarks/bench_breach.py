@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+泄露密码检查性能测试
+生成随机的 HIBP 格式数据构建索引，统计命中/未命中的查询延迟和常驻内存
+
+用法:
+    python benchmarks/bench_breach.py [--records 1000000] [--queries 20000]
+"""
+import argparse
+import hashlib
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from breach import BreachIndex, build_index  # noqa: E402
+
+
+def rss_mb():
+    """当前常驻内存（MB），仅 Linux 可用时读取 /proc，否则返回峰值"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def measure(name, index, passwords):
+    samples = []
+    for password in passwords:
+        start = time.perf_counter()
+        index.lookup(password)
+        samples.append((time.perf_counter() - start) * 1e6)
+    print(f"{name:<12} p50 {percentile(samples, 50):7.1f}us  p99 {percentile(samples, 99):7.1f}us  "
+          f"{len(samples) / (sum(samples) / 1e6):10.0f} 次/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='泄露密码检查性能测试')
+    parser.add_argument('--records', type=int, default=1_000_000, help='泄露库记录数')
+    parser.add_argument('--queries', type=int, default=20000, help='查询次数')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_breach_')
+    source = os.path.join(workdir, 'pwned.txt')
+    index_path = os.path.join(workdir, 'pwned.idx')
+
+    with open(source, 'w') as f:
+        for i in range(args.records):
+            f.write(f"{hashlib.sha1(f'pw{i}'.encode()).hexdigest().upper()}:{i % 1000 + 1}\n")
+
+    start = time.perf_counter()
+    build_index(source, index_path)
+    print(f"构建索引: {args.records} 条  {time.perf_counter() - start:.2f}s  "
+          f"索引 {os.path.getsize(index_path) / 1e6:.1f}MB  Bloom {os.path.getsize(index_path + '.bloom') / 1e6:.1f}MB")
+
+    before = rss_mb()
+    index = BreachIndex(index_path)
+    print(f"加载后常驻内存增长: {rss_mb() - before:.1f}MB")
+
+    hits = [f'pw{i * 7919 % args.records}' for i in range(args.queries)]
+    misses = [f'miss{i}' for i in range(args.queries)]
+    measure('命中', index, hits)
+    measure('未命中', index, misses)
+    print(f"Bloom 预筛拦截 {index.bloom_rejections} 次，访问索引 {index.disk_lookups} 次")
+
+    index.bloom = None
+    index.disk_lookups = 0
+    measure('未命中(无Bloom)', index, misses)
+    print(f"查询结束常驻内存: {rss_mb():.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SQLite 并发读写性能测试
+对比不同的 SQLite 连接配置（见 backend/database.py）下，读进程持续导出密码库的同时写进程新建记录的吞吐量和延迟：
+    default          SQLite 默认（回滚日志，读写互相阻塞）
+    production       WAL、synchronous=NORMAL、mmap 等
+    production+read  在 production 基础上，GET 请求使用只读连接池
+
+读写各自运行在独立进程中（相当于多 worker 部署），每种配置使用新生成的数据库。
+
+用法:
+    python benchmarks/bench_sqlite.py [--entries 5000] [--readers 2] [--writers 2] [--duration 10]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# 在临时目录中运行，避免写入真实数据库和备份目录（--output 的相对路径按原工作目录解析）
+INVOKE_DIR = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix='bench_sqlite_'))
+os.environ['FAVORITES_BACKGROUND_CONVERT'] = '0'
+os.environ['PASSWORDS_BACKGROUND_ENCRYPT'] = '0'
+
+from config import Config  # noqa: E402
+
+PROFILES = {
+    'default': ('default', False),
+    'production': ('production', False),
+    'production+read': ('production', True),
+}
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] if samples else 0.0
+
+
+def configure(uri, profile):
+    Config.SQLALCHEMY_DATABASE_URI = uri
+    Config.SQLITE_PROFILE, Config.SQLITE_READ_ENGINE = PROFILES[profile]
+
+
+def worker(role, index, uri, profile, token, read_path, duration, barrier, results):
+    """读进程反复请求 read_path，写进程反复新建密码记录，结束后把延迟列表放入 results"""
+    configure(uri, profile)
+    from app import create_app
+
+    client = create_app().test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+    errors = 0
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    n = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if role == 'read':
+            response = client.get(read_path, headers=headers)
+        else:
+            response = client.post('/api/passwords', headers=headers, json={
+                'site_name': f'bench-{index}-{n}', 'username': 'bench', 'password': f'Bench-{index}-{n}!'
+            })
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+        n += 1
+    results.put((role, latencies, errors))
+
+
+def run_profile(profile, args):
+    """生成数据库并运行一轮读写测试"""
+    from app import create_app
+    from auth import generate_token
+    from models import db, User
+    from seed_data import seed
+
+    uri = f'sqlite:///{os.path.join(tempfile.mkdtemp(prefix=profile.replace("+", "_") + "_"), "bench.db")}'
+    configure(uri, profile)
+    app = create_app()
+    with app.app_context():
+        seeded = seed(1, args.entries, 0, 0, prefix='bench')
+        token = generate_token(User.query.filter_by(username=seeded['usernames'][0]).first().id)
+        db.session.remove()
+        db.engine.dispose()
+    assert seeded['entries'] == args.entries
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(args.readers + args.writers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(role, i, uri, profile, token, args.read_path, args.duration, barrier, results))
+        for role, count in (('read', args.readers), ('write', args.writers))
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for role in ('read', 'write'):
+        latencies = [value for r, values, _ in collected if r == role for value in values]
+        summary[role] = {
+            'requests': len(latencies),
+            'errors': sum(errors for r, _, errors in collected if r == role),
+            'throughput_rps': round(len(latencies) / args.duration, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(max(latencies, default=0) * 1000, 2),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 并发读写性能测试')
+    parser.add_argument('--entries', type=int, default=5000, help='密码记录数')
+    parser.add_argument('--readers', type=int, default=2, help='读进程数')
+    parser.add_argument('--writers', type=int, default=2, help='写进程数')
+    parser.add_argument('--duration', type=float, default=10, help='每种配置的持续时间（秒）')
+    parser.add_argument('--read-path', default='/api/passwords/export', help='读进程请求的接口')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='逗号分隔的配置名')
+    parser.add_argument('--output', help='结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'配置':<18} {'读 req/s':>9} {'读 p99(ms)':>11} {'写 req/s':>9} {'写 p50(ms)':>11} "
+          f"{'写 p99(ms)':>11} {'写 max(ms)':>11} {'错误':>6}", file=sys.stderr)
+    for profile in args.profiles.split(','):
+        r = results[profile] = run_profile(profile, args)
+        print(f"{profile:<18} {r['read']['throughput_rps']:>9.1f} {r['read']['p99_ms']:>11.1f} "
+              f"{r['write']['throughput_rps']:>9.1f} {r['write']['p50_ms']:>11.1f} {r['write']['p99_ms']:>11.1f} "
+              f"{r['write']['max_ms']:>11.1f} {r['read']['errors'] + r['write']['errors']:>6}", file=sys.stderr)
+
+    text = json.dumps({
+        'entries': args.entries, 'readers': args.readers, 'writers': args.writers,
+        'duration': args.duration, 'read_path': args.read_path, 'results': results
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(os.path.join(INVOKE_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+端到端负载测试
+在临时目录中生成测试数据（见 seed_data.py），本地启动 create_app() 服务，
+多个并发客户端按权重混合请求：登录、带搜索的列表、详情、复制、导出和上传，
+统计每个接口的吞吐量与 p50/p95/p99 延迟
+
+用法:
+    python benchmarks/loadtest.py [--users 20] [--entries 200] [--favorites 100]
+                                  [--concurrency 8] [--duration 30] [--output result.json]
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --usernames load1,load2 --duration 30
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# 所有虚拟用户来自同一 IP 且反复登录，关闭登录限流
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+# 在临时目录中运行，避免写入真实数据库和上传目录（--output 的相对路径按原工作目录解析）
+INVOKE_DIR = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix='loadtest_'))
+
+from seed_data import DEFAULT_PASSWORD, SITES, TAGS  # noqa: E402
+
+# 请求混合权重
+MIX = [
+    ('login', 5),
+    ('passwords.list', 25),
+    ('favorites.list', 10),
+    ('passwords.detail', 20),
+    ('favorites.copy', 20),
+    ('passwords.export', 5),
+    ('favorites.export', 5),
+    ('upload', 5),
+]
+
+
+def percentile(sorted_values, p):
+    """最近秩法取分位数"""
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def sample_png(size=256):
+    """生成一张测试用 PNG 图片"""
+    from PIL import Image
+    image = Image.new('RGB', (size, size))
+    image.putdata([(x % 256, y % 256, (x * y) % 256) for y in range(size) for x in range(size)])
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Client:
+    """单个虚拟用户"""
+
+    def __init__(self, base_url, username, password, rng, image):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.rng = rng
+        self.image = image
+        self.token = None
+        self.entry_ids = []
+        self.item_ids = []
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if body is not None:
+            headers['Content-Type'] = content_type
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def json_request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        return self.request(method, path, body)
+
+    def login(self):
+        status, body = self.json_request('POST', '/api/auth/login', {
+            'username': self.username, 'password': self.password
+        })
+        if status == 200:
+            self.token = json.loads(body)['data']['token']
+        return status
+
+    def discover(self):
+        """获取可用于详情和复制请求的记录 ID"""
+        status, body = self.request('GET', '/api/passwords?per_page=100')
+        if status == 200:
+            self.entry_ids = [item['id'] for item in json.loads(body)['data']]
+        status, body = self.request('GET', '/api/favorites?per_page=100')
+        if status == 200:
+            self.item_ids = [item['id'] for item in json.loads(body)['data']]
+
+    def passwords_list(self):
+        search = urllib.parse.quote(self.rng.choice(SITES))
+        return self.request('GET', f'/api/passwords?search={search}&page={self.rng.randint(1, 3)}')[0]
+
+    def favorites_list(self):
+        search = urllib.parse.quote(self.rng.choice(TAGS + SITES))
+        return self.request('GET', f'/api/favorites?search={search}')[0]
+
+    def passwords_detail(self):
+        if not self.entry_ids:
+            return None
+        return self.request('GET', f'/api/passwords/{self.rng.choice(self.entry_ids)}')[0]
+
+    def favorites_copy(self):
+        if not self.item_ids:
+            return None
+        return self.request('POST', f'/api/favorites/{self.rng.choice(self.item_ids)}/copy')[0]
+
+    def passwords_export(self):
+        return self.request('GET', '/api/passwords/export')[0]
+
+    def favorites_export(self):
+        return self.request('GET', '/api/favorites/export')[0]
+
+    def upload(self):
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="load.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n'
+        ).encode('utf-8') + self.image + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        return self.request('POST', '/api/upload', body, f'multipart/form-data; boundary={boundary}')[0]
+
+    def run(self, operation):
+        if operation == 'login':
+            return self.login()
+        return getattr(self, operation.replace('.', '_'))()
+
+
+def worker(client, deadline, stats, lock):
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    local = defaultdict(lambda: {'latencies': [], 'errors': 0})
+
+    client.login()
+    client.discover()
+    while time.perf_counter() < deadline:
+        operation = client.rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        status = client.run(operation)
+        elapsed = time.perf_counter() - start
+        if status is None:
+            continue
+        local[operation]['latencies'].append(elapsed)
+        if status >= 400:
+            local[operation]['errors'] += 1
+
+    with lock:
+        for operation, data in local.items():
+            stats[operation]['latencies'].extend(data['latencies'])
+            stats[operation]['errors'] += data['errors']
+
+
+def summarize(stats, duration):
+    """计算每个接口的吞吐量与延迟分位数（毫秒）"""
+    results = {}
+    for operation, _ in MIX:
+        latencies = sorted(stats[operation]['latencies'])
+        if not latencies:
+            continue
+        results[operation] = {
+            'requests': len(latencies),
+            'errors': stats[operation]['errors'],
+            'throughput_rps': round(len(latencies) / duration, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        }
+    return results
+
+
+def start_server(args):
+    """生成测试数据并在后台线程中启动服务，返回 (base_url, 用户名列表, server)"""
+    from werkzeug.serving import make_server
+    from app import create_app
+    from models import db
+    from seed_data import seed
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        seeded = seed(args.users, args.entries, args.favorites, args.usages, seed_value=args.seed)
+        db.session.remove()
+    print(f"已生成测试数据：用户 {seeded['users']}，密码记录 {seeded['entries']}，"
+          f"收藏 {seeded['favorites']}，使用记录 {seeded['usages']}（{time.perf_counter() - start:.2f}s）",
+          file=sys.stderr)
+
+    # 关闭逐请求访问日志，避免输出成为瓶颈
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', seeded['usernames'], server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端负载测试')
+    parser.add_argument('--users', type=int, default=20, help='生成的用户数')
+    parser.add_argument('--entries', type=int, default=200, help='每个用户的密码记录数')
+    parser.add_argument('--favorites', type=int, default=100, help='每个用户的收藏数')
+    parser.add_argument('--usages', type=int, default=3, help='每个收藏的使用记录数')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发客户端数')
+    parser.add_argument('--duration', type=float, default=30, help='持续时间（秒）')
+    parser.add_argument('--port', type=int, default=0, help='本地服务端口（0 表示随机）')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+    parser.add_argument('--url', help='对已运行的服务进行测试（不生成数据、不启动服务）')
+    parser.add_argument('--usernames', help='配合 --url 使用，逗号分隔的用户名')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='测试用户的登录密码')
+    parser.add_argument('--output', help='结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        if not args.usernames:
+            parser.error('--url 需要同时提供 --usernames')
+        base_url, usernames = args.url.rstrip('/'), args.usernames.split(',')
+    else:
+        base_url, usernames, server = start_server(args)
+
+    rng = random.Random(args.seed)
+    image = sample_png()
+    clients = [
+        Client(base_url, usernames[i % len(usernames)], args.password, random.Random(rng.random()), image)
+        for i in range(args.concurrency)
+    ]
+
+    stats = defaultdict(lambda: {'latencies': [], 'errors': 0})
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=worker, args=(client, deadline, stats, lock)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    if server is not None:
+        server.shutdown()
+
+    results = summarize(stats, duration)
+    total = sum(r['requests'] for r in results.values())
+    print(f"{'接口':<20} {'请求数':>8} {'错误':>6} {'吞吐(req/s)':>12} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}",
+          file=sys.stderr)
+    for operation, r in results.items():
+        print(f"{operation:<20} {r['requests']:>8} {r['errors']:>6} {r['throughput_rps']:>12.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}", file=sys.stderr)
+    print(f"合计 {total} 个请求，{duration:.1f}s，{total / duration:.1f} req/s", file=sys.stderr)
+
+    output = {
+        'concurrency': args.concurrency,
+        'duration': round(duration, 2),
+        'dataset': {'users': args.users, 'entries': args.entries, 'favorites': args.favorites},
+        'total_requests': total,
+        'throughput_rps': round(total / duration, 2),
+        'endpoints': results
+    }
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(os.path.join(INVOKE_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+热点路径微基准测试
+覆盖密码生成、强度评估、加解密、CryptoManager 构造（PBKDF2）以及模型序列化，
+结果以 JSON 输出（每秒操作数与延迟分位数），便于在同一台机器上对比两个提交
+
+用法:
+    python benchmarks/microbench.py [--min-time 1.0] [--filter crypto] [--output result.json]
+    python benchmarks/microbench.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# 在临时目录中运行，避免写入真实数据库（--output/--compare 的相对路径按原工作目录解析）
+INVOKE_DIR = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix='microbench_'))
+
+from app import create_app, calculate_password_strength  # noqa: E402
+from auth import generate_token, verify_token  # noqa: E402
+from crypto_utils import CryptoManager, crypto  # noqa: E402
+from generator import build_charset, generate_passwords  # noqa: E402
+from models import db, FavoriteItem, PasswordEntry, User  # noqa: E402
+import hashing  # noqa: E402
+import strength  # noqa: E402
+from tokens import cache as token_cache  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, p):
+    """最近秩法取分位数"""
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_case(func, min_time, min_iterations, max_iterations, warmup):
+    """
+    重复调用 func 直到累计耗时超过 min_time 且次数不少于 min_iterations
+
+    Returns:
+        dict: 次数、每秒操作数与各分位数延迟（微秒）
+    """
+    for _ in range(warmup):
+        func()
+
+    clock = time.perf_counter_ns
+    samples = []
+    total = 0
+    deadline = min_time * 1e9
+    while (total < deadline or len(samples) < min_iterations) and len(samples) < max_iterations:
+        start = clock()
+        func()
+        elapsed = clock() - start
+        samples.append(elapsed)
+        total += elapsed
+
+    samples.sort()
+    result = {
+        'iterations': len(samples),
+        'ops_per_sec': round(len(samples) / (total / 1e9), 2),
+        'mean_us': round(total / len(samples) / 1000, 3),
+        'min_us': round(samples[0] / 1000, 3),
+        'max_us': round(samples[-1] / 1000, 3),
+    }
+    for p in PERCENTILES:
+        result[f'p{p}_us'] = round(percentile(samples, p) / 1000, 3)
+    return result
+
+
+def cycle(items):
+    """返回每次调用依次取下一个元素的函数"""
+    state = {'i': 0}
+    n = len(items)
+
+    def next_item():
+        item = items[state['i'] % n]
+        state['i'] += 1
+        return item
+    return next_item
+
+
+def sample_entry(i, password):
+    now = datetime.utcnow()
+    return PasswordEntry(
+        id=i, site_name=f'example-{i}.com', site_url=f'https://example-{i}.com/login',
+        username=f'user{i}@example.com', password=password, notes='备注' * 20,
+        strength='strong', category='工作', image_filename=None,
+        created_at=now, updated_at=now
+    )
+
+
+def sample_favorite(i, content):
+    now = datetime.utcnow()
+    item = FavoriteItem(
+        id=i, title=f'收藏 {i}', category='常用', tags='a,b,c', is_password=False,
+        item_type='link', url=f'https://example-{i}.com', image_url=None, use_count=i,
+        last_used=now, user_id=1, created_at=now, updated_at=now
+    )
+    item.set_content(content)
+    return item
+
+
+def build_cases():
+    """
+    构造所有测试用例
+
+    Returns:
+        [(名称, 函数, 选项), ...]；选项可覆盖 min_iterations/max_iterations/warmup
+    """
+    cases = []
+    chars = build_charset()
+
+    # 密码生成：核心函数与完整 HTTP 请求
+    for length in (8, 16, 32):
+        cases.append((f'generate_password[len={length}]',
+                      lambda length=length: generate_passwords(chars, length, 1), {}))
+
+    app = create_app()
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {generate_token(user.id)}'}
+    client = app.test_client()
+    # 收藏加解密需要读取用户数据密钥，之后的用例都在应用上下文中运行
+    app.app_context().push()
+    cases.append(('http.generate_password[len=16]',
+                  lambda: client.post('/api/generate-password', json={'length': 16}, headers=headers), {}))
+
+    # 令牌验证：已缓存与每次完整验证签名（每次调用前清空缓存）
+    auth_token = headers['Authorization'].split(' ')[1]
+    cases.append(('auth.verify_token[cached]', lambda: verify_token(auth_token), {}))
+
+    def verify_uncached():
+        token_cache.clear()
+        return verify_token(auth_token)
+    cases.append(('auth.verify_token[uncached]', verify_uncached, {}))
+
+    # 登录密码哈希验证（PASSWORD_HASH_METHOD 决定单次登录的 CPU 开销），单次较慢，限制次数
+    password_hash = hashing.hash_password('bench-password')
+    cases.append(('hashing.verify_password', lambda: hashing.verify_password(password_hash, 'bench-password'),
+                  {'min_iterations': 5, 'max_iterations': 200, 'warmup': 1}))
+
+    # 强度评估：每次使用不同的密码（缓存未命中），以及重复同一密码（缓存命中）
+    for length in (8, 16, 64):
+        passwords = generate_passwords(chars, length, 50000)
+        next_password = cycle(passwords)
+        cases.append((f'calculate_password_strength[len={length}]',
+                      lambda n=next_password: calculate_password_strength(n()),
+                      {'max_iterations': len(passwords)}))
+    cases.append(('calculate_password_strength[cached]',
+                  lambda: calculate_password_strength('Summer2024!'), {}))
+
+    # 加解密（v1 字符串与 v2 BLOB 格式）：短密码、一般文本、大段内容
+    for label, size in (('32B', 32), ('1KB', 1024), ('64KB', 65536)):
+        plaintext = ('密码' * size)[:size]
+        token = crypto.encrypt(plaintext)
+        cases.append((f'crypto.encrypt[{label}]', lambda p=plaintext: crypto.encrypt(p), {}))
+        cases.append((f'crypto.decrypt[{label}]', lambda t=token: crypto.decrypt(t), {}))
+        blob = crypto.encrypt_blob(plaintext)
+        cases.append((f'crypto.encrypt_blob[{label}]', lambda p=plaintext: crypto.encrypt_blob(p), {}))
+        cases.append((f'crypto.decrypt_blob[{label}]', lambda b=blob: crypto.decrypt_blob(b), {}))
+
+    # 批量加解密（线程池，线程数由 ENCRYPTION_WORKERS 控制）
+    batch = [f'https://example.com/path/{i}' for i in range(5000)]
+    tokens = crypto.encrypt_many(batch)
+    cases.append(('crypto.encrypt_many[5000]', lambda: crypto.encrypt_many(batch),
+                  {'min_iterations': 5, 'warmup': 1}))
+    cases.append(('crypto.decrypt_many[5000]', lambda: crypto.decrypt_many(tokens),
+                  {'min_iterations': 5, 'warmup': 1}))
+
+    # CryptoManager 密钥派生（PBKDF2 10 万轮，构造时不再派生，首次使用时执行），单次较慢，限制次数
+    cases.append(('CryptoManager().fernet', lambda: CryptoManager('bench-key').fernet,
+                  {'min_iterations': 5, 'max_iterations': 50, 'warmup': 1}))
+
+    # 模型序列化
+    entries = [sample_entry(i, p) for i, p in enumerate(generate_passwords(chars, 16, 1000))]
+    next_entry = cycle(entries)
+    cases.append(('PasswordEntry.to_dict_masked', lambda: next_entry().to_dict_masked(), {}))
+
+    for label, size in (('64B', 64), ('4KB', 4096)):
+        favorites = [sample_favorite(i, ('https://example.com/' * size)[:size]) for i in range(200)]
+        next_favorite = cycle(favorites)
+        cases.append((f'FavoriteItem.to_dict[{label}]', lambda n=next_favorite: n().to_dict(), {}))
+    cases.append(('FavoriteItem.to_dict[decrypt=False]',
+                  lambda n=next_favorite: n().to_dict(decrypt=False), {}))
+
+    return cases
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, results):
+    """打印与基线结果的对比（ops/sec 变化百分比）"""
+    base = baseline.get('results', {})
+    print(f"{'用例':<40} {'基线 ops/s':>14} {'当前 ops/s':>14} {'变化':>9}", file=sys.stderr)
+    for name, result in results.items():
+        if name not in base:
+            continue
+        old, new = base[name]['ops_per_sec'], result['ops_per_sec']
+        change = (new - old) / old * 100 if old else 0
+        print(f'{name:<40} {old:>14.1f} {new:>14.1f} {change:>+8.1f}%', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='热点路径微基准测试')
+    parser.add_argument('--min-time', type=float, default=1.0, help='每个用例的最短运行时间（秒）')
+    parser.add_argument('--min-iterations', type=int, default=20, help='每个用例的最少调用次数')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--output', help='结果写入文件（默认输出到标准输出）')
+    parser.add_argument('--compare', help='与之前保存的结果文件对比')
+    args = parser.parse_args()
+
+    results = {}
+    for name, func, options in build_cases():
+        if args.filter and args.filter not in name:
+            continue
+        strength.cache.clear()
+        results[name] = run_case(
+            func,
+            args.min_time,
+            options.get('min_iterations', args.min_iterations),
+            options.get('max_iterations', 10_000_000),
+            options.get('warmup', 10),
+        )
+        print(f"{name:<40} {results[name]['ops_per_sec']:>14.1f} ops/s  "
+              f"p50 {results[name]['p50_us']:>10.1f}us  p99 {results[name]['p99_us']:>10.1f}us", file=sys.stderr)
+
+    output = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'min_time': args.min_time,
+        'results': results
+    }
+
+    if args.compare:
+        with open(os.path.join(INVOKE_DIR, args.compare), 'r', encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(os.path.join(INVOKE_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+负载测试数据生成
+批量创建 N 个用户，每个用户 M 条密码记录、收藏及收藏使用记录，
+使用 Core 批量 INSERT（executemany）按块写入，不经过逐行的 ORM/接口
+
+所有用户使用同一个登录密码（默认 loadtest-pass），密码哈希只计算一次。
+
+用法:
+    python benchmarks/seed_data.py --database /tmp/load.db --users 50 --entries 200 --favorites 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from sqlalchemy import func, insert  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import envelope  # noqa: E402
+from config import Config  # noqa: E402
+from generator import build_charset, generate_passwords  # noqa: E402
+from models import db, FavoriteItem, FavoriteUsage, PasswordEntry, User, password_fingerprint  # noqa: E402
+from strength import calculate_password_strength  # noqa: E402
+
+DEFAULT_PASSWORD = 'loadtest-pass'
+
+SITES = ['github', 'google', 'taobao', 'jd', 'weibo', 'zhihu', 'bilibili', 'douban',
+         'aliyun', 'tencent', 'baidu', 'gitlab', 'amazon', 'apple', 'microsoft', 'netflix']
+CATEGORIES = ['工作', '社交', '购物', '娱乐', '金融', '其他']
+TAGS = ['常用', '开发', '学习', '文档', '工具', '设计', '新闻', '视频']
+ACTIONS = ['view', 'copy', 'copy', 'edit']
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _insert(model, rows, chunk_size):
+    """按块批量插入"""
+    statement = insert(model.__table__)
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(statement, rows[start:start + chunk_size])
+    db.session.commit()
+
+
+def _encrypt_rows(rows, column):
+    """按用户批量加密 rows 中 column 列的明文"""
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row['user_id'], []).append(row)
+    for uid, user_rows in by_user.items():
+        for row, blob in zip(user_rows, envelope.encrypt_many(uid, [row[column] for row in user_rows])):
+            row[column] = blob
+
+
+def seed(users, entries, favorites, usages=3, password=DEFAULT_PASSWORD,
+         prefix='load', chunk_size=5000, seed_value=None):
+    """
+    生成负载测试数据（需在应用上下文中调用）
+
+    Args:
+        users: 用户数
+        entries: 每个用户的密码记录数
+        favorites: 每个用户的收藏数
+        usages: 每个收藏的使用记录数
+        password: 所有用户的登录密码
+        prefix: 用户名前缀，用户名为 {prefix}{序号}
+        chunk_size: 每次 INSERT 的行数
+        seed_value: 随机数种子（只影响站点、分类等非敏感字段）
+
+    Returns:
+        dict: 各表写入行数与用户名列表
+    """
+    rng = random.Random(seed_value)
+    chars = build_charset()
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(password, Config.PASSWORD_HASH_METHOD)
+
+    user_id = _next_id(User)
+    entry_id = _next_id(PasswordEntry)
+    item_id = _next_id(FavoriteItem)
+
+    user_rows, entry_rows, item_rows, usage_rows = [], [], [], []
+    usernames = []
+    for u in range(users):
+        username = f'{prefix}{user_id + u}'
+        usernames.append(username)
+        uid = user_id + u
+        user_rows.append({
+            'id': uid, 'username': username, 'email': f'{username}@example.com',
+            'password_hash': password_hash, 'created_at': now
+        })
+
+        for secret in generate_passwords(chars, 16, entries):
+            site = rng.choice(SITES)
+            updated = now - timedelta(days=rng.randint(0, 720))
+            entry_rows.append({
+                'id': entry_id, 'user_id': uid, 'site_name': f'{site}-{entry_id}',
+                'site_url': f'https://www.{site}.com/login', 'username': f'{username}@{site}.com',
+                'password': '', 'password_blob': secret, 'fingerprint': password_fingerprint(secret),
+                'notes': f'{site} 账号备注 {entry_id}', 'strength': calculate_password_strength(secret),
+                'category': rng.choice(CATEGORIES), 'created_at': updated, 'updated_at': updated
+            })
+            entry_id += 1
+
+        for _ in range(favorites):
+            site = rng.choice(SITES)
+            updated = now - timedelta(days=rng.randint(0, 365))
+            item_rows.append({
+                'id': item_id, 'user_id': uid, 'title': f'{site} 收藏 {item_id}',
+                'content': '', 'content_blob': f'https://www.{site}.com/path/{item_id}',  # 插入用户后加密
+                'category': rng.choice(CATEGORIES), 'tags': ','.join(rng.sample(TAGS, 2)),
+                'is_password': False, 'item_type': 'link', 'url': f'https://www.{site}.com',
+                'use_count': usages, 'last_used': updated, 'created_at': updated, 'updated_at': updated
+            })
+            for _ in range(usages):
+                usage_rows.append({
+                    'user_id': uid, 'item_id': item_id, 'action': rng.choice(ACTIONS),
+                    'timestamp': updated + timedelta(minutes=rng.randint(0, 10000))
+                })
+            item_id += 1
+
+    _insert(User, user_rows, chunk_size)
+
+    # 密码和收藏内容用各用户的数据密钥加密（数据密钥在首次加密时创建，需先插入用户）
+    _encrypt_rows(entry_rows, 'password_blob')
+    _encrypt_rows(item_rows, 'content_blob')
+
+    _insert(PasswordEntry, entry_rows, chunk_size)
+    _insert(FavoriteItem, item_rows, chunk_size)
+    _insert(FavoriteUsage, usage_rows, chunk_size)
+
+    return {
+        'users': len(user_rows),
+        'entries': len(entry_rows),
+        'favorites': len(item_rows),
+        'usages': len(usage_rows),
+        'usernames': usernames
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成负载测试数据')
+    parser.add_argument('--database', required=True, help='SQLite 数据库文件路径（不存在时自动创建）')
+    parser.add_argument('--users', type=int, default=20, help='用户数')
+    parser.add_argument('--entries', type=int, default=200, help='每个用户的密码记录数')
+    parser.add_argument('--favorites', type=int, default=100, help='每个用户的收藏数')
+    parser.add_argument('--usages', type=int, default=3, help='每个收藏的使用记录数')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='所有用户的登录密码')
+    parser.add_argument('--prefix', default='load', help='用户名前缀')
+    args = parser.parse_args()
+
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.abspath(args.database)}'
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        result = seed(args.users, args.entries, args.favorites, args.usages, args.password, args.prefix)
+        elapsed = time.perf_counter() - start
+
+    rows = result['users'] + result['entries'] + result['favorites'] + result['usages']
+    print(f"用户 {result['users']}，密码记录 {result['entries']}，收藏 {result['favorites']}，"
+          f"使用记录 {result['usages']}")
+    print(f"共 {rows} 行，耗时 {elapsed:.2f}s（{rows / elapsed:.0f} 行/秒）")
+
+
+if __name__ == '__main__':
+    main()
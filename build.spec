@@ -9,6 +9,11 @@ from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 # 项目根目录
 project_root = os.path.dirname(os.path.abspath(SPEC))
 
+# 编译强度评估使用的字典 trie（backend/data/dictionary.trie）
+sys.path.insert(0, os.path.join(project_root, 'backend'))
+from patterns import compile_dictionary
+compile_dictionary()
+
 # 数据收集
 datas = [
     # 收集前端文件
@@ -74,6 +79,17 @@ a = Analysis(
         'models',
         'auth',
         'crypto_utils',
+        'generator',
+        'passphrase',
+        'policy',
+        'strength',
+        'patterns',
+        'breach',
+        'audit',
+        'migrations',
+        'similarity',
+        'pronounceable',
+        'envelope', 'tokens', 'hashing', 'ratelimit', 'backup_writer', 'database',
         'app',
     ],
     hookspath=[],
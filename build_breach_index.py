@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+泄露密码库索引生成脚本
+将 HIBP Pwned Passwords（SHA-1 格式，每行 "SHA1HEX:COUNT"）转换为排序的定长二进制索引，
+供 backend/breach.py 离线查询
+
+用法:
+    python build_breach_index.py pwned-passwords-sha1-ordered-by-hash-v8.txt [-o breach/pwned-passwords.idx]
+"""
+import argparse
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(current_dir, 'backend')
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from config import Config  # noqa: E402
+from breach import build_index  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成泄露密码库索引')
+    parser.add_argument('source', help='HIBP 格式的 SHA-1 泄露库文件')
+    parser.add_argument('-o', '--output', default=Config.BREACH_INDEX_PATH, help='输出索引路径')
+    parser.add_argument('--chunk', type=int, default=5_000_000, help='每块排序的记录数（影响内存占用）')
+    parser.add_argument('--bloom-bits', type=int, default=Config.BREACH_BLOOM_BITS_PER_ENTRY,
+                        help='Bloom 过滤器每条记录的位数')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_index(args.source, args.output, args.chunk, args.bloom_bits)
+    elapsed = time.perf_counter() - start
+
+    print(f"[OK] 已写入 {count} 条记录: {args.output}")
+    print(f"[OK] Bloom 过滤器: {args.output}.bloom")
+    print(f"耗时 {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -54,6 +54,15 @@ function isLoggedIn() {
  * 退出登录
  */
 function logout() {
+    const token = getToken();
+    if (token) {
+        // 通知服务端吊销令牌（不等待结果）
+        fetch('/api/auth/logout', {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${token}` },
+            keepalive: true
+        }).catch(() => {});
+    }
     removeToken();
     removeCurrentUser();
     window.location.href = 'login.html';
@@ -339,7 +339,7 @@ async function viewItem(id) {
         const item = response.data;
 
         document.getElementById('viewModalTitle').innerHTML = `<i class="fas fa-eye me-2"></i>查看详情 - ${escapeHtml(item.title)}`;
-        document.getElementById('viewContent').textContent = item.content;
+        document.getElementById('viewContent').textContent = item.decrypt_error ? '（内容无法解密）' : item.content;
         document.getElementById('viewCategory').textContent = item.category || '-';
         document.getElementById('viewType').innerHTML = `<span class="badge ${getItemTypeBadgeColor(item.item_type || 'link')}">${getItemTypeName(item.item_type || 'link')}</span>`;
         document.getElementById('viewTags').innerHTML = item.tags ?
@@ -350,7 +350,7 @@ async function viewItem(id) {
         document.getElementById('viewLastUsed').textContent = formatDate(item.last_used);
 
         // 存储内容以便复制
-        document.getElementById('copyFromViewBtn').dataset.content = item.content;
+        document.getElementById('copyFromViewBtn').dataset.content = item.decrypt_error ? '' : item.content;
 
         new bootstrap.Modal(document.getElementById('viewModal')).show();
     } catch (error) {
@@ -380,6 +380,11 @@ async function editItem(id) {
         // 先获取完整内容
         const response = await apiRequest(`${API_BASE}/${id}`);
         const item = response.data;
+        if (item.decrypt_error) {
+            // 内容无法解密时不打开编辑框，避免保存时覆盖原有密文
+            showToast('内容无法解密，不能编辑', 'danger');
+            return;
+        }
 
         document.getElementById('modalTitle').innerHTML = '<i class="fas fa-edit me-2"></i>编辑收藏';
         document.getElementById('itemId').value = id;
@@ -933,6 +938,15 @@ function formatDate(dateStr) {
 
 // 退出登录
 function logout() {
+    const token = localStorage.getItem('token');
+    if (token) {
+        // 通知服务端吊销令牌（不等待结果）
+        fetch('/api/auth/logout', {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${token}` },
+            keepalive: true
+        }).catch(() => {});
+    }
     localStorage.removeItem('token');
     window.location.href = 'index.html';
 }
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+命令行批量生成密码
+以 NDJSON 或 CSV 流式输出到标准输出或文件，内存占用与生成数量无关
+
+用法:
+    python generate_passwords.py --count 1000000 --length 16 --format csv -o passwords.csv
+"""
+import argparse
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(current_dir, 'backend')
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from generator import build_charset, stream_passwords  # noqa: E402
+from strength import calculate_password_strength  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量生成随机密码')
+    parser.add_argument('--count', type=int, default=1000, help='生成数量')
+    parser.add_argument('--length', type=int, default=16, help='密码长度')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson', help='输出格式')
+    parser.add_argument('--no-letters', action='store_true', help='不包含字母')
+    parser.add_argument('--no-numbers', action='store_true', help='不包含数字')
+    parser.add_argument('--no-symbols', action='store_true', help='不包含特殊字符')
+    parser.add_argument('--no-strength', action='store_true', help='不输出强度字段')
+    parser.add_argument('-o', '--output', help='输出文件，默认标准输出')
+    args = parser.parse_args()
+
+    if args.count < 1 or args.length < 1:
+        parser.error('生成数量和密码长度必须大于0')
+
+    chars = build_charset(not args.no_letters, not args.no_numbers, not args.no_symbols)
+    if not chars:
+        parser.error('至少选择一种字符类型')
+
+    score = None if args.no_strength else calculate_password_strength
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        for chunk in stream_passwords(chars, args.length, args.count, args.format, score):
+            out.write(chunk)
+    except BrokenPipeError:
+        # 下游提前关闭（如 | head）时静默退出
+        sys.stderr.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+数据库迁移脚本 - 将收藏内容转换为当前加密格式（v3，用户数据密钥加密的 BLOB）
+应用启动时也会在后台自动转换，这里用于一次性转换或关闭后台转换的部署
+"""
+import argparse
+import os
+import sys
+
+# 添加 backend 目录到路径
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+# 由本脚本在前台转换，不启动后台线程
+os.environ['FAVORITES_BACKGROUND_CONVERT'] = '0'
+os.environ['PASSWORDS_BACKGROUND_ENCRYPT'] = '0'
+
+from app import create_app  # noqa: E402
+from migrations import convert_favorites  # noqa: E402
+
+
+def migrate():
+    """执行数据库迁移"""
+    parser = argparse.ArgumentParser(description='转换收藏内容加密格式')
+    parser.add_argument('--chunk', type=int, default=1000, help='每块记录数')
+    parser.add_argument('--pause', type=float, default=0, help='每块之间暂停的秒数')
+    args = parser.parse_args()
+
+    # create_app 会自动补充 content_blob、data_key 等列
+    app = create_app()
+
+    with app.app_context():
+        print("开始转换收藏内容...")
+        count = convert_favorites(chunk_size=args.chunk, pause=args.pause)
+        print(f"迁移完成！共转换 {count} 条记录")
+
+
+if __name__ == '__main__':
+    migrate()
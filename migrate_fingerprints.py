@@ -0,0 +1,33 @@
+"""
+数据库迁移脚本 - 为密码记录添加并回填密码指纹
+"""
+import argparse
+import os
+import sys
+
+# 添加 backend 目录到路径
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from app import create_app  # noqa: E402
+from migrations import backfill_fingerprints  # noqa: E402
+
+
+def migrate():
+    """执行数据库迁移"""
+    parser = argparse.ArgumentParser(description='回填密码指纹')
+    parser.add_argument('--chunk', type=int, default=1000, help='每块记录数')
+    parser.add_argument('--rebuild', action='store_true', help='重新计算所有指纹（更换 FINGERPRINT_KEY 后使用）')
+    args = parser.parse_args()
+
+    # create_app 会自动补充 fingerprint 列和索引
+    app = create_app()
+
+    with app.app_context():
+        print("开始回填密码指纹...")
+        count = backfill_fingerprints(chunk_size=args.chunk, rebuild=args.rebuild)
+        print(f"迁移完成！共更新 {count} 条记录")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,40 @@
+"""
+数据库迁移脚本 - 加密旧数据中的明文密码（写入 password_entries.password_blob）
+应用启动时也会在后台自动加密，这里用于一次性迁移或关闭后台加密的部署；
+进度保存在 migration_checkpoints 表中，中断后重新运行会从上次的位置继续
+"""
+import argparse
+import os
+import sys
+
+# 添加 backend 目录到路径
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+# 由本脚本在前台迁移，不启动后台线程
+os.environ['FAVORITES_BACKGROUND_CONVERT'] = '0'
+os.environ['PASSWORDS_BACKGROUND_ENCRYPT'] = '0'
+
+from app import create_app  # noqa: E402
+from migrations import encrypt_passwords  # noqa: E402
+
+
+def migrate():
+    """执行数据库迁移"""
+    parser = argparse.ArgumentParser(description='加密明文密码')
+    parser.add_argument('--chunk', type=int, default=1000, help='每块记录数')
+    parser.add_argument('--pause', type=float, default=0, help='每块之间暂停的秒数')
+    parser.add_argument('--restart', action='store_true', help='忽略检查点，从头扫描')
+    args = parser.parse_args()
+
+    # create_app 会自动补充 password_blob 列并创建 migration_checkpoints 表
+    app = create_app()
+
+    with app.app_context():
+        print("开始加密明文密码...")
+        count = encrypt_passwords(chunk_size=args.chunk, pause=args.pause, restart=args.restart)
+        print(f"迁移完成！共加密 {count} 条记录")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,64 @@
+"""
+更换主密钥 - 用新的 ENCRYPTION_KEY 重新包装所有用户的数据密钥，
+并把仍由全局密钥加密的 v1/v2 收藏用旧密钥解密后重新加密为 v3
+
+v3 内容由用户数据密钥加密，不需要重新加密。进度保存在数据库中，中断后重新运行会继续；
+迁移期间应用以 ENCRYPTION_KEY_PREVIOUS 启动，读取时依次尝试新旧密钥。
+
+用法:
+    ENCRYPTION_KEY=<新密钥> ENCRYPTION_KEY_PREVIOUS=<旧密钥> python rotate_master_key.py
+    （未设置 ENCRYPTION_KEY_PREVIOUS 时交互输入旧密钥）
+"""
+import argparse
+import getpass
+import os
+import sys
+import time
+
+# 添加 backend 目录到路径
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+os.environ['FAVORITES_BACKGROUND_CONVERT'] = '0'
+os.environ['PASSWORDS_BACKGROUND_ENCRYPT'] = '0'
+
+from app import create_app  # noqa: E402
+from crypto_utils import CryptoManager, crypto  # noqa: E402
+from migrations import rotate_keys  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='更换主密钥')
+    parser.add_argument('--chunk', type=int, default=1000, help='每块记录数')
+    parser.add_argument('--pause', type=float, default=0, help='每块之间暂停的秒数')
+    args = parser.parse_args()
+
+    if crypto.previous:
+        old_crypto = crypto.previous[0]
+    else:
+        old_crypto = CryptoManager(getpass.getpass('旧 ENCRYPTION_KEY: '))
+        crypto.previous.append(old_crypto)
+    if old_crypto.key_id == crypto.key_id:
+        print("新旧主密钥相同，无需更换")
+        return
+
+    totals = {'data_keys': 0, 'favorites': 0}
+    start = time.perf_counter()
+
+    def progress(stage, count):
+        totals[stage] += count
+        elapsed = time.perf_counter() - start
+        print(f"\r数据密钥 {totals['data_keys']}，收藏 {totals['favorites']}，"
+              f"{sum(totals.values()) / elapsed:.0f} 行/秒", end='', flush=True)
+
+    app = create_app()
+    with app.app_context():
+        print(f"开始更换主密钥（{old_crypto.key_id} -> {crypto.key_id}）...")
+        result = rotate_keys(old_crypto, chunk_size=args.chunk, pause=args.pause, progress=progress)
+        print()
+        print(f"完成！重新包装 {result['data_keys']} 个数据密钥，重新加密 {result['favorites']} 条收藏，"
+              f"耗时 {result['elapsed']:.2f}s（{result['rows_per_sec']:.0f} 行/秒）")
+
+
+if __name__ == '__main__':
+    main()
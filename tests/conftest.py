@@ -0,0 +1,49 @@
+"""
+测试公共夹具：每个测试使用临时目录中的独立数据库，关闭启动时的后台数据转换
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from config import Config  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """在应用上下文中运行的测试应用"""
+    import envelope
+    import similarity
+    from app import create_app
+    from models import db
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "test.db"}')
+    monkeypatch.setattr(Config, 'FAVORITES_BACKGROUND_CONVERT', False)
+    monkeypatch.setattr(Config, 'PASSWORDS_BACKGROUND_ENCRYPT', False)
+    envelope.cache.invalidate()
+    similarity.index.invalidate()
+
+    app = create_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+    envelope.cache.invalidate()
+    similarity.index.invalidate()
+
+
+@pytest.fixture
+def user(app):
+    """已创建数据密钥的用户"""
+    import envelope
+    from models import db, User
+
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    envelope.create_data_key(user.id)
+    db.session.commit()
+    return user
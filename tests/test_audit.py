@@ -0,0 +1,68 @@
+"""
+密码库审计的回归测试：评分结果逐块写入，只保留计数
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import audit
+from config import Config
+from models import db, AuditResult, PasswordEntry
+
+
+def _add_entries(user, passwords):
+    for i, password in enumerate(passwords):
+        entry = PasswordEntry(site_name=f's{i}', username='u', user_id=user.id)
+        entry.set_password(password)
+        db.session.add(entry)
+    db.session.commit()
+
+
+class TrackingExecutor(ThreadPoolExecutor):
+    """记录提交评分块时尚未写入的块数"""
+
+    def __init__(self, saved):
+        super().__init__(max_workers=2)
+        self.saved = saved
+        self.submitted = 0
+        self.max_pending = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        self.max_pending = max(self.max_pending, self.submitted - len(self.saved))
+        return super().submit(fn, *args)
+
+
+@pytest.mark.parametrize('use_executor', [False, True])
+def test_audit_saves_each_chunk(user, monkeypatch, use_executor):
+    monkeypatch.setattr(Config, 'AUDIT_MAX_PENDING_CHUNKS', 2)
+    _add_entries(user, ['password', 'Tr0ub4dor&3xyz!Q', 'password'] + [f'Zq8#unique-{i}-Lm2@' for i in range(7)])
+
+    saved = []
+    original = audit._save_results
+
+    def track_save(user_id, rows):
+        saved.append(len(rows))
+        return original(user_id, rows)
+
+    monkeypatch.setattr(audit, '_save_results', track_save)
+    executor = TrackingExecutor(saved) if use_executor else None
+    try:
+        run = audit.audit_user(user.id, executor, chunk_size=3)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    assert sorted(saved) == [1, 3, 3, 3]
+    assert run.scored_count == 10
+    assert AuditResult.query.filter_by(user_id=user.id).count() == 10
+    report = run.to_dict()['report']
+    assert report['summary']['reused'] == 2
+    if executor:
+        assert executor.max_pending <= Config.AUDIT_MAX_PENDING_CHUNKS
+
+    # 增量审计不再重新评分未修改的记录
+    saved.clear()
+    assert audit.audit_user(user.id, chunk_size=3).scored_count == 0
+    assert saved == []
+
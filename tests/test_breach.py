@@ -0,0 +1,59 @@
+"""
+泄露检查的回归测试：批量与流式生成同样替换出现在泄露库中的密码
+"""
+import hashlib
+import json
+
+import pytest
+
+import breach
+from breach import build_index, replace_breached
+from config import Config
+from generator import stream_passwords
+
+BREACHED = ['aaaa', 'bbbb', 'cccc']
+
+
+@pytest.fixture
+def breach_index(tmp_path, monkeypatch):
+    source = tmp_path / 'pwned.txt'
+    source.write_text(''.join(
+        f'{hashlib.sha1(p.encode()).hexdigest().upper()}:{i + 1}\n' for i, p in enumerate(BREACHED)
+    ))
+    index_path = str(tmp_path / 'pwned.idx')
+    build_index(str(source), index_path)
+    monkeypatch.setattr(Config, 'BREACH_INDEX_PATH', index_path)
+    monkeypatch.setattr(Config, 'BREACH_CHECK_MODE', 'flag')
+    monkeypatch.setattr(breach, '_index', None)
+    return index_path
+
+
+def _cycle(values):
+    """按顺序返回 values 中的密码，用完后重新开始"""
+    state = {'i': 0}
+
+    def generate_many(n):
+        out = [values[(state['i'] + k) % len(values)] for k in range(n)]
+        state['i'] += n
+        return out
+    return generate_many
+
+
+def test_replace_breached_regenerates_only_breached(breach_index):
+    results = replace_breached(['aaaa', 'safe1', 'bbbb'], _cycle(['cccc', 'safe2', 'safe3']))
+    assert results == [('safe3', 0), ('safe1', 0), ('safe2', 0)]
+
+    # 重试用尽时保留最后一次结果并标记出现次数
+    assert replace_breached(['aaaa'], _cycle(['bbbb']), attempts=3) == [('bbbb', 2)]
+
+
+def test_stream_passwords_applies_check(breach_index):
+    def check(passwords):
+        return replace_breached(passwords, _cycle(['safe']))
+
+    chunks = stream_passwords('a', 4, 3, 'ndjson', check=check, chunk_size=2)
+    records = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert records == [{'password': 'safe', 'breached': 0}] * 3
+
+    csv_text = ''.join(stream_passwords('a', 4, 2, 'csv', score=len, check=check))
+    assert csv_text.splitlines() == ['password,strength,breached', 'safe,4,0', 'safe,4,0']
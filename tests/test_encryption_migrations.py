@@ -0,0 +1,245 @@
+"""
+加密格式与在线迁移的回归测试：v1/v2 -> v3 转换、主密钥密钥环与更换、检查点断点续跑、批量加解密
+
+断言直接检查数据库中存储的行（格式版本字节、明文列是否清空、updated_at 是否保持不变）。
+"""
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+
+import envelope
+import migrations
+from crypto_utils import CryptoManager, crypto
+from models import db, FavoriteItem, MigrationCheckpoint, PasswordEntry, User
+
+OLD_UPDATED_AT = datetime(2020, 1, 1)
+
+
+def _insert_favorites(user_id, rows):
+    """按 (content, content_blob) 直接插入收藏，返回主键列表"""
+    table = FavoriteItem.__table__
+    ids = []
+    for content, blob in rows:
+        result = db.session.execute(insert(table).values(
+            title='legacy', content=content, content_blob=blob, user_id=user_id,
+            created_at=OLD_UPDATED_AT, updated_at=OLD_UPDATED_AT
+        ))
+        ids.append(result.inserted_primary_key[0])
+    db.session.commit()
+    return ids
+
+
+def _stored_favorites(ids):
+    table = FavoriteItem.__table__
+    rows = db.session.execute(
+        select(table.c.id, table.c.content, table.c.content_blob, table.c.updated_at)
+        .where(table.c.id.in_(ids)).order_by(table.c.id)
+    ).all()
+    return {row.id: row for row in rows}
+
+
+def _contents(ids):
+    db.session.expire_all()
+    return [db.session.get(FavoriteItem, i).get_content() for i in ids]
+
+
+def _user_with_key(master, username='bob'):
+    """创建数据密钥由 master 包装的用户"""
+    user = User(username=username, email=f'{username}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    user.data_key = master.wrap_key(os.urandom(32), envelope._aad(user.id))
+    user.data_key_id = master.key_id
+    db.session.commit()
+    return user
+
+
+def test_key_ring_decrypts_with_previous_key():
+    old = CryptoManager('old-master-key')
+    new = CryptoManager('new-master-key', previous=[old])
+
+    assert new.decrypt(old.encrypt('v1-secret')) == 'v1-secret'
+    assert new.decrypt_blob(old.encrypt_blob('v2-secret')) == 'v2-secret'
+    assert new.unwrap_key(old.wrap_key(b'k' * 32, b'user:1'), b'user:1') == b'k' * 32
+    with pytest.raises(ValueError):
+        CryptoManager('new-master-key').decrypt(old.encrypt('v1-secret'))
+    with pytest.raises(ValueError):
+        new.unwrap_key(old.wrap_key(b'k' * 32, b'user:1'), b'user:2')
+
+
+def test_convert_favorites_v1_v2_to_v3(user):
+    ids = _insert_favorites(user.id, [
+        (crypto.encrypt('v1-secret'), None),
+        ('', crypto.encrypt_blob('v2-secret')),
+        (CryptoManager('unknown-key').encrypt('lost'), None),
+    ])
+    undecryptable = _stored_favorites(ids)[ids[2]].content
+
+    assert migrations.convert_favorites(chunk_size=2) == 2
+
+    stored = _stored_favorites(ids)
+    for item_id in ids[:2]:
+        assert stored[item_id].content == ''
+        assert stored[item_id].content_blob[0] == envelope.FORMAT_V3
+        assert stored[item_id].updated_at == OLD_UPDATED_AT
+    # 无法解密的记录保持原样
+    assert stored[ids[2]].content == undecryptable
+    assert stored[ids[2]].content_blob is None
+
+    assert _contents(ids[:2]) == ['v1-secret', 'v2-secret']
+    with pytest.raises(ValueError):
+        db.session.get(FavoriteItem, ids[2]).get_content()
+    assert db.session.get(FavoriteItem, ids[2]).to_dict()['decrypt_error'] is True
+
+    # 重复执行不再修改任何记录
+    assert migrations.convert_favorites(chunk_size=2) == 0
+
+
+def test_encrypt_passwords_resumes_after_interrupted_chunk(user, monkeypatch):
+    table = PasswordEntry.__table__
+    db.session.execute(insert(table), [
+        {'site_name': f's{i}', 'username': 'u', 'password': f'plain-{i}', 'user_id': user.id,
+         'created_at': OLD_UPDATED_AT, 'updated_at': OLD_UPDATED_AT}
+        for i in range(5)
+    ])
+    db.session.commit()
+
+    original = envelope.encrypt_many
+    calls = []
+
+    def fail_second_chunk(user_id, values):
+        calls.append(len(values))
+        if len(calls) == 2:
+            raise RuntimeError('interrupted')
+        return original(user_id, values)
+
+    monkeypatch.setattr(envelope, 'encrypt_many', fail_second_chunk)
+    with pytest.raises(RuntimeError):
+        migrations.encrypt_passwords(chunk_size=2)
+    db.session.rollback()
+
+    checkpoint = db.session.get(MigrationCheckpoint, migrations.ENCRYPT_PASSWORDS)
+    assert (checkpoint.last_id, checkpoint.processed, checkpoint.finished_at) == (2, 2, None)
+    rows = db.session.execute(select(table).order_by(table.c.id)).all()
+    assert [row.password == '' and row.password_blob is not None for row in rows] == [True, True, False, False, False]
+
+    # 中断后用户修改了一条尚未加密的记录，续跑时不能被旧密码覆盖
+    entry = db.session.get(PasswordEntry, 4)
+    entry.set_password('edited')
+    db.session.commit()
+
+    monkeypatch.setattr(envelope, 'encrypt_many', original)
+    assert migrations.encrypt_passwords(chunk_size=2) == 2
+
+    checkpoint = db.session.get(MigrationCheckpoint, migrations.ENCRYPT_PASSWORDS)
+    assert checkpoint.processed == 4
+    assert checkpoint.finished_at is not None
+    rows = db.session.execute(select(table).order_by(table.c.id)).all()
+    assert all(row.password == '' and row.password_blob[0] == envelope.FORMAT_V3 for row in rows)
+    assert [row.updated_at == OLD_UPDATED_AT for row in rows] == [True, True, True, False, True]
+    db.session.expire_all()
+    assert PasswordEntry.get_passwords(PasswordEntry.query.order_by(PasswordEntry.id).all()) == [
+        'plain-0', 'plain-1', 'plain-2', 'edited', 'plain-4'
+    ]
+
+
+def test_rotate_keys_with_previous_key(app, monkeypatch):
+    old = CryptoManager('old-master-key')
+    monkeypatch.setattr(crypto, 'previous', [old])
+    user = _user_with_key(old)
+    ids = _insert_favorites(user.id, [
+        (old.encrypt('v1-secret'), None),
+        ('', old.encrypt_blob('v2-secret')),
+        ('', envelope.encrypt(user.id, 'v3-secret')),
+    ])
+    entry = PasswordEntry(site_name='s', username='u', user_id=user.id)
+    entry.set_password('entry-secret')
+    db.session.add(entry)
+    db.session.commit()
+
+    # 更换前通过密钥环读取旧主密钥加密的内容
+    assert _contents(ids) == ['v1-secret', 'v2-secret', 'v3-secret']
+
+    result = migrations.rotate_keys(old, chunk_size=2)
+    assert (result['data_keys'], result['favorites']) == (1, 2)
+
+    users = User.__table__
+    assert db.session.execute(select(users.c.data_key_id).where(users.c.id == user.id)).scalar() == crypto.key_id
+    stored = _stored_favorites(ids)
+    assert all(row.content == '' and row.content_blob[0] == envelope.FORMAT_V3 for row in stored.values())
+    assert all(row.updated_at == OLD_UPDATED_AT for row in stored.values())
+
+    # 移除旧主密钥后仍能读取全部内容
+    monkeypatch.setattr(crypto, 'previous', [])
+    envelope.cache.invalidate()
+    assert _contents(ids) == ['v1-secret', 'v2-secret', 'v3-secret']
+    assert db.session.get(PasswordEntry, entry.id).get_password() == 'entry-secret'
+
+    result = migrations.rotate_keys(old, chunk_size=2)
+    assert (result['data_keys'], result['favorites']) == (0, 0)
+
+
+def test_rotate_keys_resumes_from_checkpoint(app, monkeypatch):
+    old = CryptoManager('old-master-key')
+    monkeypatch.setattr(crypto, 'previous', [old])
+    user = _user_with_key(old)
+    ids = _insert_favorites(user.id, [(old.encrypt(f'secret-{i}'), None) for i in range(5)])
+
+    original = envelope.encrypt_many
+    calls = []
+
+    def fail_second_chunk(user_id, values):
+        calls.append(len(values))
+        if len(calls) == 2:
+            raise RuntimeError('interrupted')
+        return original(user_id, values)
+
+    monkeypatch.setattr(envelope, 'encrypt_many', fail_second_chunk)
+    with pytest.raises(RuntimeError):
+        migrations.rotate_keys(old, chunk_size=2)
+    db.session.rollback()
+
+    name = f'rotate_favorites:{old.key_id}'
+    checkpoint = db.session.get(MigrationCheckpoint, name)
+    assert (checkpoint.last_id, checkpoint.processed) == (ids[1], 2)
+    stored = _stored_favorites(ids)
+    assert [row.content_blob is not None for row in stored.values()] == [True, True, False, False, False]
+
+    monkeypatch.setattr(envelope, 'encrypt_many', original)
+    result = migrations.rotate_keys(old, chunk_size=2)
+    assert (result['data_keys'], result['favorites']) == (0, 3)
+
+    checkpoint = db.session.get(MigrationCheckpoint, name)
+    assert checkpoint.processed == 5
+    assert checkpoint.finished_at is not None
+    stored = _stored_favorites(ids)
+    assert all(row.content == '' and row.content_blob[0] == envelope.FORMAT_V3 for row in stored.values())
+
+    monkeypatch.setattr(crypto, 'previous', [])
+    envelope.cache.invalidate()
+    assert _contents(ids) == [f'secret-{i}' for i in range(5)]
+
+
+def test_batch_crypto_resolves_data_key_once(user, monkeypatch):
+    import crypto_utils
+
+    values = [f'secret-{i}' for i in range(crypto_utils.PARALLEL_THRESHOLD * 2)]
+    values[1] = ''
+    loads = []
+    original = envelope._load_data_key
+
+    def load_once(user_id):
+        loads.append(user_id)
+        return original(user_id)
+
+    # 缓存项随时过期时，批量接口也只能在调用线程中读取一次数据密钥
+    envelope.cache.invalidate()
+    monkeypatch.setattr(envelope.cache, 'put', lambda user_id, aead: None)
+    monkeypatch.setattr(envelope, '_load_data_key', load_once)
+
+    blobs = envelope.encrypt_many(user.id, values)
+    assert blobs[1] is None
+    assert envelope.decrypt_many(user.id, blobs + [crypto.encrypt_blob('v2-secret')]) == values + ['v2-secret']
+    assert loads == [user.id, user.id]
@@ -0,0 +1,27 @@
+"""
+密码生成策略的回归测试：未启用字符类型的默认最少个数
+"""
+import string
+
+import pytest
+
+from policy import BUILTIN_POLICIES, PolicyError, compile_policy, resolve_policy
+
+
+@pytest.mark.parametrize('name', ['lower', 'upper', 'digits', 'symbols'])
+def test_disabled_class_ignores_default_minimum(name):
+    plan = compile_policy({f'use_{name}': False})
+    assert plan.params[f'min_{name}'] == 0
+    assert len(plan.sample()) == plan.length_min
+
+
+def test_disabled_class_rejects_explicit_minimum():
+    with pytest.raises(PolicyError):
+        compile_policy({'use_symbols': False, 'min_symbols': 1})
+    assert compile_policy({'use_symbols': False, 'min_symbols': 0}).params['min_symbols'] == 0
+
+
+def test_builtin_policies_compile():
+    for name in BUILTIN_POLICIES:
+        resolve_policy(name).sample()
+    assert set(resolve_policy('pin').sample()) <= set(string.digits)
@@ -0,0 +1,40 @@
+"""
+可读密码的回归测试：熵的递推缓存与最低熵限制
+"""
+import gc
+import weakref
+
+import pytest
+
+from config import Config
+from pronounceable import MarkovModel, PronounceableError, generate_pronounceable, get_model
+
+WORDS = ['banana', 'bandana', 'cabana', 'canal', 'nab']
+
+
+def test_entropy_is_cached_per_instance():
+    model = MarkovModel.train(WORDS)
+    fresh = MarkovModel.train(WORDS)
+    # 先算长的再算短的，结果与逐个长度从头递推一致
+    assert model.entropy(6) == pytest.approx(fresh.entropy(6))
+    assert model.entropy(3) == pytest.approx(MarkovModel.train(WORDS).entropy(3))
+
+    ref = weakref.ref(model)
+    del model
+    gc.collect()
+    assert ref() is None
+
+
+def test_default_length_meets_min_entropy():
+    for digits in (0, 2):
+        result = generate_pronounceable(digits=digits)
+        assert result['entropy_bits'] >= Config.PRONOUNCEABLE_MIN_ENTROPY
+        assert get_model().entropy(result['length'] - 1) + digits * 3.33 < Config.PRONOUNCEABLE_MIN_ENTROPY
+        assert len(result['password']) == result['length'] + digits
+
+
+def test_low_entropy_config_is_rejected():
+    with pytest.raises(PronounceableError, match='比特'):
+        generate_pronounceable(length=14, digits=2)
+    result = generate_pronounceable(length=14, digits=2, min_entropy=0)
+    assert result['entropy_bits'] == pytest.approx(get_model().entropy(14) + 2 * 3.3219, abs=0.01)
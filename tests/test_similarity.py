@@ -0,0 +1,45 @@
+"""
+相似密码检测的回归测试：缓存的 BK 树（含明文密码）按 TTL 过期，退出登录时清除
+"""
+from auth import generate_token
+from models import db, PasswordEntry
+from similarity import SimilarityIndex, index
+
+
+def _add_entry(user, password):
+    entry = PasswordEntry(site_name='site', username='u', user_id=user.id)
+    entry.set_password(password)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def test_tree_expires_after_ttl(user, monkeypatch):
+    entry = _add_entry(user, 'Summer2023!')
+    clock = {'now': 1000.0}
+    monkeypatch.setattr('similarity.time.monotonic', lambda: clock['now'])
+
+    similarity = SimilarityIndex(max_users=4, ttl=60)
+    tree = similarity.get_tree(user.id)
+    assert similarity.search(user.id, 'Summer2024!', 1) == [(entry.id, 1)]
+
+    # 增量修改不延长缓存时间
+    clock['now'] += 50
+    similarity.touch(user.id)
+    assert similarity.get_tree(user.id) is tree
+    clock['now'] += 20
+    assert similarity.get_tree(user.id) is not tree
+
+    similarity.invalidate(user.id)
+    assert user.id not in similarity._trees
+
+
+def test_logout_clears_cached_tree(app, user):
+    _add_entry(user, 'Summer2023!')
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {generate_token(user.id)}'}
+
+    index.search(user.id, 'Summer2024!', 1)
+    assert user.id in index._trees
+    assert client.post('/api/auth/logout', headers=headers).get_json()['success']
+    assert user.id not in index._trees
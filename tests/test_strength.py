@@ -0,0 +1,36 @@
+"""
+强度评估与模式匹配的回归测试
+"""
+import random
+import sys
+
+import pytest
+
+from patterns import minimum_guesses_bits
+from strength import _estimate, estimate_strength
+
+# 转小写后长度改变的字符（如 'İ'.lower() 为两个码位）
+LENGTH_CHANGING = [chr(i) for i in range(sys.maxunicode + 1) if len(chr(i).lower()) != 1]
+
+
+@pytest.mark.parametrize('password', ['İpassword', 'passwordİ', 'pässwörd', 'İİİ', 'drowssapİ', 'P@ssw0rdİ2024'])
+def test_non_ascii_input(password):
+    result = estimate_strength(password)
+    assert result['entropy_bits'] > 0
+
+
+def test_dictionary_offsets_with_length_changing_characters():
+    # 'İ' 不影响其后单词的识别，位置仍与原字符串对应
+    assert 'dictionary' in _estimate('İpassword')['patterns']
+    assert 'dictionary' in _estimate('passwordİ')['patterns']
+    for ch in LENGTH_CHANGING:
+        bits, _ = minimum_guesses_bits(ch + 'password' + ch, 6.5)
+        assert bits > 0
+
+
+def test_random_unicode_input():
+    rng = random.Random(7)
+    alphabet = LENGTH_CHANGING + list('abcdefghijklmnopqrstuvwxyz0123456789!@#') + ['é', 'ß', 'ø', '中', '文']
+    for _ in range(500):
+        password = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+        assert _estimate(password)['label']